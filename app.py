@@ -9,11 +9,35 @@
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from io import BytesIO
 import base64
+import bisect
+import functools
+import hashlib
+import hmac
+import html
 import json
+import logging
 import math
+import os
+import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import queue
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from copy import copy
+from types import MappingProxyType
+import numpy as np
+
+log = logging.getLogger("pharm_assess")
 
 # ─── PAGE CONFIG ──────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -355,6 +379,7 @@ EPA_SCALE = {
     1: {
         "label": "1 — Needs Significant Development",
         "short": "Needs Significant Development",
+        "hint": "significant supervision required",
         "desc": "Does not yet demonstrate expected competency. Requires significant supervision, direction, and guidance. Patient safety may be a concern without close oversight.",
         "color": "#dc2626",
         "bg": "#fef2f2",
@@ -362,6 +387,7 @@ EPA_SCALE = {
     2: {
         "label": "2 — Developing (Below Expectations)",
         "short": "Developing",
+        "hint": "direct supervision required",
         "desc": "Demonstrates basic/emerging competency. Requires direct supervision and frequent guidance. Performance is below expectations for a practice-ready pharmacist.",
         "color": "#ea580c",
         "bg": "#fff7ed",
@@ -369,6 +395,7 @@ EPA_SCALE = {
     3: {
         "label": "3 — Progressing (Approaching Expectations)",
         "short": "Progressing",
+        "hint": "indirect supervision",
         "desc": "Demonstrates developing-to-expected competency. Able to perform with indirect supervision available. Approaches expectations; minor gaps remain.",
         "color": "#ca8a04",
         "bg": "#fefce8",
@@ -376,6 +403,7 @@ EPA_SCALE = {
     4: {
         "label": "4 — Meets Expectations (Practice-Ready)",
         "short": "Meets Expectations",
+        "hint": "independent practice",
         "desc": "Demonstrates expected competency for a practice-ready acute care clinical pharmacist. Practices independently and consistently. Meets all performance standards.",
         "color": "#16a34a",
         "bg": "#f0fdf4",
@@ -383,6 +411,7 @@ EPA_SCALE = {
     5: {
         "label": "5 — Exemplary (Exceeds Expectations)",
         "short": "Exemplary",
+        "hint": "role model / peer resource",
         "desc": "Demonstrates exemplary competency well above expectations. Serves as a role model, peer resource, and mentor. Advances practice on the unit.",
         "color": "#2563eb",
         "bg": "#eff6ff",
@@ -431,6 +460,16 @@ ASSESSMENT_TYPES = [
     "Other",
 ]
 
+ASSESSOR_ROLES = [
+    "Clinical Pharmacy Manager",
+    "Peer Clinical Pharmacist",
+    "Clinical Pharmacy Coordinator",
+    "Pharmacy Director / Associate Director",
+    "Residency Program Director (RPD)",
+    "Preceptor (Resident/Student Assessment)",
+    "Other",
+]
+
 FOLLOW_UP_OPTIONS = [
     "No follow-up required — performance meets or exceeds expectations",
     "3 months — minor development areas identified",
@@ -440,6 +479,9 @@ FOLLOW_UP_OPTIONS = [
     "Refer to formal performance improvement process",
 ]
 
+FRAMEWORK_VERSION = "1.0"   # bump when DOMAINS / EPA_SCALE wording changes
+DEFAULT_TENANT = "default"
+
 # ─── HELPER FUNCTIONS ─────────────────────────────────────────────────────────
 
 def score_color(score):
@@ -474,36 +516,534 @@ def calc_overall_avg(all_ratings):
     vals = [v for v in all_ratings.values() if v and v > 0]
     return round(sum(vals) / len(vals), 2) if vals else None
 
+# ─── RUNTIME METRICS ──────────────────────────────────────────────────────────
+# Counters and recent timings are kept in one shard per thread. Only the owning
+# thread writes to its shard, so recording is a plain dict/deque update with no
+# lock on the hot path; a scrape copies every shard and merges them. Streamlit
+# starts a thread per script run, so shards of finished threads are folded
+# into a single retired shard (under the registry lock, off the hot path).
+# The registry lives in st.cache_resource because Streamlit re-executes this
+# module on every rerun. Set PHARM_ASSESS_METRICS_PORT to serve /healthz,
+# /readyz, /metrics (Prometheus text format) and /metrics.json from a
+# background thread; it starts with the first session.
+
+METRICS_PORT = int(os.environ.get("PHARM_ASSESS_METRICS_PORT", "0"))
+METRICS_HOST = os.environ.get("PHARM_ASSESS_METRICS_HOST", "127.0.0.1")
+METRICS_RETRY_SECONDS = 60   # wait before retrying a metrics port that could not be bound
+LATENCY_WINDOW = 300      # seconds of timings used for percentiles
+LATENCY_SAMPLES = 1024    # timings kept per thread and operation
+ACTIVE_WINDOW = 300       # a session is active if it reran this recently
+RATE_WINDOW = 60          # seconds averaged for reruns per second
+QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+class _Shard:
+    __slots__ = ("thread", "counts", "timings", "sessions")
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.counts = {}     # (name, label) -> number
+        self.timings = {}    # operation -> deque of (finished_at, seconds)
+        self.sessions = {}   # session id -> last rerun (monotonic)
+
+def _merge_shard(into, shard, now):
+    """Add a shard's counters and its still-relevant timings and sessions to `into`."""
+    for key, n in dict(shard.counts).items():   # C-level copies: atomic under the GIL
+        into.counts[key] = into.counts.get(key, 0) + n
+    for op, samples in list(shard.timings.items()):
+        dest = into.timings.setdefault(op, deque(maxlen=LATENCY_SAMPLES * 8))
+        dest.extend(s for s in list(samples) if s[0] >= now - LATENCY_WINDOW)
+    for sid, seen in dict(shard.sessions).items():
+        if seen >= now - ACTIVE_WINDOW and seen > into.sessions.get(sid, 0):
+            into.sessions[sid] = seen
+
+def _prune(shard, now):
+    for samples in shard.timings.values():
+        while samples and samples[0][0] < now - LATENCY_WINDOW:
+            samples.popleft()
+    for sid in [sid for sid, seen in shard.sessions.items() if seen < now - ACTIVE_WINDOW]:
+        del shard.sessions[sid]
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+def process_rss():
+    """Resident set size in bytes (peak RSS where /proc is unavailable; None if unknown)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class Metrics:
+    """Process-wide counters, timings and session heartbeats, sharded per thread."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = _Shard()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._retire()
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self):
+        now, live = time.monotonic(), []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                _merge_shard(self._retired, shard, now)
+        self._shards = live
+        _prune(self._retired, now)
+
+    def count(self, name, label="", n=1):
+        counts = self._shard().counts
+        counts[(name, label)] = counts.get((name, label), 0) + n
+
+    def cache(self, name, hit):
+        self.count("cache_hits" if hit else "cache_misses", name)
+
+    def observe(self, op, seconds):
+        shard = self._shard()
+        counts = shard.counts
+        counts[("calls", op)] = counts.get(("calls", op), 0) + 1
+        counts[("seconds", op)] = counts.get(("seconds", op), 0.0) + seconds
+        samples = shard.timings.get(op)
+        if samples is None:
+            samples = shard.timings[op] = deque(maxlen=LATENCY_SAMPLES)
+        samples.append((time.monotonic(), seconds))
+
+    def session(self, session_id):
+        self._shard().sessions[session_id] = time.monotonic()
+
+    def snapshot(self):
+        """Merged view of every shard, as plain JSON-ready values."""
+        now = time.monotonic()
+        merged = _Shard()
+        with self._lock:
+            self._retire()
+            for shard in [self._retired] + self._shards:
+                _merge_shard(merged, shard, now)
+        counts = merged.counts
+        operations = {}
+        for op in sorted({label for name, label in counts if name == "calls"}):
+            durations = sorted(s for _, s in merged.timings.get(op, ()))
+            operations[op] = {
+                "count": counts[("calls", op)],
+                "seconds": round(counts.get(("seconds", op), 0.0), 6),
+                **{k: _quantile(durations, q) for k, q in QUANTILES.items()},
+            }
+        caches = {}
+        for name in sorted({label for kind, label in counts if kind in ("cache_hits", "cache_misses")}):
+            hits, misses = counts.get(("cache_hits", name), 0), counts.get(("cache_misses", name), 0)
+            caches[name] = {"hits": hits, "misses": misses, "hit_ratio": round(hits / (hits + misses), 4)}
+        uptime = now - self.started
+        recent = sum(1 for t, _ in merged.timings.get("rerun", ()) if t >= now - RATE_WINDOW)
+        return {
+            "uptime_seconds": round(uptime, 1),
+            "active_sessions": len(merged.sessions),
+            "reruns_per_second": round(recent / max(1.0, min(uptime, RATE_WINDOW)), 3),
+            "resident_memory_bytes": process_rss(),
+            "operations": operations,
+            "caches": caches,
+        }
+
+@st.cache_resource(show_spinner=False)
+def get_metrics():
+    return Metrics()
+
+_METRICS = None
+
+def metrics():
+    """The process-wide Metrics (looked up once per script run)."""
+    global _METRICS
+    if _METRICS is None:
+        _METRICS = get_metrics()
+    return _METRICS
+
+def timed(op):
+    """Decorator recording a call's duration under `op`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics().observe(op, time.perf_counter() - t0)
+        return wrapper
+    return decorate
+
+def format_metrics(snap):
+    """Prometheus text exposition of a Metrics.snapshot()."""
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP pharm_assess_{name} {help_text}")
+        lines.append(f"# TYPE pharm_assess_{name} {kind}")
+        for suffix, labels, value in samples:
+            if value is None:
+                continue
+            tags = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"pharm_assess_{name}{suffix}{{{tags}}} {value}" if tags
+                         else f"pharm_assess_{name}{suffix} {value}")
+
+    family("uptime_seconds", "gauge", "Seconds since the first session started the metrics registry.",
+           [("", {}, snap["uptime_seconds"])])
+    family("active_sessions", "gauge", f"Sessions with a rerun in the last {ACTIVE_WINDOW} seconds.",
+           [("", {}, snap["active_sessions"])])
+    family("reruns_per_second", "gauge", f"Script reruns per second over the last {RATE_WINDOW} seconds.",
+           [("", {}, snap["reruns_per_second"])])
+    family("resident_memory_bytes", "gauge", "Process resident set size.",
+           [("", {}, snap["resident_memory_bytes"])])
+    family("duration_seconds", "summary",
+           f"Call durations; quantiles cover the last {LATENCY_WINDOW} seconds.",
+           [s for op, o in snap["operations"].items() for s in
+            [("", {"op": op, "quantile": q}, o[k]) for k, q in QUANTILES.items()]
+            + [("_sum", {"op": op}, o["seconds"]), ("_count", {"op": op}, o["count"])]])
+    family("cache_requests_total", "counter", "Lookups in the process-wide caches.",
+           [s for name, c in snap["caches"].items() for s in
+            [("", {"cache": name, "result": "hit"}, c["hits"]),
+             ("", {"cache": name, "result": "miss"}, c["misses"])]])
+    family("cache_hit_ratio", "gauge", "Share of cache lookups served without a rebuild.",
+           [("", {"cache": name}, c["hit_ratio"]) for name, c in snap["caches"].items()])
+    return "\n".join(lines) + "\n"
+
+def readiness_problem(tenant=DEFAULT_TENANT):
+    """None when the app can serve requests, else a short reason."""
+    try:
+        with get_pool(tenant).connection() as conn:
+            conn.execute("SELECT 1").fetchone()
+    except (sqlite3.Error, OSError, TimeoutError) as exc:
+        return f"database unavailable: {exc}"
+    if not os.access(tenant_dir(tenant), os.W_OK):
+        return "data directory is not writable"
+    return None
+
+@st.cache_resource(show_spinner=False)
+def _metrics_server_state():
+    return {"server": None, "retry_at": 0.0, "lock": threading.Lock()}
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """
+    Serve health and metrics endpoints on a daemon thread (once per process);
+    returns the server, or None while the port is unavailable. A failed start
+    is logged and retried after METRICS_RETRY_SECONDS.
+    """
+    state = _metrics_server_state()
+    if state["server"] is not None:
+        return state["server"]
+    with state["lock"]:
+        if state["server"] is None and time.monotonic() >= state["retry_at"]:
+            try:
+                state["server"] = _serve_metrics(port, host)
+            except OSError as exc:
+                log.warning("Metrics server not started on %s:%s: %s", host, port, exc)
+                state["retry_at"] = time.monotonic() + METRICS_RETRY_SECONDS
+        return state["server"]
+
+def _serve_metrics(port, host):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            status, content_type = 200, "text/plain; charset=utf-8"
+            if path == "/healthz":
+                body = "ok\n"
+            elif path == "/readyz":
+                problem = readiness_problem()
+                status, body = (503, problem + "\n") if problem else (200, "ready\n")
+            elif path == "/metrics":
+                body, content_type = format_metrics(registry.snapshot()), "text/plain; version=0.0.4"
+            elif path == "/metrics.json":
+                body, content_type = json.dumps(registry.snapshot(), indent=2), "application/json"
+            else:
+                status, body = 404, "Not found\n"
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass   # scrapes every few seconds would drown the app log
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+# ─── FRAMEWORK INDEX ──────────────────────────────────────────────────────────
+# Read-only lookups derived from a domains list: item ids per domain, item
+# positions and counts. (Rating labels are per locale; see LOCALIZATION.) Built once per
+# framework shape per process (the built-in DOMAINS and each tenant framework)
+# and shared by every session, so reruns and report builds never re-walk the
+# framework. Indexes are immutable (tuples and MappingProxyType). Lookups go
+# by the domains list's identity first; Streamlit re-executes this module on
+# every rerun, so a fresh DOMAINS list falls back to its shape (domain and
+# item ids) once and is then found by identity for the rest of the run. The
+# registry is shared by every session thread, so it is only touched under its lock.
+
+FRAMEWORK_INDEX_LIMIT = 64   # identity entries kept before the oldest are dropped
+
+def build_framework_index(domains):
+    """Frozen lookup tables for a domains list."""
+    domain_items = {d["id"]: tuple(it["id"] for it in d["items"]) for d in domains}
+    item_ids = tuple(iid for ids in domain_items.values() for iid in ids)
+    return MappingProxyType({
+        "domain_ids": tuple(domain_items),
+        "domain_items": MappingProxyType(domain_items),
+        "domain_sizes": MappingProxyType({k: len(v) for k, v in domain_items.items()}),
+        "item_ids": item_ids,
+        "item_position": MappingProxyType({iid: i for i, iid in enumerate(item_ids)}),
+        "item_domain": MappingProxyType({iid: dom for dom, ids in domain_items.items() for iid in ids}),
+        "total_items": len(item_ids),
+    })
+
+@st.cache_resource(show_spinner=False)
+def _framework_indexes():
+    """Process-wide registry: {"by_id": {id: (domains, index)}, "by_shape": {shape: index}, "lock": Lock}."""
+    return {"by_id": {}, "by_shape": {}, "lock": threading.Lock()}
+
+def framework_index(domains=DOMAINS):
+    """Shared index for a long-lived domains list (DOMAINS or a tenant framework's)."""
+    registry = _framework_indexes()
+    by_id = registry["by_id"]
+    with registry["lock"]:
+        hit = by_id.get(id(domains))
+    if hit is not None and hit[0] is domains:
+        metrics().cache("framework_index", True)
+        return hit[1]
+    shape = tuple((d["id"], tuple(it["id"] for it in d["items"])) for d in domains)
+    with registry["lock"]:
+        index = registry["by_shape"].get(shape)
+        found = index is not None
+        if not found:
+            index = registry["by_shape"][shape] = build_framework_index(domains)
+        while len(by_id) >= FRAMEWORK_INDEX_LIMIT:
+            by_id.pop(next(iter(by_id)), None)
+        by_id[id(domains)] = (domains, index)
+    metrics().cache("framework_index", found)
+    return index
+
+def domain_ratings(ratings, dom_id, index):
+    """{item_id: rating} for one domain, in framework order."""
+    return {iid: ratings.get(iid) for iid in index["domain_items"][dom_id]}
+
+# ─── LOCALIZATION ─────────────────────────────────────────────────────────────
+# English is built in; other languages come from catalogs in LOCALE_DIR
+# (locales/<code>.json). A catalog translates the framework by id (domain
+# title/short/description, item text/low/high, EPA scale entries) and every
+# other string by its English text ("messages"); anything it leaves out stays
+# English. compile_catalog() turns a catalog into frozen lookup tables once per
+# process, and _localized_domains() keeps a translated copy of each tenant's
+# framework, so forms, reports and exports read translated text straight from
+# the domains list and templates they already use: switching locale costs no
+# per-item lookups on reruns or in batch rendering. A catalog whose text needs
+# characters outside WinAnsi (the base-14 PDF fonts' encoding) must name
+# TrueType "fonts" for its PDFs, which are then embedded in every mode.
+
+LOCALE_DIR = os.environ.get("PHARM_ASSESS_LOCALE_DIR",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales"))
+DEFAULT_LOCALE = "en"
+NA_RATING_LABEL = "N/A — Not observed / Not applicable to role"
+
+@st.cache_resource(show_spinner=False)
+def available_locales():
+    """{code: language name} for English and every catalog in LOCALE_DIR."""
+    locales = {DEFAULT_LOCALE: "English"}
+    if os.path.isdir(LOCALE_DIR):
+        for name in sorted(os.listdir(LOCALE_DIR)):
+            if name.endswith(".json"):
+                with open(os.path.join(LOCALE_DIR, name), encoding="utf-8") as fh:
+                    locales[name[:-5]] = json.load(fh).get("name", name[:-5])
+    return locales
+
+@st.cache_resource(show_spinner=False)
+def compile_catalog(locale=DEFAULT_LOCALE):
+    """Frozen lookup tables for a locale (see above)."""
+    raw = {}
+    if locale != DEFAULT_LOCALE:
+        with open(os.path.join(LOCALE_DIR, f"{locale}.json"), encoding="utf-8") as fh:
+            raw = json.load(fh)
+    fonts = raw.get("fonts")
+    if not fonts:
+        try:
+            json.dumps(raw, ensure_ascii=False).encode("cp1252")
+        except UnicodeEncodeError:
+            raise ValueError(f"Catalog {locale!r} uses characters the base-14 PDF fonts lack; "
+                             f"name TrueType files under \"fonts\" to embed")
+    messages = raw.get("messages", {})
+    epa = {v: MappingProxyType({**EPA_SCALE[v], **raw.get("epa", {}).get(str(v), {})}) for v in EPA_SCALE}
+    options = {raw.get("rating_na", NA_RATING_LABEL): 0, **{e["label"]: v for v, e in epa.items()}}
+    labels = tuple(options)
+    return MappingProxyType({
+        "locale": locale,
+        "name": raw.get("name", "English"),
+        "lang": raw.get("lang", "en-US"),
+        "fonts": MappingProxyType({k: os.path.join(LOCALE_DIR, f) for k, f in fonts.items()}) if fonts else None,
+        "messages": MappingProxyType(messages),
+        "domains": MappingProxyType(raw.get("domains", {})),
+        "items": MappingProxyType(raw.get("items", {})),
+        "epa": MappingProxyType(epa),
+        "rating_labels": labels,
+        "label_to_value": MappingProxyType(options),
+        "value_to_label": MappingProxyType({v: k for k, v in options.items()}),
+        "label_position": MappingProxyType({label: i for i, label in enumerate(labels)}),
+    })
+
+def tr(text, catalog=None):
+    """`text` in the catalog's language; English when there is no catalog or translation."""
+    return catalog["messages"].get(text, text) if catalog else text
+
+def localize_domains(domains, catalog):
+    """Copy of a domains list with a catalog's translations; ids, colors and flags are unchanged."""
+    if not (catalog["domains"] or catalog["items"]):
+        return domains
+    return [
+        {**dom, **{k: v for k, v in catalog["domains"].get(dom["id"], {}).items() if k in ("title", "short", "description")},
+         "items": [{**it, **{k: v for k, v in catalog["items"].get(it["id"], {}).items() if k in ("text", "low", "high")}}
+                   for it in dom["items"]]}
+        for dom in domains
+    ]
+
+@st.cache_resource(show_spinner=False)
+def _localized_domains(tenant, locale):
+    return localize_domains(_tenant_domains(tenant), compile_catalog(locale))
+
 # ─── PDF GENERATION ──────────────────────────────────────────────────────────
+# A report is a fixed skeleton (banner, subtitle, section headings, item texts,
+# rating legend, attestation, footer) plus per-assessment values. The skeleton
+# and styles are built by _build_pdf_template(); in template mode they are
+# built once per tenant framework version and shared by every report the
+# process renders. Table cells are wrapped in place during layout, so template
+# mode is meant for the batch pipeline's worker processes, not concurrent UI
+# sessions (which build a fresh skeleton per report).
+
+# ─── PDF OUTPUT MODES ─────────────────────────────────────────────────────────
+#   standard — reportlab defaults (Flate-compressed, ASCII85-armoured streams,
+#              base-14 Helvetica referenced but not embedded)
+#   compact  — Flate-compressed binary streams without the ASCII85 layer,
+#              which is ~25 % of every content stream
+#   archival — compact + the bundled Bitstream Vera fonts embedded as subsets
+#              and full document metadata, for long-term storage. This follows
+#              the PDF/A font and metadata requirements; reportlab's open-source
+#              build cannot write the XMP/OutputIntent blocks, so the output is
+#              not formally PDF/A-validated.
+# Colors are inline content-stream operators and fonts are already shared per
+# document, so the repeated palette and styles cost nothing extra per page;
+# the template cache above shares the style objects themselves across reports.
+# A locale catalog that names its own TrueType fonts (scripts WinAnsi cannot
+# encode) gets them embedded as subsets in every mode.
+
+PDF_MODES = ("standard", "compact", "archival")
+PDF_FONTS = {
+    "standard": {"regular": "Helvetica", "bold": "Helvetica-Bold", "italic": "Helvetica-Oblique"},
+    "archival": {"regular": "Vera", "bold": "VeraBd", "italic": "VeraIt"},
+}
 
-def generate_pdf_report(info, ratings, narratives):
+def pdf_fonts(mode="standard", catalog=None):
+    """Font names for a PDF output mode (and locale), registering embedded fonts on first use."""
+    if catalog and catalog["fonts"]:
+        return _catalog_fonts(catalog)
+    if mode != "archival":
+        return PDF_FONTS["standard"]
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.lib.fonts import addMapping
+    if "Vera" not in pdfmetrics.getRegisteredFontNames():
+        for name in ("Vera", "VeraBd", "VeraIt", "VeraBI"):
+            pdfmetrics.registerFont(TTFont(name, f"{name}.ttf"))
+        pdfmetrics.registerFontFamily("Vera", normal="Vera", bold="VeraBd", italic="VeraIt", boldItalic="VeraBI")
+        addMapping("Vera", 0, 0, "Vera")
+    return PDF_FONTS["archival"]
+
+def _catalog_fonts(catalog):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    paths = catalog["fonts"]
+    names = {style: f"L10n-{catalog['locale']}-{style}" for style in ("regular", "bold", "italic")}
+    if names["regular"] not in pdfmetrics.getRegisteredFontNames():
+        for style, name in names.items():
+            pdfmetrics.registerFont(TTFont(name, paths.get(style, paths["regular"])))
+        pdfmetrics.registerFontFamily(names["regular"], normal=names["regular"], bold=names["bold"],
+                                      italic=names["italic"], boldItalic=names["bold"])
+    return names
+
+class _A85Switch:
+    """Count of running builds that need ASCII85 armouring off."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.off = 0
+
+@st.cache_resource(show_spinner=False)
+def _a85_switch():
+    return _A85Switch()
+
+@contextmanager
+def _binary_streams():
     """
-    Generate a professional PDF assessment report using reportlab.
+    Turn off ASCII85 stream armouring while a compact/archival build runs.
+    reportlab reads this from process-wide config, so the count of builds
+    needing it off lives in one process-wide object shared by every session;
+    a standard build overlapping with one just gets smaller, equally valid output.
     """
+    from reportlab import rl_config
+    switch = _a85_switch()
+    with switch.lock:
+        switch.off += 1
+        rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        with switch.lock:
+            switch.off -= 1
+            if switch.off == 0:
+                rl_config.useA85 = 1
+
+def _build_pdf_template(domains, fonts=None, catalog=None):
+    """Styles and static flowables for a report over `domains` in a catalog's language,
+    or None without reportlab."""
     try:
-        from reportlab.lib.pagesizes import letter
         from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
         from reportlab.lib.units import inch
         from reportlab.lib import colors
         from reportlab.platypus import (
-            SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+            Paragraph, Spacer, Table, TableStyle,
             HRFlowable, KeepTogether,
         )
         from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
     except ImportError:
         return None
 
-    buf = BytesIO()
-    doc = SimpleDocTemplate(
-        buf,
-        pagesize=letter,
-        rightMargin=0.75 * inch,
-        leftMargin=0.75 * inch,
-        topMargin=0.75 * inch,
-        bottomMargin=0.75 * inch,
-    )
-
+    F = fonts or PDF_FONTS["standard"]
+    catalog = catalog or compile_catalog()
+    t = functools.partial(tr, catalog=catalog)
     styles = getSampleStyleSheet()
+    styles["Normal"].fontName = F["regular"]
+    for name in ("Title", "Heading2", "Heading3"):
+        styles[name].fontName = F["bold"]
     # Custom styles
     title_style = ParagraphStyle(
         "Title2",
@@ -519,7 +1059,7 @@ def generate_pdf_report(info, ratings, narratives):
         fontSize=8.5,
         textColor=colors.HexColor("#475569"),
         spaceAfter=2,
-        alignment=TAD_CENTER,
+        alignment=TA_CENTER,
     )
     h2 = ParagraphStyle(
         "H2",
@@ -559,7 +1099,7 @@ def generate_pdf_report(info, ratings, narratives):
         parent=styles["Normal"],
         fontSize=9,
         textColor=colors.HexColor("#0d2b4e"),
-        fontName="Helvetica-Bold",
+        fontName=F["bold"],
     )
     narrative_style = ParagraphStyle(
         "Narrative",
@@ -571,15 +1111,39 @@ def generate_pdf_report(info, ratings, narratives):
         leading=13,
         spaceAfter=6,
     )
-
-    story = []
+    tpl = {
+        "domains": domains,
+        "fonts": F,
+        "catalog": catalog,
+        "h2": h2, "h3": h3, "body": body, "small": small, "label_bold": label_bold,
+        "narrative": narrative_style,
+        "overall_score": ParagraphStyle("OScore", fontName=F["bold"], fontSize=22,
+                                        alignment=TA_CENTER, leading=26),
+        "overall_cat": ParagraphStyle("OCat", fontName=F["bold"], fontSize=11,
+                                      textColor=colors.HexColor("#0d2b4e"), leading=16),
+        "domain_score": ParagraphStyle("DS", fontSize=10, fontName=F["bold"]),
+        "rating": ParagraphStyle("Rt", fontSize=10, fontName=F["bold"], alignment=TA_CENTER),
+        "followup": ParagraphStyle("FU", fontName=F["regular"], fontSize=9, textColor=colors.HexColor("#1e293b"),
+                                   backColor=colors.HexColor("#fefce8"), borderPad=6),
+        "category_styles": {},
+        # Per-report strings, translated here once rather than on every report.
+        "category": {c: t(c) for c in SCORE_BANDS + [perf_category(None)]},
+        "epa_short": {v: e["short"] for v, e in catalog["epa"].items()},
+        "text": {k: t(k) for k in (
+            "N/A", "out of 5.0", "Not Observed", "Recommended Follow-Up:", "{ordinal} percentile",
+            "{start} to {end}", "{n} of {total} items rated  •  {scored} scored observations",
+            "Compared with {label} (n = {n} peer assessments). "
+            "Percentiles are shown when at least {min_n} peers are rated.",
+        )},
+        "bench_hdr": [Paragraph(f"<b>{t(h)}</b>", label_bold) for h in ("Domain", "Score", "Peer Percentile")],
+    }
 
     # ── Header Banner ──────────────────────────────────────────────────────
     header_data = [[
         Paragraph(
-            "<b>CLINICAL PHARMACIST PERFORMANCE ASSESSMENT</b><br/>"
-            "<font size=8 color='#93c5fd'>Acute Care Hospital — Peer/Manager Review</font>",
-            ParagraphStyle("HeaderBanner", fontName="Helvetica-Bold", fontSize=13,
+            f"<b>{t('CLINICAL PHARMACIST PERFORMANCE ASSESSMENT')}</b><br/>"
+            f"<font size=8 color='#93c5fd'>{t('Acute Care Hospital — Peer/Manager Review')}</font>",
+            ParagraphStyle("HeaderBanner", fontName=F["bold"], fontSize=13,
                            textColor=colors.white, leading=18, alignment=TA_CENTER)
         )
     ]]
@@ -592,35 +1156,305 @@ def generate_pdf_report(info, ratings, narratives):
         ("RIGHTPADDING",  (0, 0), (-1, -1), 16),
         ("ROUNDEDCORNERS", [6]),
     ]))
-    story.append(header_tbl)
-    story.append(Spacer(1, 10))
+    rule = HRFlowable(width="100%", thickness=1, color=colors.HexColor("#bfdbfe"))
+    tpl["rule"] = rule
+    tpl["header"] = [
+        header_tbl,
+        Spacer(1, 10),
+        Paragraph(
+            t("Grounded in ASHP Accreditation Standards (2024), ACCP Clinical Pharmacist Competencies, "
+              "and the JCPP Pharmacists' Patient Care Process (PPCP)"), sub_style
+        ),
+        Spacer(1, 8),
+        rule,
+        Spacer(1, 10),
+    ]
 
-    story.append(Paragraph(
-        "Grounded in ASHP Accreditation Standards (2024), ACCP Clinical Pharmacist Competencies, "
-        "and the JCPP Pharmacists' Patient Care Process (PPCP)", sub_style
-    ))
-    story.append(Spacer(1, 8))
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#bfdbfe")))
-    story.append(Spacer(1, 10))
+    # ── Section headings and labels ───────────────────────────────────────
+    tpl["headings"] = {
+        key: Paragraph(t(text), h2) for key, text in [
+            ("info", "ASSESSMENT INFORMATION"),
+            ("overall", "OVERALL PERFORMANCE SUMMARY"),
+            ("domains", "DOMAIN SCORES SUMMARY"),
+            ("benchmark", "PEER BENCHMARK"),
+            ("profile", "SCORE PROFILE"),
+            ("detail", "DETAILED ASSESSMENT RATINGS"),
+            ("narrative", "NARRATIVE ASSESSMENT"),
+            ("attestation", "ASSESSOR ATTESTATION"),
+        ]
+    }
+    tpl["labels"] = {}
+    for label in [
+        "Pharmacist Being Assessed:", "Pharmacist Credentials:", "Clinical Unit / Service:",
+        "Assessor Name & Credentials:", "Assessor Role:", "Assessment Type:", "Assessment Date:",
+        "Observation Period:", "Assessment Context / Notes:", "Date:", "Signature:",
+        "Pharmacist Acknowledgment:",
+    ]:
+        tpl["labels"][label] = Paragraph(t(label), label_bold)
+    tpl["domain_hdr"] = [
+        Paragraph(f"<b>{t('Domain')}</b>", label_bold),
+        Paragraph(f"<b>{t('Avg Score')}</b>", label_bold),
+        Paragraph(f"<b>{t('Performance Category')}</b>", label_bold),
+        Paragraph(f"<b>{t('Items Rated')}</b>", label_bold),
+    ]
+    tpl["legend"] = Paragraph(
+        t("Rating Scale:") + " " + "  |  ".join(f"{v} = {e['short']}" for v, e in catalog["epa"].items())
+        + f"  |  {t('N/A')} = {t('Not Observed')}",
+        small
+    )
+
+    # ── Chart frames ─────────────────────────────────────────────────────
+    tpl["charts"] = _build_chart_frames(domains, F, t("N/A"))
+    if tpl["charts"]:
+        tpl["chart_legend"] = Paragraph(
+            t("Left: domain averages. Right: item ratings by domain ({legend}). "
+              "Shading follows the performance category bands.").format(legend=tpl["charts"]["legend"]), small
+        )
+
+    # ── Detailed ratings: domain titles, header row and item texts ────────
+    tpl["detail_hdr"] = [
+        Paragraph(f"<b>{t('Assessment Item')}</b>", ParagraphStyle("DH", fontName=F["bold"], fontSize=8, textColor=colors.white)),
+        Paragraph(f"<b>{t('Rating')}</b>", ParagraphStyle("DH2", fontName=F["bold"], fontSize=8, textColor=colors.white, alignment=TA_CENTER)),
+        Paragraph(f"<b>{t('Performance Category')}</b>", ParagraphStyle("DH3", fontName=F["bold"], fontSize=8, textColor=colors.white)),
+    ]
+    item_style = ParagraphStyle("It", fontName=F["regular"], fontSize=8, leading=11, textColor=colors.HexColor("#1e293b"))
+    tpl["domain_titles"] = {dom["id"]: Paragraph(dom["title"], h3) for dom in domains}
+    tpl["items"] = {}
+    for dom in domains:
+        for item in dom["items"]:
+            optional_tag = f" <font color='#94a3b8'>{t('[Optional]')}</font>" if item.get("optional") else ""
+            tpl["items"][item["id"]] = Paragraph(item["text"] + optional_tag, item_style)
+
+    # ── Narrative titles ──────────────────────────────────────────────────
+    tpl["narrative_titles"] = {
+        key: Paragraph(t(title), h3) for key, title in [
+            ("strengths", "Clinical Strengths"),
+            ("development", "Areas for Development"),
+            ("goals", "Action Plan / Goals"),
+            ("summary", "Overall Performance Summary"),
+        ]
+    }
+    tpl["no_comments"] = Paragraph(f"<i>{t('No comments provided.')}</i>",
+                                   ParagraphStyle("NC", fontSize=8.5, textColor=colors.HexColor("#94a3b8"), fontName=F["italic"]))
+
+    # ── Attestation ──────────────────────────────────────────────────────
+    attest_text = (
+        "I attest that this assessment reflects my objective professional judgment of the pharmacist's "
+        "performance based on direct observation and/or review of clinical work during the specified "
+        "observation period. This evaluation was conducted in accordance with the institution's peer review "
+        "process and is intended to support professional development, not punitive action. I have no conflict "
+        "of interest that would compromise the objectivity of this assessment."
+    )
+    tpl["attestation"] = Paragraph(t(attest_text), body)
+    tpl["ack"] = Paragraph("□ " + t("I have reviewed this assessment and discussed it with my assessor."), body)
+    tpl["signature_line"] = Paragraph("____________________________", body)
+
+    # ── Footer ───────────────────────────────────────────────────────────
+    tpl["footer"] = [
+        HRFlowable(width="100%", thickness=0.5, color=colors.HexColor("#cbd5e1")),
+        Spacer(1, 6),
+        Paragraph(
+            t("CONFIDENTIAL — For Peer Review / Quality Improvement Purposes Only  •  "
+              "Protected under applicable peer review confidentiality statutes  •  "
+              "Grounded in ASHP Accreditation Standards (2024), ACCP Clinical Pharmacist Competencies (2019), "
+              "and JCPP Pharmacists' Patient Care Process  •  Generated by Clinical Pharmacist Assessment Tool v1.0"),
+            ParagraphStyle("Footer", fontName=F["regular"], fontSize=6.5, textColor=colors.HexColor("#94a3b8"),
+                           alignment=TA_CENTER, leading=10)
+        ),
+    ]
+    return tpl
+
+def get_pdf_template(tenant=DEFAULT_TENANT, version=FRAMEWORK_VERSION, mode="standard", locale=None):
+    """Report skeleton for a tenant's framework, built once per process, version, output mode
+    and locale (default: the tenant's)."""
+    key = (tenant, version, mode, locale or tenant_locale(tenant))
+    registry = _pdf_templates()
+    with registry["lock"]:
+        tpl = registry["templates"].get(key)
+        metrics().cache("pdf_template", tpl is not None)
+        if tpl is None:
+            catalog = compile_catalog(key[3])
+            tpl = registry["templates"][key] = _build_pdf_template(
+                get_framework(tenant, key[3])["domains"], pdf_fonts(mode, catalog), catalog)
+    return tpl
+
+@st.cache_resource(show_spinner=False)
+def _pdf_templates():
+    """Process-wide registry: {"templates": {(tenant, version, mode, locale): template}, "lock": Lock}."""
+    return {"templates": {}, "lock": threading.Lock()}
+
+def _category_style(tpl, color):
+    styles = tpl["category_styles"]
+    if color not in styles:
+        from reportlab.lib.styles import ParagraphStyle
+        from reportlab.lib import colors
+        styles[color] = ParagraphStyle("Cat", fontName=tpl["fonts"]["regular"], fontSize=8,
+                                       textColor=colors.HexColor(color))
+    return styles[color]
+
+# ─── PDF CHARTS ───────────────────────────────────────────────────────────────
+# Radar chart of domain averages and bar chart of item ratings, drawn with
+# reportlab.graphics (no matplotlib). Everything that depends only on the
+# framework — rings, spokes, axes, band shading, labels — is built once into
+# a frame Group stored in the report template (so it is cached per framework
+# version with get_pdf_template); a report only adds its data shapes on top.
+
+CHART_W, CHART_H = 3.45 * 72, 2.9 * 72
+BAND_RANGES = [(0, 1.75), (1.75, 2.75), (2.75, 3.5), (3.5, 4.5), (4.5, 5)]   # score_color cut points
+
+def _wrap_label(text, width=16):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return lines + [line]
+
+def _radar_geometry(n):
+    cx, cy, r = CHART_W / 2, CHART_H / 2 - 4, CHART_H / 2 - 34
+    angles = [math.pi / 2 - 2 * math.pi * i / n for i in range(n)]
+    return cx, cy, r, angles
+
+def _radar_points(values, n):
+    cx, cy, r, angles = _radar_geometry(n)
+    pts = []
+    for v, a in zip(values, angles):
+        pts += [cx + r * (v or 0) / 5 * math.cos(a), cy + r * (v or 0) / 5 * math.sin(a)]
+    return pts
+
+def _build_chart_frames(domains, fonts, na_text="N/A"):
+    """Static radar and bar chart frames for a framework, or None without reportlab.graphics."""
+    try:
+        from reportlab.graphics.shapes import Group, Polygon, Line, String, Rect
+        from reportlab.lib import colors
+    except ImportError:
+        return None
+    grid = colors.HexColor("#cbd5e1")
+    label = colors.HexColor("#334155")
+    n = len(domains)
+
+    # ── Radar: band-shaded rings (outermost first), spokes, ring values, labels
+    radar = Group()
+    cx, cy, r, angles = _radar_geometry(n)
+    for lo, hi in reversed(BAND_RANGES):
+        radar.add(Polygon(_radar_points([hi] * n, n), fillColor=colors.HexColor(score_bg(lo if lo else 1)),
+                          strokeColor=None))
+    for ring in range(1, 6):
+        radar.add(Polygon(_radar_points([ring] * n, n), fillColor=None, strokeColor=grid, strokeWidth=0.5))
+        radar.add(String(cx + 2, cy + r * ring / 5 + 1, str(ring), fontName=fonts["regular"], fontSize=6,
+                         fillColor=colors.HexColor("#94a3b8")))
+    for dom, a in zip(domains, angles):
+        radar.add(Line(cx, cy, cx + r * math.cos(a), cy + r * math.sin(a), strokeColor=grid, strokeWidth=0.5))
+        lx, ly = cx + (r + 8) * math.cos(a), cy + (r + 8) * math.sin(a)
+        anchor = "middle" if abs(math.cos(a)) < 0.3 else ("start" if math.cos(a) > 0 else "end")
+        lines = _wrap_label(dom["short"])
+        top = ly + (3 if math.sin(a) > 0.3 else -8 if math.sin(a) < -0.3 else 0) + 7 * (len(lines) - 1) / 2
+        for i, text in enumerate(lines):
+            radar.add(String(lx, top - 7.5 * i, text, fontName=fonts["bold"], fontSize=6.5,
+                             fillColor=label, textAnchor=anchor))
+
+    # ── Bars: band strips, gridlines, y labels, domain groups
+    bars = Group()
+    x0, y0, plot_w, plot_h = 22, 26, CHART_W - 28, CHART_H - 40
+    for lo, hi in BAND_RANGES:
+        bars.add(Rect(x0, y0 + plot_h * lo / 5, plot_w, plot_h * (hi - lo) / 5,
+                      fillColor=colors.HexColor(score_bg(lo if lo else 1)), strokeColor=None))
+    for v in range(0, 6):
+        y = y0 + plot_h * v / 5
+        bars.add(Line(x0, y, x0 + plot_w, y, strokeColor=grid, strokeWidth=0.5 if v else 1))
+        bars.add(String(x0 - 4, y - 2, str(v) if v else na_text, fontName=fonts["regular"], fontSize=6,
+                        fillColor=colors.HexColor("#64748b"), textAnchor="end"))
+    n_items = framework_index(domains)["total_items"]
+    slot = plot_w / (n_items + len(domains) - 1)   # one empty slot between domains
+    slots, i = [], 0
+    for d_idx, dom in enumerate(domains):
+        start = i
+        for _ in dom["items"]:
+            slots.append(x0 + slot * i)
+            i += 1
+        mid = x0 + slot * (start + i) / 2
+        bars.add(String(mid, y0 - 10, dom["id"].upper(), fontName=fonts["bold"], fontSize=6.5,
+                        fillColor=label, textAnchor="middle"))
+        if d_idx < len(domains) - 1:
+            sep = x0 + slot * (i + 0.5)
+            bars.add(Line(sep, y0, sep, y0 + plot_h, strokeColor=grid, strokeWidth=0.5, strokeDashArray=[2, 2]))
+            i += 1
+    return {"radar": radar, "bars": bars, "bar_slots": slots, "bar_slot": slot, "bar_origin": (x0, y0, plot_h),
+            "legend": " · ".join(f"{d['id'].upper()} = {d['short']}" for d in domains)}
+
+def chart_flowables(frames, ratings, domains):
+    """Radar and bar chart Drawings for one report: shared frames plus this report's data."""
+    from reportlab.graphics.shapes import Drawing, Polygon, Circle, Rect
+    from reportlab.lib import colors
+
+    idx = framework_index(domains)
+    avgs = [calc_domain_avg(domain_ratings(ratings, d["id"], idx)) for d in domains]
+    radar = Drawing(CHART_W, CHART_H)
+    radar.add(frames["radar"])
+    pts = _radar_points(avgs, len(domains))
+    radar.add(Polygon(pts, fillColor=colors.Color(0.05, 0.17, 0.31, alpha=0.18),
+                      strokeColor=colors.HexColor("#0d2b4e"), strokeWidth=1.2))
+    for (x, y), v in zip(zip(pts[::2], pts[1::2]), avgs):
+        if v:
+            radar.add(Circle(x, y, 2.4, fillColor=colors.HexColor(score_color(v)), strokeColor=colors.white,
+                             strokeWidth=0.5))
+
+    bars = Drawing(CHART_W, CHART_H)
+    bars.add(frames["bars"])
+    x0, y0, plot_h = frames["bar_origin"]
+    w = frames["bar_slot"] * 0.72
+    for x, iid in zip(frames["bar_slots"], idx["item_ids"]):
+        v = ratings.get(iid) or 0
+        if v > 0:
+            bars.add(Rect(x + (frames["bar_slot"] - w) / 2, y0, w, plot_h * v / 5,
+                          fillColor=colors.HexColor(score_color(v)), strokeColor=None))
+        else:
+            bars.add(Rect(x + (frames["bar_slot"] - w) / 2, y0, w, 1.5,
+                          fillColor=colors.HexColor("#94a3b8"), strokeColor=None))
+    return radar, bars
+
+def build_pdf_story(info, ratings, narratives, domains=DOMAINS, template=None, benchmark=None):
+    """
+    Build the reportlab flowables for one assessment report without rendering them.
+    Pass a template from get_pdf_template() to reuse its skeleton (its domains win),
+    and a peer_benchmark() result to add the optional percentile section.
+    Returns None if reportlab is not installed.
+    """
+    tpl = template or _build_pdf_template(domains)
+    if tpl is None:
+        return None
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, KeepTogether
+
+    domains = tpl["domains"]
+    h2, body, small, label_bold = tpl["h2"], tpl["body"], tpl["small"], tpl["label_bold"]
+    labels, text, catalog = tpl["labels"], tpl["text"], tpl["catalog"]
+
+    story = list(tpl["header"])
 
     # ── Assessment Info Table ─────────────────────────────────────────────
-    story.append(Paragraph("ASSESSMENT INFORMATION", h2))
+    story.append(tpl["headings"]["info"])
 
     def info_row(label, value):
         return [
-            Paragraph(label, label_bold),
+            labels[label],
             Paragraph(str(value) if value else "—", body),
         ]
 
     info_data = [
         info_row("Pharmacist Being Assessed:", info.get("pharmacist_name", "")),
         info_row("Pharmacist Credentials:", info.get("pharmacist_credentials", "")),
-        info_row("Clinical Unit / Service:", info.get("unit", "")),
+        info_row("Clinical Unit / Service:", tr(info.get("unit", ""), catalog)),
         info_row("Assessor Name & Credentials:", info.get("assessor_name", "") + ((" " + info.get("assessor_credentials", "")) if info.get("assessor_credentials") else "")),
-        info_row("Assessor Role:", info.get("assessor_role", "")),
-        info_row("Assessment Type:", info.get("assessment_type", "")),
+        info_row("Assessor Role:", tr(info.get("assessor_role", ""), catalog)),
+        info_row("Assessment Type:", tr(info.get("assessment_type", ""), catalog)),
         info_row("Assessment Date:", str(info.get("assessment_date", ""))),
-        info_row("Observation Period:", f"{info.get('obs_start', '')} to {info.get('obs_end', '')}"),
+        info_row("Observation Period:", text["{start} to {end}"].format(start=info.get("obs_start", ""),
+                                                                         end=info.get("obs_end", ""))),
         info_row("Assessment Context / Notes:", info.get("context_notes", "")),
     ]
     info_tbl = Table(info_data, colWidths=[2.2 * inch, 4.8 * inch])
@@ -637,31 +1471,32 @@ def generate_pdf_report(info, ratings, narratives):
     story.append(Spacer(1, 12))
 
     # ── Overall Score ─────────────────────────────────────────────────────
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#bfdbfe")))
+    story.append(tpl["rule"])
     story.append(Spacer(1, 8))
-    story.append(Paragraph("OVERALL PERFORMANCE SUMMARY", h2))
+    story.append(tpl["headings"]["overall"])
 
     all_vals = [v for v in ratings.values() if v and v > 0]
     overall = round(sum(all_vals) / len(all_vals), 2) if all_vals else None
-    category = perf_category(overall)
+    category = tpl["category"][perf_category(overall)]
     n_rated = len(all_vals)
-    total_items = sum(len(d["items"]) for d in DOMAINS)
+    idx = framework_index(domains)
+    total_items = idx["total_items"]
 
-    oc = colors.HexColor(score_color(overall)) if overall else colors.HexColor("#94a3b8")
+    oc = score_color(overall) if overall else "#94a3b8"
 
     overall_data = [[
         Paragraph(
-            f"<b>{overall if overall else 'N/A'}</b><br/>"
-            f"<font size=9>out of 5.0</font>",
-            ParagraphStyle("OScore", fontName="Helvetica-Bold", fontSize=22,
-                           textColor=oc, alignment=TA_CENTER, leading=26)
+            f"<font color='{oc}'><b>{overall if overall else text['N/A']}</b><br/>"
+            f"<font size=9>{text['out of 5.0']}</font></font>",
+            tpl["overall_score"]
         ),
         Paragraph(
             f"<b>{category}</b><br/>"
-            f"<font size=8 color='#475569'>{n_rated} of {total_items} items rated  •  "
-            f"{len(all_vals)} scored observations</font>",
-            ParagraphStyle("OCat", fontName="Helvetica-Bold", fontSize=11,
-                           textColor=colors.HexColor("#0d2b4e"), leading=16)
+            f"<font size=8 color='#475569'>"
+            + text["{n} of {total} items rated  •  {scored} scored observations"].format(
+                n=n_rated, total=total_items, scored=len(all_vals))
+            + "</font>",
+            tpl["overall_cat"]
         ),
     ]]
     otbl = Table(overall_data, colWidths=[1.5 * inch, 5.5 * inch])
@@ -679,26 +1514,18 @@ def generate_pdf_report(info, ratings, narratives):
     story.append(Spacer(1, 12))
 
     # ── Domain Score Summary Table ────────────────────────────────────────
-    story.append(Paragraph("DOMAIN SCORES SUMMARY", h2))
+    story.append(tpl["headings"]["domains"])
 
-    domain_hdr = [
-        Paragraph("<b>Domain</b>", label_bold),
-        Paragraph("<b>Avg Score</b>", label_bold),
-        Paragraph("<b>Performance Category</b>", label_bold),
-        Paragraph("<b>Items Rated</b>", label_bold),
-    ]
-    domain_rows = [domain_hdr]
-    for dom in DOMAINS:
-        item_ids = [it["id"] for it in dom["items"]]
-        dom_ratings = {k: ratings.get(k) for k in item_ids}
+    domain_rows = [tpl["domain_hdr"]]
+    for dom in domains:
+        dom_ratings = domain_ratings(ratings, dom["id"], idx)
         avg = calc_domain_avg(dom_ratings)
         n = len([v for v in dom_ratings.values() if v and v > 0])
-        sc = colors.HexColor(score_color(avg)) if avg else colors.HexColor("#94a3b8")
         domain_rows.append([
             Paragraph(dom["short"], body),
             Paragraph(f"<b><font color='{score_color(avg)}'>{avg if avg else '—'}</font></b>",
-                      ParagraphStyle("DS", fontSize=10, fontName="Helvetica-Bold")),
-            Paragraph(perf_category(avg), small),
+                      tpl["domain_score"]),
+            Paragraph(tpl["category"][perf_category(avg)], small),
             Paragraph(f"{n} / {len(dom['items'])}", body),
         ])
     dtbl = Table(domain_rows, colWidths=[2.5 * inch, 1.0 * inch, 2.7 * inch, 0.8 * inch])
@@ -716,43 +1543,75 @@ def generate_pdf_report(info, ratings, narratives):
     story.append(dtbl)
     story.append(Spacer(1, 14))
 
+    # ── Score Profile Charts ──────────────────────────────────────────────
+    if tpl["charts"]:
+        radar, bars = chart_flowables(tpl["charts"], ratings, domains)
+        ctbl = Table([[radar, bars]], colWidths=[3.5 * inch, 3.5 * inch])
+        ctbl.setStyle(TableStyle([
+            ("LEFTPADDING",   (0, 0), (-1, -1), 0),
+            ("RIGHTPADDING",  (0, 0), (-1, -1), 0),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ]))
+        story.append(KeepTogether([tpl["headings"]["profile"], ctbl, Spacer(1, 4), tpl["chart_legend"]]))
+        story.append(Spacer(1, 14))
+
+    # ── Peer Benchmark (optional) ─────────────────────────────────────────
+    if benchmark:
+        bench_rows = [tpl["bench_hdr"]]
+        for row in benchmark["rows"]:
+            pct = row["percentile"]
+            bench_rows.append([
+                Paragraph(f"<b>{row['domain']}</b>" if row["id"] == "overall" else row["domain"], body),
+                Paragraph(f"<b><font color='{score_color(row['score'])}'>{row['score'] or '—'}</font></b>",
+                          tpl["domain_score"]),
+                Paragraph(text["{ordinal} percentile"].format(ordinal=ordinal(pct)) if pct is not None else "—", body),
+            ])
+        btbl = Table(bench_rows, colWidths=[3.0 * inch, 1.2 * inch, 2.8 * inch])
+        btbl.setStyle(TableStyle([
+            ("BACKGROUND",  (0, 0), (-1, 0), colors.HexColor("#f0f7ff")),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#f8fafc"), colors.white]),
+            ("TOPPADDING",    (0, 0), (-1, -1), 5),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+            ("LEFTPADDING",   (0, 0), (-1, -1), 8),
+            ("RIGHTPADDING",  (0, 0), (-1, -1), 8),
+            ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#e2e8f0")),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]))
+        story.append(KeepTogether([
+            tpl["headings"]["benchmark"],
+            Paragraph(text["Compared with {label} (n = {n} peer assessments). "
+                           "Percentiles are shown when at least {min_n} peers are rated."].format(
+                label=benchmark["label"], n=benchmark["n"], min_n=COHORT_MIN_SIZE), small),
+            Spacer(1, 4),
+            btbl,
+        ]))
+        story.append(Spacer(1, 14))
+
     # ── Detailed Ratings by Domain ────────────────────────────────────────
-    story.append(Paragraph("DETAILED ASSESSMENT RATINGS", h2))
-    story.append(Paragraph(
-        "Rating Scale: 1 = Needs Significant Development  |  2 = Developing  |  "
-        "3 = Progressing  |  4 = Meets Expectations  |  5 = Exemplary  |  N/A = Not Observed",
-        small
-    ))
+    story.append(tpl["headings"]["detail"])
+    story.append(tpl["legend"])
     story.append(Spacer(1, 6))
 
-    for dom in DOMAINS:
+    for dom in domains:
         dom_block = []
-        dom_block.append(Paragraph(dom["title"], h3))
+        dom_block.append(copy(tpl["domain_titles"][dom["id"]]))
 
-        detail_hdr = [
-            Paragraph("<b>Assessment Item</b>", ParagraphStyle("DH", fontName="Helvetica-Bold", fontSize=8, textColor=colors.white)),
-            Paragraph("<b>Rating</b>", ParagraphStyle("DH2", fontName="Helvetica-Bold", fontSize=8, textColor=colors.white, alignment=TA_CENTER)),
-            Paragraph("<b>Performance Category</b>", ParagraphStyle("DH3", fontName="Helvetica-Bold", fontSize=8, textColor=colors.white)),
-        ]
-        det_rows = [detail_hdr]
+        det_rows = [tpl["detail_hdr"]]
         for item in dom["items"]:
             rating = ratings.get(item["id"])
-            optional_tag = " <font color='#94a3b8'>[Optional]</font>" if item.get("optional") else ""
             if rating and rating > 0:
-                r_label = EPA_SCALE[rating]["short"]
+                r_label = tpl["epa_short"][rating]
                 r_color = score_color(rating)
             else:
-                r_label = "N/A"
+                r_label = text["N/A"]
                 r_color = "#94a3b8"
             det_rows.append([
-                Paragraph(item["text"] + optional_tag,
-                          ParagraphStyle("It", fontSize=8, leading=11, textColor=colors.HexColor("#1e293b"))),
+                tpl["items"][item["id"]],
                 Paragraph(
-                    f"<b><font color='{r_color}'>{rating if (rating and rating > 0) else 'N/A'}</font></b>",
-                    ParagraphStyle("Rt", fontSize=10, fontName="Helvetica-Bold", alignment=TA_CENTER)
+                    f"<b><font color='{r_color}'>{rating if (rating and rating > 0) else text['N/A']}</font></b>",
+                    tpl["rating"]
                 ),
-                Paragraph(r_label if rating else "Not Observed",
-                          ParagraphStyle("Cat", fontSize=8, textColor=colors.HexColor(r_color))),
+                Paragraph(r_label if rating else text["Not Observed"], _category_style(tpl, r_color)),
             ])
 
         det_tbl = Table(det_rows, colWidths=[3.9 * inch, 0.7 * inch, 2.4 * inch])
@@ -771,61 +1630,51 @@ def generate_pdf_report(info, ratings, narratives):
         story.append(KeepTogether(dom_block))
 
     # ── Narrative Sections ────────────────────────────────────────────────
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#bfdbfe")))
+    story.append(tpl["rule"])
     story.append(Spacer(1, 8))
-    story.append(Paragraph("NARRATIVE ASSESSMENT", h2))
+    story.append(tpl["headings"]["narrative"])
 
-    def narrative_block(title, content):
+    def narrative_block(key, content):
         blk = []
-        blk.append(Paragraph(title, h3))
+        blk.append(tpl["narrative_titles"][key])
         if content and content.strip():
-            blk.append(Paragraph(content.replace("\n", "<br/>"), narrative_style))
+            blk.append(Paragraph(content.replace("\n", "<br/>"), tpl["narrative"]))
         else:
-            blk.append(Paragraph("<i>No comments provided.</i>",
-                                  ParagraphStyle("NC", fontSize=8.5, textColor=colors.HexColor("#94a3b8"), fontName="Helvetica-Oblique")))
+            blk.append(tpl["no_comments"])
         blk.append(Spacer(1, 6))
         return blk
 
-    story += narrative_block("Clinical Strengths", narratives.get("strengths", ""))
-    story += narrative_block("Areas for Development", narratives.get("development", ""))
-    story += narrative_block("Action Plan / Goals", narratives.get("goals", ""))
-    story += narrative_block("Overall Performance Summary", narratives.get("summary", ""))
+    story += narrative_block("strengths", narratives.get("strengths", ""))
+    story += narrative_block("development", narratives.get("development", ""))
+    story += narrative_block("goals", narratives.get("goals", ""))
+    story += narrative_block("summary", narratives.get("summary", ""))
 
     story.append(Paragraph(
-        f"<b>Recommended Follow-Up:</b> {narratives.get('followup', '—')}",
-        ParagraphStyle("FU", fontSize=9, textColor=colors.HexColor("#1e293b"),
-                       backColor=colors.HexColor("#fefce8"), borderPad=6)
+        f"<b>{text['Recommended Follow-Up:']}</b> {tr(narratives.get('followup', '—'), catalog)}",
+        tpl["followup"]
     ))
     story.append(Spacer(1, 16))
 
     # ── Attestation ──────────────────────────────────────────────────────
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#bfdbfe")))
+    story.append(tpl["rule"])
     story.append(Spacer(1, 8))
-    story.append(Paragraph("ASSESSOR ATTESTATION", h2))
-
-    attest_text = (
-        "I attest that this assessment reflects my objective professional judgment of the pharmacist's "
-        "performance based on direct observation and/or review of clinical work during the specified "
-        "observation period. This evaluation was conducted in accordance with the institution's peer review "
-        "process and is intended to support professional development, not punitive action. I have no conflict "
-        "of interest that would compromise the objectivity of this assessment."
-    )
-    story.append(Paragraph(attest_text, body))
+    story.append(tpl["headings"]["attestation"])
+    story.append(tpl["attestation"])
     story.append(Spacer(1, 16))
 
     attest_data = [
-        [Paragraph("Assessor Name & Credentials:", label_bold),
+        [labels["Assessor Name & Credentials:"],
          Paragraph(info.get("assessor_name", "") + " " + info.get("assessor_credentials", ""), body),
-         Paragraph("Date:", label_bold),
+         labels["Date:"],
          Paragraph(str(info.get("assessment_date", "")), body)],
-        [Paragraph("Assessor Role:", label_bold),
-         Paragraph(info.get("assessor_role", ""), body),
-         Paragraph("Signature:", label_bold),
-         Paragraph("____________________________", body)],
-        [Paragraph("Pharmacist Acknowledgment:", label_bold),
-         Paragraph("□ I have reviewed this assessment and discussed it with my assessor.", body),
-         Paragraph("Date:", label_bold),
-         Paragraph("____________________________", body)],
+        [labels["Assessor Role:"],
+         Paragraph(tr(info.get("assessor_role", ""), catalog), body),
+         labels["Signature:"],
+         tpl["signature_line"]],
+        [labels["Pharmacist Acknowledgment:"],
+         tpl["ack"],
+         labels["Date:"],
+         tpl["signature_line"]],
     ]
     atbl = Table(attest_data, colWidths=[1.8 * inch, 2.4 * inch, 1.0 * inch, 1.8 * inch])
     atbl.setStyle(TableStyle([
@@ -841,92 +1690,2782 @@ def generate_pdf_report(info, ratings, narratives):
     story.append(Spacer(1, 16))
 
     # ── Footer ───────────────────────────────────────────────────────────
-    story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor("#cbd5e1")))
+    story += tpl["footer"]
+    # Layout marks top-level flowables (e.g. _postponed), so template
+    # flowables go in as shallow copies; parsed paragraph text is still shared.
+    return [copy(f) for f in story]
+
+def render_pdf_story(story, mode="standard", title="", author="", lang="en-US"):
+    """Lay out and render a story built by build_pdf_story into a PDF buffer."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate
+
+    buf = BytesIO()
+    doc = SimpleDocTemplate(
+        buf,
+        pagesize=letter,
+        rightMargin=0.75 * inch,
+        leftMargin=0.75 * inch,
+        topMargin=0.75 * inch,
+        bottomMargin=0.75 * inch,
+        pageCompression=1,
+        title=title,
+        author=author,
+        subject="Clinical Pharmacist Performance Assessment — Confidential Peer Review",
+        creator="Clinical Pharmacist Assessment Tool v1.0",
+        lang=lang if mode == "archival" else None,
+    )
+    if mode == "standard":
+        doc.build(story)
+    else:
+        with _binary_streams():
+            doc.build(story)
+    buf.seek(0)
+    return buf
+
+@timed("generate_pdf_report")
+def generate_pdf_report(info, ratings, narratives, domains=DOMAINS, template=None, mode="standard",
+                        benchmark=None, catalog=None):
+    """
+    Generate a professional PDF assessment report using reportlab, in the
+    template's language (or `catalog`'s when building a fresh skeleton).
+    """
+    if template is None and (mode == "archival" or catalog):
+        template = _build_pdf_template(domains, pdf_fonts(mode, catalog), catalog)
+    story = build_pdf_story(info, ratings, narratives, domains, template, benchmark)
+    if story is None:
+        return None
+    catalog = template["catalog"] if template else None
+    title = tr("Performance Assessment — {name}", catalog).format(name=info.get("pharmacist_name", ""))
+    return render_pdf_story(story, mode, title, info.get("assessor_name", ""),
+                            catalog["lang"] if catalog else "en-US")
+
+# ─── BATCH PDF PIPELINE ──────────────────────────────────────────────────────
+# Report rendering is CPU-bound pure Python, so batches are spread over a
+# process pool sized to the machine. Reportlab flowables are not cheap to
+# pickle, so each worker builds and renders its own story from the tenant's
+# shared report template; the parent only ships (info, ratings, narratives) and
+# a locale code in and PDF bytes out. At most `max_pending` reports are in flight at once, which
+# caps memory regardless of batch size, and results come back in input order.
+
+def _render_record(record, tenant, mode, locale=None):
+    info, ratings, narratives = record
+    template = get_pdf_template(tenant, mode=mode, locale=locale)
+    buf = generate_pdf_report(info, ratings, narratives, template=template, mode=mode)
+    return buf.getvalue() if buf else None
+
+def generate_pdf_reports(records, max_workers=None, max_pending=None, tenant=DEFAULT_TENANT, mode="standard",
+                         locale=None):
+    """
+    Render an iterable of (info, ratings, narratives) tuples in parallel and
+    yield PDF bytes (or None if reportlab is unavailable) in input order.
+    `locale` defaults to the tenant's.
+    """
+    yield from _ordered_pool_map(_render_record, records, max_workers, max_pending, tenant, mode, locale)
+
+def _ordered_pool_map(fn, items, max_workers=None, max_pending=None, *args):
+    """Yield fn(item, *args) for each item from a process pool, in input order."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or max_workers * 2
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item, *args))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# ─── COMPARISON REPORTS ───────────────────────────────────────────────────────
+# One PDF comparing two or more assessments (last year vs this year, manager
+# vs peer). The banner, item texts, legend and footer are laid out once with a
+# rating column per assessment; the change column is always last minus first.
+# Department batches reuse the batch pipeline's process pool.
+
+DELTA_UP, DELTA_DOWN, DELTA_NONE = "#16a34a", "#dc2626", "#94a3b8"
+
+def _delta_text(first, last):
+    """Signed change between two scores as PDF markup, or an em dash if either is missing."""
+    if first is None or last is None:
+        return f"<font color='{DELTA_NONE}'>—</font>"
+    delta = round(last - first, 2)
+    clr = DELTA_UP if delta > 0 else DELTA_DOWN if delta < 0 else DELTA_NONE
+    return f"<b><font color='{clr}'>{delta:+g}</font></b>"
+
+def comparison_label(info):
+    """Default column heading for an assessment in a comparison report."""
+    return f"{info.get('assessment_date', '')}<br/>{info.get('assessor_name', '') or '—'}"
+
+def build_comparison_story(records, labels=None, domains=DOMAINS, template=None):
+    """
+    Build flowables comparing a sequence of (info, ratings, narratives), oldest
+    or baseline first. Returns None if reportlab is not installed.
+    """
+    if len(records) < 2:
+        raise ValueError("A comparison report needs at least two assessments.")
+    tpl = template or _build_pdf_template(domains)
+    if tpl is None:
+        return None
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, KeepTogether
+
+    domains = tpl["domains"]
+    idx = framework_index(domains)
+    body, small, label_bold = tpl["body"], tpl["small"], tpl["label_bold"]
+    t = functools.partial(tr, catalog=tpl["catalog"])
+    na = tpl["text"]["N/A"]
+    labels = labels or [comparison_label(info) for info, _, _ in records]
+    n = len(records)
+    grid = [
+        ("TOPPADDING",    (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ("LEFTPADDING",   (0, 0), (-1, -1), 6),
+        ("RIGHTPADDING",  (0, 0), (-1, -1), 6),
+        ("GRID", (0, 0), (-1, -1), 0.4, colors.HexColor("#e2e8f0")),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+    head_row = [Paragraph(f"<b>{lbl}</b>", label_bold) for lbl in labels]
+
+    story = list(tpl["header"])
+
+    # ── Assessments compared ──────────────────────────────────────────────
+    story.append(Paragraph(t("ASSESSMENTS COMPARED"), tpl["h2"]))
+    info_rows = [[Paragraph("", label_bold)] + head_row]
+    for label, key in [("Pharmacist Being Assessed:", "pharmacist_name"), ("Clinical Unit / Service:", "unit"),
+                       ("Assessor Role:", "assessor_role"), ("Assessment Type:", "assessment_type")]:
+        info_rows.append([tpl["labels"][label]] + [Paragraph(t(str(info.get(key) or "—")), body)
+                                                    for info, _, _ in records])
+    overalls = [calc_overall_avg(r) for _, r, _ in records]
+    info_rows.append([Paragraph(t("Overall Score:"), label_bold)] + [
+        Paragraph(f"<b><font color='{score_color(v)}'>{v if v else na}</font></b>  "
+                  f"<font size=7.5>{tpl['category'][perf_category(v)]}</font>", body) for v in overalls
+    ])
+    col_w = 5.0 * inch / n
+    itbl = Table(info_rows, colWidths=[2.0 * inch] + [col_w] * n)
+    itbl.setStyle(TableStyle(grid + [
+        ("ROWBACKGROUNDS", (0, 0), (-1, -1), [colors.HexColor("#f8fafc"), colors.white]),
+    ]))
+    story.append(itbl)
+    story.append(Spacer(1, 12))
+
+    # ── Domain average changes ────────────────────────────────────────────
+    story.append(Paragraph(t("DOMAIN AVERAGE CHANGES"), tpl["h2"]))
+    dom_rows = [[Paragraph(f"<b>{t('Domain')}</b>", label_bold)] + head_row
+                + [Paragraph(f"<b>{t('Change')}</b>", label_bold)]]
+    for dom in domains + [None]:
+        if dom is None:
+            avgs, name = overalls, f"<b>{t('Overall')}</b>"
+        else:
+            avgs = [calc_domain_avg(domain_ratings(r, dom["id"], idx)) for _, r, _ in records]
+            name = dom["short"]
+        dom_rows.append([Paragraph(name, body)] + [
+            Paragraph(f"<b><font color='{score_color(v)}'>{v if v else '—'}</font></b>", tpl["domain_score"])
+            for v in avgs
+        ] + [Paragraph(_delta_text(avgs[0], avgs[-1]), tpl["domain_score"])])
+    col_w = 4.2 * inch / n
+    dtbl = Table(dom_rows, colWidths=[2.0 * inch] + [col_w] * n + [0.8 * inch])
+    dtbl.setStyle(TableStyle(grid + [
+        ("BACKGROUND",  (0, 0), (-1, 0), colors.HexColor("#f0f7ff")),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#f8fafc"), colors.white]),
+    ]))
+    story.append(dtbl)
+    story.append(Spacer(1, 14))
+
+    # ── Per-item deltas ───────────────────────────────────────────────────
+    story.append(Paragraph(t("ITEM RATINGS AND CHANGES"), tpl["h2"]))
+    story.append(tpl["legend"])
     story.append(Spacer(1, 6))
+    col_w = 0.55 * inch
+    item_w = 7.0 * inch - col_w * n - 0.65 * inch
+    for dom in domains:
+        rows = [[tpl["detail_hdr"][0]] + [Paragraph(f"<b>{i + 1}</b>", tpl["rating"]) for i in range(n)]
+                + [Paragraph("<b>Δ</b>", tpl["rating"])]]
+        for item in dom["items"]:
+            vals = [r.get(item["id"]) or None for _, r, _ in records]
+            rows.append([tpl["items"][item["id"]]] + [
+                Paragraph(f"<b><font color='{score_color(v)}'>{v or na}</font></b>", tpl["rating"])
+                for v in vals
+            ] + [Paragraph(_delta_text(vals[0], vals[-1]), tpl["rating"])])
+        tbl = Table(rows, colWidths=[item_w] + [col_w] * n + [0.65 * inch])
+        tbl.setStyle(TableStyle(grid + [
+            ("BACKGROUND",  (0, 0), (-1, 0), colors.HexColor("#1a4a7a")),
+            ("TEXTCOLOR",   (0, 0), (-1, 0), colors.white),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.HexColor("#f8fafc"), colors.white]),
+        ]))
+        story.append(KeepTogether([copy(tpl["domain_titles"][dom["id"]]), tbl, Spacer(1, 8)]))
     story.append(Paragraph(
-        "CONFIDENTIAL — For Peer Review / Quality Improvement Purposes Only  •  "
-        "Protected under applicable peer review confidentiality statutes  •  "
-        "Grounded in ASHP Accreditation Standards (2024), ACCP Clinical Pharmacist Competencies (2019), "
-        "and JCPP Pharmacists' Patient Care Process  •  Generated by Clinical Pharmacist Assessment Tool v1.0",
-        ParagraphStyle("Footer", fontSize=6.5, textColor=colors.HexColor("#94a3b8"),
-                       alignment=TA_CENTER, leading=10)
+        t("Columns 1–{n} follow the order of the assessments compared above; {delta} is the last minus the first.")
+        .format(n=n, delta="Δ"),
+        small
     ))
 
-    doc.build(story)
-    buf.seek(0)
-    return buf
+    # ── Narratives side by side ───────────────────────────────────────────
+    story.append(tpl["rule"])
+    story.append(Spacer(1, 8))
+    story.append(tpl["headings"]["narrative"])
+    # One table row per narrative line, so long comments can break across pages.
+    col_w = 7.0 * inch / n
+    for key in tpl["narrative_titles"]:
+        columns = [[ln for ln in (narratives.get(key) or "").strip().split("\n") if ln.strip()]
+                   for _, _, narratives in records]
+        rows = [head_row]
+        for i in range(max(1, max(len(c) for c in columns))):
+            rows.append([
+                Paragraph(html.escape(c[i]), body) if i < len(c) else tpl["no_comments"] if i == 0 else ""
+                for c in columns
+            ])
+        story.append(tpl["narrative_titles"][key])
+        ntbl = Table(rows, colWidths=[col_w] * n, repeatRows=1)
+        ntbl.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f0f7ff")),
+            ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#f8fafc")),
+            ("TOPPADDING",    (0, 0), (-1, -1), 2),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+            ("LEFTPADDING",   (0, 0), (-1, -1), 6),
+            ("RIGHTPADDING",  (0, 0), (-1, -1), 6),
+            ("BOX", (0, 0), (-1, -1), 0.4, colors.HexColor("#e2e8f0")),
+            ("LINEAFTER", (0, 0), (-2, -1), 0.4, colors.HexColor("#e2e8f0")),
+            ("LINEBELOW", (0, 0), (-1, 0), 0.4, colors.HexColor("#e2e8f0")),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]))
+        story.append(ntbl)
+        story.append(Spacer(1, 6))
+    fu = Table([head_row, [Paragraph(t(nar.get("followup") or "—"), body) for _, _, nar in records]],
+               colWidths=[col_w] * n)
+    fu.setStyle(TableStyle(grid + [("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#fefce8"))]))
+    story.append(Paragraph(t("Recommended Follow-Up"), tpl["h3"]))
+    story.append(fu)
+    story.append(Spacer(1, 16))
+
+    story += tpl["footer"]
+    return [copy(f) for f in story]
+
+def generate_comparison_report(records, labels=None, domains=DOMAINS, template=None, mode="standard", catalog=None):
+    """Render a side-by-side comparison PDF for two or more assessments."""
+    if template is None and (mode == "archival" or catalog):
+        template = _build_pdf_template(domains, pdf_fonts(mode, catalog), catalog)
+    story = build_comparison_story(records, labels, domains, template)
+    if story is None:
+        return None
+    catalog = template["catalog"] if template else None
+    title = tr("Assessment Comparison — {name}", catalog).format(name=records[-1][0].get("pharmacist_name", ""))
+    return render_pdf_story(story, mode, title, lang=catalog["lang"] if catalog else "en-US")
+
+def _render_comparison(records, tenant, mode, locale=None):
+    template = get_pdf_template(tenant, mode=mode, locale=locale)
+    buf = generate_comparison_report(records, template=template, mode=mode)
+    return buf.getvalue() if buf else None
+
+def generate_comparison_reports(groups, max_workers=None, max_pending=None, tenant=DEFAULT_TENANT, mode="standard",
+                                locale=None):
+    """
+    Render comparisons for an iterable of record lists in parallel and yield
+    PDF bytes (or None if reportlab is unavailable) in input order.
+    `locale` defaults to the tenant's.
+    """
+    yield from _ordered_pool_map(_render_comparison, groups, max_workers, max_pending, tenant, mode, locale)
+
+def department_comparison_groups(unit=None, tenant=DEFAULT_TENANT, last=2):
+    """
+    Group saved assessments by pharmacist (optionally within one unit) and
+    return {pharmacist_name: [assessment_id, ...]} holding each pharmacist's
+    `last` most recent assessment ids, oldest first. Pharmacists with a single
+    assessment are left out. Only ids and names are read; load the records
+    with load_assessment when a report is actually rendered.
+    """
+    cipher = get_field_cipher(tenant)
+    where, params = ("WHERE unit = ? ", (unit,)) if unit else ("", ())
+    groups = {}
+    with get_pool(tenant).connection() as conn:
+        for row in conn.execute(
+            f"SELECT id, pharmacist_name FROM assessments {where}ORDER BY assessment_date, updated_at, id", params
+        ):
+            ids = groups.setdefault(open_value(cipher, row["pharmacist_name"], f"{row['id']}/pharmacist_name") or "—", [])
+            ids.append(row["id"])
+            del ids[:-last]
+    return {name: ids for name, ids in sorted(groups.items()) if len(ids) > 1}
 
 # ─── CSV EXPORT ───────────────────────────────────────────────────────────────
 
-def export_csv(info, ratings, narratives):
+@timed("export_csv")
+def export_csv(info, ratings, narratives, domains=DOMAINS, catalog=None):
     """Export assessment to a flat CSV suitable for Smartsheet / Excel import."""
+    df = pd.DataFrame([csv_row(info, ratings, narratives, domains, catalog)])
+    buf = BytesIO()
+    df.to_csv(buf, index=False)
+    buf.seek(0)
+    return buf
+
+CSV_OPTION_FIELDS = ("unit", "assessor_role", "assessment_type")   # stored in English, exported translated
+
+def csv_row(info, ratings, narratives, domains=DOMAINS, catalog=None):
+    """One assessment as an ordered {column: value} dict in the export_csv layout,
+    with headers and option values in the catalog's language (pass localized domains)."""
+    t = functools.partial(tr, catalog=catalog)
     row = {}
 
     # Info fields
     for k, v in info.items():
-        row[k.replace("_", " ").title()] = v
+        row[t(k.replace("_", " ").title())] = t(v) if k in CSV_OPTION_FIELDS else v
 
     # Domain averages
-    for dom in DOMAINS:
-        item_ids = [it["id"] for it in dom["items"]]
-        dom_ratings = {k: ratings.get(k) for k in item_ids}
-        avg = calc_domain_avg(dom_ratings)
-        row[f"Domain Avg — {dom['short']}"] = avg if avg else ""
+    idx = framework_index(domains)
+    avg_col = t("Domain Avg — {domain}")
+    for dom in domains:
+        avg = calc_domain_avg(domain_ratings(ratings, dom["id"], idx))
+        row[avg_col.format(domain=dom["short"])] = avg if avg else ""
 
     # Overall
     all_vals = [v for v in ratings.values() if v and v > 0]
-    row["Overall Average Score"] = round(sum(all_vals) / len(all_vals), 2) if all_vals else ""
-    row["Overall Performance Category"] = perf_category(row["Overall Average Score"] if row["Overall Average Score"] else None)
-    row["Items Rated (n)"] = len(all_vals)
+    overall = round(sum(all_vals) / len(all_vals), 2) if all_vals else ""
+    row[t("Overall Average Score")] = overall
+    row[t("Overall Performance Category")] = t(perf_category(overall if overall else None))
+    row[t("Items Rated (n)")] = len(all_vals)
 
     # Individual item ratings
-    for dom in DOMAINS:
+    na = t("N/A")
+    for dom in domains:
         for item in dom["items"]:
             col = f"[{dom['short']}] {item['text'][:80]}"
             v = ratings.get(item["id"])
-            row[col] = v if (v and v > 0) else "N/A"
+            row[col] = v if (v and v > 0) else na
 
     # Narratives
-    row["Strengths"] = narratives.get("strengths", "")
-    row["Areas for Development"] = narratives.get("development", "")
-    row["Action Plan / Goals"] = narratives.get("goals", "")
-    row["Overall Summary"] = narratives.get("summary", "")
-    row["Recommended Follow-Up"] = narratives.get("followup", "")
-    row["Attestation Confirmed"] = narratives.get("attestation", False)
-
-    df = pd.DataFrame([row])
-    buf = BytesIO()
-    df.to_csv(buf, index=False)
-    buf.seek(0)
-    return buf
+    row[t("Strengths")] = narratives.get("strengths", "")
+    row[t("Areas for Development")] = narratives.get("development", "")
+    row[t("Action Plan / Goals")] = narratives.get("goals", "")
+    row[t("Overall Summary")] = narratives.get("summary", "")
+    row[t("Recommended Follow-Up")] = t(narratives.get("followup", ""))
+    row[t("Attestation Confirmed")] = narratives.get("attestation", False)
+    return row
+
+# ─── EXCEL EXPORT ─────────────────────────────────────────────────────────────
+# Native workbook for one or many assessments: a Summary sheet (domain
+# averages, overall, category), one sheet per domain with the full item text as
+# column headers, and a Narratives sheet. xlsxwriter's constant_memory mode
+# flushes each row to disk as soon as the next one starts, so every sheet is
+# written one assessment-row at a time and memory stays flat for any batch size.
+
+XLSX_INFO_COLUMNS = [
+    ("pharmacist_name", "Pharmacist"),
+    ("pharmacist_credentials", "Credentials"),
+    ("unit", "Clinical Unit / Service"),
+    ("assessor_name", "Assessor"),
+    ("assessor_role", "Assessor Role"),
+    ("assessment_type", "Assessment Type"),
+    ("assessment_date", "Assessment Date"),
+    ("obs_start", "Observation Start"),
+    ("obs_end", "Observation End"),
+]
+
+def _sheet_name(name, used):
+    name = "".join("-" if c in "[]:*?/\\" else c for c in name)[:31]
+    base, n = name, 2
+    while name.lower() in used:
+        suffix = f" ({n})"
+        name, n = base[:31 - len(suffix)] + suffix, n + 1
+    used.add(name.lower())
+    return name
+
+def export_xlsx(assessments, domains=DOMAINS, output=None):
+    """
+    Write an iterable of (info, ratings, narratives) to an .xlsx workbook.
+    `output` may be a file path (best for large exports) or omitted for an
+    in-memory buffer. Returns the path/buffer, or None if xlsxwriter is missing.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        return None
+
+    target = output if output is not None else BytesIO()
+    wb = xlsxwriter.Workbook(target, {"constant_memory": True, "strings_to_numbers": False})
+    hdr = wb.add_format({"bold": True, "font_color": "white", "bg_color": "#0d2b4e",
+                         "text_wrap": True, "valign": "top", "border": 1})
+    wrap = wb.add_format({"text_wrap": True, "valign": "top"})
+    num = wb.add_format({"num_format": "0.00", "align": "center"})
+    center = wb.add_format({"align": "center"})
+    bands = [wb.add_format({"bg_color": score_bg(v), "font_color": score_color(v)}) for v in (1, 2, 3, 4, 5)]
+    edges = [0.01, *SCORE_BAND_EDGES, 5.01]
+
+    used = set()
+    info_headers = [label for _, label in XLSX_INFO_COLUMNS]
+
+    summary = wb.add_worksheet(_sheet_name("Summary", used))
+    sum_headers = info_headers + [f"{d['short']} Avg" for d in domains] + [
+        "Overall Average", "Overall Performance Category", "Items Rated (n)"]
+    summary.write_row(0, 0, sum_headers, hdr)
+    summary.set_column(0, len(sum_headers) - 1, 16)
+    summary.freeze_panes(1, 1)
+    first, last = len(info_headers), len(info_headers) + len(domains)
+    for fmt, lo, hi in zip(bands, edges[:-1], edges[1:]):
+        summary.conditional_format(1, first, 1048575, last, {
+            "type": "cell", "criteria": "between", "minimum": lo, "maximum": hi - 0.0001, "format": fmt,
+        })
+
+    idx = framework_index(domains)
+    dom_sheets = []
+    for dom in domains:
+        ws = wb.add_worksheet(_sheet_name(dom["short"], used))
+        headers = ["Pharmacist", "Assessment Date", "Domain Avg"] + [
+            item["text"] + (" [Optional]" if item.get("optional") else "") for item in dom["items"]]
+        ws.set_row(0, 120)
+        ws.write_row(0, 0, headers, hdr)
+        ws.set_column(0, 1, 18)
+        ws.set_column(2, len(headers) - 1, 28)
+        ws.freeze_panes(1, 1)
+        dom_sheets.append((dom, ws))
+
+    narr = wb.add_worksheet(_sheet_name("Narratives", used))
+    narr_cols = [("strengths", "Strengths"), ("development", "Areas for Development"),
+                 ("goals", "Action Plan / Goals"), ("summary", "Overall Summary"),
+                 ("followup", "Recommended Follow-Up")]
+    narr.write_row(0, 0, ["Pharmacist", "Assessment Date", "Assessment Context / Notes"]
+                   + [label for _, label in narr_cols] + ["Attestation Confirmed"], hdr)
+    narr.set_column(0, 1, 18)
+    narr.set_column(2, 2 + len(narr_cols), 50)
+    narr.freeze_panes(1, 1)
+
+    row = 0
+    for info, ratings, narratives in assessments:
+        row += 1
+        who = [info.get("pharmacist_name", ""), str(info.get("assessment_date", ""))]
+
+        all_vals = [v for v in ratings.values() if v and v > 0]
+        overall = round(sum(all_vals) / len(all_vals), 2) if all_vals else None
+        summary.write_row(row, 0, [str(info.get(k, "") or "") for k, _ in XLSX_INFO_COLUMNS])
+        col = len(info_headers)
+        for dom, ws in dom_sheets:
+            avg = calc_domain_avg(domain_ratings(ratings, dom["id"], idx))
+            if avg:
+                summary.write_number(row, col, avg, num)
+                ws.write_number(row, 2, avg, num)
+            ws.write_row(row, 0, who)
+            for j, item in enumerate(dom["items"]):
+                v = ratings.get(item["id"])
+                ws.write(row, 3 + j, v if (v and v > 0) else "N/A", center)
+            col += 1
+        if overall:
+            summary.write_number(row, col, overall, num)
+        summary.write(row, col + 1, perf_category(overall))
+        summary.write_number(row, col + 2, len(all_vals))
+
+        narr.write_row(row, 0, who)
+        narr.write(row, 2, info.get("context_notes", "") or "", wrap)
+        for j, (key, _) in enumerate(narr_cols):
+            narr.write(row, 3 + j, narratives.get(key, "") or "", wrap)
+        narr.write(row, 3 + len(narr_cols), "Yes" if narratives.get("attestation") else "No")
+
+    wb.close()
+    if output is None:
+        target.seek(0)
+    return target
+
+# ─── ASSESSMENT STORAGE ───────────────────────────────────────────────────────
+# Saved assessments live in a small SQLite database (full record as JSON) plus a
+# fixed-width binary rating matrix: one uint8 row per assessment, one column per
+# DOMAINS item in framework order, 0 = N/A. The matrix is what analytics scan.
+
+DATA_DIR = os.environ.get("PHARM_ASSESS_DATA_DIR", "data")
+
+ITEM_IDS = framework_index(DOMAINS)["item_ids"]
+
+def tenant_dir(tenant=DEFAULT_TENANT):
+    """Storage partition for a tenant; the default tenant lives at the data root."""
+    if tenant == DEFAULT_TENANT:
+        return DATA_DIR
+    return os.path.join(DATA_DIR, "tenants", tenant)
+
+def db_path(tenant=DEFAULT_TENANT):
+    return os.path.join(tenant_dir(tenant), "assessments.db")
+
+def matrix_path(tenant=DEFAULT_TENANT):
+    return os.path.join(tenant_dir(tenant), "ratings.u8")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id              TEXT PRIMARY KEY,
+    created_at      TEXT NOT NULL,
+    updated_at      TEXT NOT NULL,
+    pharmacist_name TEXT,
+    assessor_name   TEXT,
+    unit            TEXT,
+    assessment_type TEXT,
+    assessment_date TEXT,
+    info_json       TEXT NOT NULL,
+    ratings_json    TEXT NOT NULL,
+    narratives_json TEXT NOT NULL,
+    matrix_row      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_assessments_updated ON assessments(updated_at);
+CREATE INDEX IF NOT EXISTS ix_assessments_unit ON assessments(unit, assessment_date);
+
+-- Offline-app client ids and the server-assigned assessment ids they map to.
+CREATE TABLE IF NOT EXISTS sync_clients (
+    client_id     TEXT PRIMARY KEY,
+    assessment_id TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_assessments_matrix_row ON assessments(matrix_row);
+
+-- Full-text index over the narrative fields; rowid = assessments.matrix_row.
+CREATE VIRTUAL TABLE IF NOT EXISTS narratives_fts USING fts5(
+    strengths, development, goals, summary, context_notes,
+    tokenize = 'porter unicode61'
+);
+
+-- In-progress forms, autosaved on every rerun.
+CREATE TABLE IF NOT EXISTS drafts (
+    id         TEXT PRIMARY KEY,
+    updated_at TEXT NOT NULL,
+    state_json TEXT NOT NULL
+);
+
+-- Append-only log of form field changes, one stream per draft. Rows are
+-- never updated or deleted; audit_snapshots only caches replayed state.
+CREATE TABLE IF NOT EXISTS audit_events (
+    seq       INTEGER PRIMARY KEY AUTOINCREMENT,
+    stream_id TEXT NOT NULL,
+    ts        TEXT NOT NULL,
+    actor     TEXT,
+    field     TEXT NOT NULL,
+    old_json  TEXT,
+    new_json  TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_audit_events_stream ON audit_events(stream_id, seq);
+CREATE TABLE IF NOT EXISTS audit_snapshots (
+    stream_id  TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    ts         TEXT NOT NULL,
+    state_json TEXT NOT NULL,
+    PRIMARY KEY (stream_id, seq)
+);
+"""
+_SCHEMA_VERSION = 4   # 2: narratives_fts, 3: drafts, 4: audit log
+
+NARRATIVE_FIELDS = ("strengths", "development", "goals", "summary")
+
+# ─── STORAGE CONNECTIONS ──────────────────────────────────────────────────────
+# Streamlit runs every session's script on its own thread, so connections are
+# pooled per tenant database and shared across sessions via st.cache_resource
+# instead of being opened on each rerun. The database runs in WAL mode, so
+# readers never block the writer. Writers are serialized by SQLite's own write
+# lock (BEGIN IMMEDIATE), which also covers offline_server.py and
+# report_pipeline.py running as separate processes; app.py keeps no locks of
+# its own at module level, since every rerun gets fresh module globals. Each
+# pooled connection keeps sqlite3's prepared-statement cache warm for the
+# fixed SQL strings used below. Any
+# backend that offers the same `connection()` context manager yielding a
+# DB-API connection can stand in for ConnectionPool.
+
+POOL_SIZE = int(os.environ.get("PHARM_ASSESS_POOL_SIZE", "8"))
+
+def _setup_assessments_db(conn, tenant=DEFAULT_TENANT):
+    conn.executescript(_SCHEMA)
+    cipher = get_field_cipher(tenant)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        with conn:
+            _reindex_narratives(conn, cipher)
+            conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+    if cipher is not None:
+        seal_stored_fields(conn, cipher)
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections to one database file."""
+
+    def __init__(self, path, size=POOL_SIZE, timeout=30.0, setup=_setup_assessments_db):
+        self.path = path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        with self.connection() as conn:
+            setup(conn)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; blocks (up to `timeout`) when all are in use."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free database connection for {self.path}")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+@st.cache_resource(show_spinner=False)
+def get_pool(tenant=DEFAULT_TENANT):
+    """Process-wide connection pool for a tenant's database."""
+    os.makedirs(tenant_dir(tenant), exist_ok=True)
+    return ConnectionPool(db_path(tenant), setup=functools.partial(_setup_assessments_db, tenant=tenant))
+
+# ─── FIELD ENCRYPTION ─────────────────────────────────────────────────────────
+# With a master key configured (PHARM_ASSESS_KEY: 32 random bytes, base64; or
+# PHARM_ASSESS_KEY_FILE naming a file that holds it), names, credentials and
+# free text are stored sealed with AES-256-GCM: a fresh nonce per value, and
+# the record and field name as associated data, so a sealed value copied onto
+# another record or field fails to open. Ratings (ratings_json and the rating
+# matrix) and the unit/type/date columns stay plaintext, so analytics scans
+# never decrypt anything. Keys are derived per tenant with HKDF once per
+# process. narratives_fts can't index ciphertext, so with a key it holds keyed
+# hashes of each word instead: search still ranks with bm25 but matches whole
+# words only (no stemming), and snippets are rebuilt from the decrypted text.
+# Without a key nothing is sealed. Once a key is set, rows, drafts and audit
+# events still in plaintext are sealed the first time the tenant's database
+# is opened.
+
+SEALED_PREFIX = "enc1:"
+SENSITIVE_FIELDS = frozenset({
+    "pharmacist_name", "pharmacist_credentials", "assessor_name", "assessor_credentials",
+    "context_notes", *NARRATIVE_FIELDS,
+})
+
+def _master_key():
+    path = os.environ.get("PHARM_ASSESS_KEY_FILE")
+    if path:
+        with open(path, "rb") as fh:
+            raw = fh.read().strip()
+    else:
+        raw = os.environ.get("PHARM_ASSESS_KEY", "").strip().encode("ascii")
+    if not raw:
+        return None
+    key = base64.b64decode(raw, validate=True)
+    if len(key) != 32:
+        raise ValueError("PHARM_ASSESS_KEY must be 32 bytes, base64-encoded")
+    return key
+
+class FieldCipher:
+    """Seals and opens one tenant's sensitive values; hashes words for the search index."""
+
+    def __init__(self, aead, mac_key):
+        self._aead = aead
+        self._mac = hmac.new(mac_key, digestmod=hashlib.sha256)
+        # Narratives reuse a small vocabulary, so most words hit this cache.
+        self.word_hash = functools.lru_cache(maxsize=1 << 16)(self._word_hash)
+
+    def encrypt(self, data, context):
+        nonce = os.urandom(12)
+        return nonce + self._aead.encrypt(nonce, data, context.encode("utf-8"))
+
+    def decrypt(self, blob, context):
+        try:
+            return self._aead.decrypt(blob[:12], blob[12:], context.encode("utf-8"))
+        except Exception as exc:   # cryptography's InvalidTag: wrong key, or moved/altered data
+            raise RuntimeError(f"Could not decrypt {context}: wrong key or altered data") from exc
+
+    def seal(self, text, context):
+        return SEALED_PREFIX + base64.b64encode(self.encrypt(text.encode("utf-8"), context)).decode("ascii")
+
+    def open(self, token, context):
+        return self.decrypt(base64.b64decode(token[len(SEALED_PREFIX):]), context).decode("utf-8")
+
+    def _word_hash(self, word):
+        mac = self._mac.copy()
+        mac.update(word.encode("utf-8"))
+        return mac.hexdigest()[:16]
+
+@st.cache_resource(show_spinner=False)
+def get_field_cipher(tenant=DEFAULT_TENANT):
+    """Process-wide FieldCipher for a tenant, or None when no key is configured."""
+    master = _master_key()
+    if master is None:
+        return None
+    try:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    except ImportError:
+        # A key means the data must not be written in the clear: refuse rather than fall back.
+        raise RuntimeError("Field encryption requires cryptography. Run: pip install cryptography")
+    key = HKDF(algorithm=hashes.SHA256(), length=64, salt=None,
+               info=f"pharm-assess/{tenant}".encode("utf-8")).derive(master)
+    return FieldCipher(AESGCM(key[:32]), key[32:])
+
+def is_sealed(value):
+    return isinstance(value, str) and value.startswith(SEALED_PREFIX)
+
+def open_value(cipher, value, context):
+    """Plaintext of a stored value; values that were never sealed pass through."""
+    if not is_sealed(value):
+        return value
+    if cipher is None:
+        raise RuntimeError("Stored data is encrypted; set PHARM_ASSESS_KEY or PHARM_ASSESS_KEY_FILE to read it")
+    return cipher.open(value, context)
+
+def seal_fields(cipher, values, context):
+    """Copy of a dict with its sensitive text fields sealed; `values` itself when cipher is None."""
+    if cipher is None:
+        return values
+    return {k: cipher.seal(v, f"{context}/{k}") if k in SENSITIVE_FIELDS and isinstance(v, str) else v
+            for k, v in values.items()}
+
+def open_fields(cipher, values, context):
+    """Inverse of seal_fields."""
+    return {k: open_value(cipher, v, f"{context}/{k}") for k, v in values.items()}
+
+def _seal_json(cipher, value_json, context):
+    return cipher.seal(value_json, context) if cipher is not None else value_json
+
+def _open_json(cipher, stored, context):
+    return json.loads(open_value(cipher, stored, context))
+
+def _audit_context(stream_id, field, side):
+    return f"audit/{stream_id}/{field}/{side}"
+
+def seal_stored_fields(conn, cipher):
+    """
+    Seal everything a FieldCipher covers that is still stored in plaintext:
+    assessment names and text (re-indexing their search rows), drafts, audit
+    values for sensitive fields, audit actors and audit snapshots. Returns
+    the number of assessments sealed.
+    """
+    with conn:
+        rows = conn.execute(
+            "SELECT id, matrix_row, info_json, narratives_json FROM assessments "
+            "WHERE COALESCE(pharmacist_name, '') NOT LIKE 'enc1:%'"
+        ).fetchall()
+        for row in rows:
+            info = open_fields(cipher, json.loads(row["info_json"]), row["id"])
+            narratives = open_fields(cipher, json.loads(row["narratives_json"]), row["id"])
+            names = seal_fields(cipher, {"pharmacist_name": info.get("pharmacist_name", ""),
+                                         "assessor_name": info.get("assessor_name", "")}, row["id"])
+            conn.execute(
+                "UPDATE assessments SET pharmacist_name = ?, assessor_name = ?, info_json = ?, "
+                "narratives_json = ? WHERE id = ?",
+                (names["pharmacist_name"], names["assessor_name"],
+                 json.dumps(seal_fields(cipher, info, row["id"]), default=str),
+                 json.dumps(seal_fields(cipher, narratives, row["id"])), row["id"]),
+            )
+            _index_narratives(conn, row["matrix_row"], info, narratives, cipher)
+        conn.executemany(
+            "UPDATE drafts SET state_json = ? WHERE id = ?",
+            [(cipher.seal(r["state_json"], f"draft/{r['id']}"), r["id"]) for r in conn.execute(
+                "SELECT id, state_json FROM drafts WHERE state_json NOT LIKE 'enc1:%'")],
+        )
+        marks = ", ".join("?" * len(SENSITIVE_FIELDS))
+        conn.executemany(
+            "UPDATE audit_events SET actor = ?, old_json = ?, new_json = ? WHERE seq = ?",
+            [(e[2], e[4], e[5], r["seq"]) for r in conn.execute(
+                "SELECT seq, stream_id, ts, actor, field, old_json, new_json FROM audit_events "
+                "WHERE actor NOT LIKE 'enc1:%' "
+                f"OR (field IN ({marks}) AND new_json NOT LIKE 'enc1:%')",
+                tuple(SENSITIVE_FIELDS)) for e in [_seal_event(cipher, tuple(r)[1:])]],
+        )
+        conn.executemany(
+            "UPDATE audit_snapshots SET state_json = ? WHERE stream_id = ? AND seq = ?",
+            [(cipher.seal(r["state_json"], f"audit/{r['stream_id']}"), r["stream_id"], r["seq"])
+             for r in conn.execute("SELECT stream_id, seq, state_json FROM audit_snapshots "
+                                   "WHERE state_json NOT LIKE 'enc1:%'")],
+        )
+    return len(rows)
+
+# ─── ASSESSMENT RECORDS ───────────────────────────────────────────────────────
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+def _index_narratives(conn, matrix_row, info, narratives, cipher=None):
+    texts = [*(narratives.get(k) or "" for k in NARRATIVE_FIELDS), info.get("context_notes") or ""]
+    if cipher is not None:
+        texts = [" ".join(cipher.word_hash(w) for w in _words(t)) for t in texts]
+    conn.execute("DELETE FROM narratives_fts WHERE rowid = ?", (matrix_row,))
+    conn.execute(
+        "INSERT INTO narratives_fts (rowid, strengths, development, goals, summary, context_notes) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (matrix_row, *texts),
+    )
+
+def _reindex_narratives(conn, cipher=None):
+    conn.execute("DELETE FROM narratives_fts")
+    for row in conn.execute("SELECT id, matrix_row, info_json, narratives_json FROM assessments"):
+        _index_narratives(conn, row["matrix_row"], open_fields(cipher, json.loads(row["info_json"]), row["id"]),
+                          open_fields(cipher, json.loads(row["narratives_json"]), row["id"]), cipher)
+
+def ratings_to_row(ratings, item_ids=ITEM_IDS):
+    """Pack a ratings dict into one matrix row (framework item order, 0 = N/A)."""
+    return bytes(int(ratings.get(iid) or 0) for iid in item_ids)
+
+def save_assessment(info, ratings, narratives, assessment_id=None,
+                    tenant=DEFAULT_TENANT, item_ids=ITEM_IDS):
+    """Insert or update an assessment in the tenant's partition; returns its id."""
+    return save_assessments([(info, ratings, narratives, assessment_id)], tenant, item_ids)[0]
+
+def save_assessments(records, tenant=DEFAULT_TENANT, item_ids=ITEM_IDS):
+    """
+    Insert or update many (info, ratings, narratives, assessment_id-or-None)
+    records in one transaction and one matrix write pass; returns their ids.
+    """
+    width = len(item_ids)
+    path = matrix_path(tenant)
+    cipher = get_field_cipher(tenant)
+    ids = []
+    with get_pool(tenant).connection() as conn, conn:
+        # Everything below runs under the database write lock, which also
+        # orders writers in other processes. Stamp updated_at here so it
+        # follows commit order (the analytics snapshot's watermark relies on
+        # it), and flush the matrix before commit so the next writer sees the
+        # rows allocated here.
+        conn.execute("BEGIN IMMEDIATE")
+        now = datetime.now().isoformat(timespec="seconds")
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        with open(path, mode) as fh:
+            fh.seek(0, os.SEEK_END)
+            next_row = max(fh.tell() // width, conn.execute(
+                "SELECT COALESCE(MAX(matrix_row) + 1, 0) FROM assessments").fetchone()[0])
+            for info, ratings, narratives, assessment_id in records:
+                existing = None
+                if assessment_id:
+                    existing = conn.execute(
+                        "SELECT matrix_row FROM assessments WHERE id = ?", (assessment_id,)
+                    ).fetchone()
+                else:
+                    assessment_id = uuid.uuid4().hex
+
+                if existing:
+                    matrix_row = existing["matrix_row"]
+                else:
+                    matrix_row, next_row = next_row, next_row + 1
+                fh.seek(matrix_row * width)
+                fh.write(ratings_to_row(ratings, item_ids))
+
+                names = seal_fields(cipher, {"pharmacist_name": info.get("pharmacist_name", ""),
+                                             "assessor_name": info.get("assessor_name", "")}, assessment_id)
+                fields = (
+                    names["pharmacist_name"], names["assessor_name"],
+                    info.get("unit", ""), info.get("assessment_type", ""),
+                    str(info.get("assessment_date", "")),
+                    json.dumps(seal_fields(cipher, info, assessment_id), default=str), json.dumps(ratings),
+                    json.dumps(seal_fields(cipher, narratives, assessment_id)),
+                )
+                if existing:
+                    conn.execute(
+                        "UPDATE assessments SET updated_at = ?, pharmacist_name = ?, assessor_name = ?, "
+                        "unit = ?, assessment_type = ?, assessment_date = ?, info_json = ?, "
+                        "ratings_json = ?, narratives_json = ? WHERE id = ?",
+                        (now, *fields, assessment_id),
+                    )
+                else:
+                    conn.execute(
+                        "INSERT INTO assessments (id, created_at, updated_at, pharmacist_name, "
+                        "assessor_name, unit, assessment_type, assessment_date, info_json, "
+                        "ratings_json, narratives_json, matrix_row) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (assessment_id, now, now, *fields, matrix_row),
+                    )
+                _index_narratives(conn, matrix_row, info, narratives, cipher)
+                ids.append(assessment_id)
+            fh.flush()
+            os.fsync(fh.fileno())
+    get_cohort_cache(tenant).apply([(i, r[0], r[1]) for i, r in zip(ids, records)], now)
+    return ids
+
+def load_assessment(assessment_id, tenant=DEFAULT_TENANT):
+    """Return (info, ratings, narratives) for a saved assessment, or None."""
+    with get_pool(tenant).connection() as conn:
+        row = conn.execute(
+            "SELECT info_json, ratings_json, narratives_json FROM assessments WHERE id = ?",
+            (assessment_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    cipher = get_field_cipher(tenant)
+    return (open_fields(cipher, json.loads(row["info_json"]), assessment_id), json.loads(row["ratings_json"]),
+            open_fields(cipher, json.loads(row["narratives_json"]), assessment_id))
+
+def iter_assessments(tenant=DEFAULT_TENANT, since=None):
+    """
+    Stream saved assessments as (id, info, ratings, narratives), oldest change
+    first, optionally only those updated after `since` (an ISO timestamp).
+    """
+    cipher = get_field_cipher(tenant)
+    with get_pool(tenant).connection() as conn:
+        cur = conn.execute(
+            "SELECT id, info_json, ratings_json, narratives_json FROM assessments "
+            "WHERE updated_at > ? ORDER BY updated_at, id",
+            (since or "",),
+        )
+        for row in cur:
+            yield (row["id"], open_fields(cipher, json.loads(row["info_json"]), row["id"]),
+                   json.loads(row["ratings_json"]), open_fields(cipher, json.loads(row["narratives_json"]), row["id"]))
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, punctuation is literal."""
+    terms = [t.replace('"', '""') for t in text.split()]
+    return " AND ".join(f'"{t}"' for t in terms)
+
+def _snippet(texts, words, width=16):
+    """Like FTS5 snippet(): `width` words around the first match, matches wrapped in \x02…\x03."""
+    wanted = set(words)
+    for text in texts:
+        tokens = (text or "").split()
+        hits = [i for i, t in enumerate(tokens) if wanted.intersection(_words(t))]
+        if hits:
+            start = max(0, min(hits[0] - width // 4, len(tokens) - width))
+            part = [f"\x02{t}\x03" if wanted.intersection(_words(t)) else t for t in tokens[start:start + width]]
+            return ("…" if start else "") + " ".join(part) + ("…" if start + width < len(tokens) else "")
+    return ""
+
+def search_narratives(text, tenant=DEFAULT_TENANT, limit=25):
+    """
+    Ranked full-text search over narratives and context notes. Returns dicts with
+    the assessment id, who/where/when, a highlighted snippet (matches wrapped in
+    \x02…\x03) and the bm25 score (lower is better).
+    """
+    cipher = get_field_cipher(tenant)
+    if cipher is None:
+        query = _fts_query(text)
+    else:
+        query = " AND ".join(f'"{cipher.word_hash(w)}"' for w in _words(text))
+    if not query:
+        return []
+    with get_pool(tenant).connection() as conn:
+        rows = conn.execute(
+            "SELECT a.id, a.pharmacist_name, a.assessor_name, a.unit, a.assessment_date, "
+            "       snippet(narratives_fts, -1, char(2), char(3), '…', 16) AS snippet, "
+            "       bm25(narratives_fts) AS score, a.info_json, a.narratives_json "
+            "FROM narratives_fts JOIN assessments a ON a.matrix_row = narratives_fts.rowid "
+            "WHERE narratives_fts MATCH ? ORDER BY score LIMIT ?",
+            (query, limit),
+        ).fetchall()
+    hits = []
+    for r in rows:
+        hit = {k: r[k] for k in ("id", "pharmacist_name", "assessor_name", "unit", "assessment_date",
+                                 "snippet", "score")}
+        if cipher is not None:
+            hit.update(open_fields(cipher, {k: hit[k] for k in ("pharmacist_name", "assessor_name")}, r["id"]))
+            info = open_fields(cipher, json.loads(r["info_json"]), r["id"])
+            narratives = open_fields(cipher, json.loads(r["narratives_json"]), r["id"])
+            hit["snippet"] = _snippet([*(narratives.get(k) for k in NARRATIVE_FIELDS), info.get("context_notes")],
+                                      _words(text))
+        hits.append(hit)
+    return hits
+
+# ─── DRAFTS ───────────────────────────────────────────────────────────────────
+# The form autosaves its draft on every rerun. Saves go to a per-tenant
+# DraftWriter that keeps only the latest state per draft and flushes all of
+# them in one transaction every `flush_interval` seconds on a background
+# thread, so a rerun never waits on the database and bursts of clicks from
+# many assessors collapse into a few batched writes.
+
+class DraftWriter:
+    """Coalescing, batched background writer for draft state."""
+
+    def __init__(self, pool, flush_interval=0.25, max_batch=500, cipher=None):
+        self.pool = pool
+        self.cipher = cipher
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._pending = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, name="draft-writer", daemon=True).start()
+
+    def put(self, draft_id, state):
+        with self._lock:
+            self._pending[draft_id] = (datetime.now().isoformat(timespec="seconds"),
+                                       json.dumps(state, default=str))
+            if len(self._pending) >= self.max_batch:
+                self._wake.set()
+
+    def get(self, draft_id):
+        """Latest not-yet-written state for a draft, or None."""
+        with self._lock:
+            hit = self._pending.get(draft_id) or self._inflight.get(draft_id)
+        return json.loads(hit[1]) if hit else None
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+        if batch:
+            with self.pool.connection() as conn, conn:
+                conn.executemany(
+                    "INSERT INTO drafts (id, updated_at, state_json) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, "
+                    "state_json = excluded.state_json",
+                    [(k, ts, _seal_json(self.cipher, js, f"draft/{k}")) for k, (ts, js) in batch.items()],
+                )
+        with self._lock:
+            self._inflight = {}
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Pool timeouts and cipher errors too: the thread must outlive them.
+                # Put the batch back (newer saves win) and retry on the next tick.
+                log.exception("Draft flush failed; retrying")
+                with self._lock:
+                    self._pending = {**self._inflight, **self._pending}
+                    self._inflight = {}
+
+@st.cache_resource(show_spinner=False)
+def get_draft_writer(tenant=DEFAULT_TENANT):
+    return DraftWriter(get_pool(tenant), cipher=get_field_cipher(tenant))
+
+def save_draft(draft_id, state, tenant=DEFAULT_TENANT):
+    """Queue a draft for the next batched write; returns immediately."""
+    get_draft_writer(tenant).put(draft_id, state)
+
+def load_draft(draft_id, tenant=DEFAULT_TENANT):
+    """Latest saved state for a draft (including queued writes), or None."""
+    state = get_draft_writer(tenant).get(draft_id)
+    if state is not None:
+        return state
+    with get_pool(tenant).connection() as conn:
+        row = conn.execute("SELECT state_json FROM drafts WHERE id = ?", (draft_id,)).fetchone()
+    return _open_json(get_field_cipher(tenant), row["state_json"], f"draft/{draft_id}") if row else None
+
+# ─── SESSION SNAPSHOTS ────────────────────────────────────────────────────────
+# Streamlit keeps session state in the serving process. To run several
+# replicas behind a load balancer without sticky sessions, the assessment
+# form's state is also written, on every rerun that changes it, as a compact
+# snapshot to a key-value store shared by the replicas, keyed by the draft id
+# that is already in the URL. Whichever replica a reconnecting browser
+# reaches restores the session from the snapshot in init_draft. It falls back
+# to the JSON draft when there is no usable snapshot.
+#
+# A snapshot is a version byte followed by a zlib-compressed payload:
+#   header  <BBIH  payload version, flags (1 submitted, 2 attestation),
+#                  CRC-32 of the framework's item ids, item count
+#   ratings one byte per framework item, in framework order (0 = N/A)
+#   text    page, assessment id, then SESSION_INFO_FIELDS and
+#           SESSION_NARRATIVE_FIELDS, each as <I length + UTF-8
+# A snapshot taken under a different framework shape is ignored. With field
+# encryption on, the whole snapshot is sealed and stored behind a 0xE1 byte.
+#
+# PHARM_ASSESS_SESSION_STORE selects the store: "sqlite" (default;
+# sessions.db in the tenant's data directory), "file" (one file per session
+# under sessions/, e.g. on a shared volume) or "off". Any object with the
+# same get/put/delete methods (Redis, memcached, …) can stand in.
+
+SESSION_STORE = os.environ.get("PHARM_ASSESS_SESSION_STORE", "sqlite")
+SESSION_MAX_AGE_DAYS = int(os.environ.get("PHARM_ASSESS_SESSION_MAX_AGE_DAYS", "30"))
+SESSION_FORMAT = 1
+SESSION_SEALED = 0xE1
+SESSION_INFO_FIELDS = (
+    "pharmacist_name", "pharmacist_credentials", "unit", "assessor_name", "assessor_credentials",
+    "assessor_role", "assessment_type", "assessment_date", "obs_start", "obs_end", "context_notes",
+)
+SESSION_NARRATIVE_FIELDS = (*NARRATIVE_FIELDS, "followup")
+
+_SESSION_HEAD = struct.Struct("<BBIH")
+_SESSION_LEN = struct.Struct("<I")
+
+def _framework_crc(item_ids):
+    return zlib.crc32("\x1f".join(item_ids).encode("utf-8"))
+
+def encode_session(state, item_ids=ITEM_IDS):
+    """Compact binary, compressed snapshot of a form session's state (see above)."""
+    info, narratives = state["info"], state["narratives"]
+    flags = (1 if state.get("submitted") else 0) | (2 if narratives.get("attestation") else 0)
+    parts = [_SESSION_HEAD.pack(SESSION_FORMAT, flags, _framework_crc(item_ids), len(item_ids)),
+             ratings_to_row(state["ratings"], item_ids)]
+    texts = [state.get("page") or "", state.get("assessment_id") or "",
+             *(info.get(k) for k in SESSION_INFO_FIELDS), *(narratives.get(k) for k in SESSION_NARRATIVE_FIELDS)]
+    for text in texts:
+        data = str(text if text is not None else "").encode("utf-8")
+        parts += [_SESSION_LEN.pack(len(data)), data]
+    return bytes([SESSION_FORMAT]) + zlib.compress(b"".join(parts), 6)
+
+def decode_session(blob, item_ids=ITEM_IDS):
+    """
+    Inverse of encode_session; None for another format or framework shape, or
+    a damaged snapshot (the caller then falls back to the JSON draft).
+    """
+    if not blob or blob[0] != SESSION_FORMAT:
+        return None
+    try:
+        payload = zlib.decompress(blob[1:])
+        version, flags, crc, count = _SESSION_HEAD.unpack_from(payload)
+        if version != SESSION_FORMAT or crc != _framework_crc(item_ids) or count != len(item_ids):
+            return None
+        pos = _SESSION_HEAD.size + count
+        ratings = dict(zip(item_ids, payload[_SESSION_HEAD.size:pos]))
+        texts = []
+        while pos < len(payload):
+            (n,) = _SESSION_LEN.unpack_from(payload, pos)
+            pos += _SESSION_LEN.size
+            texts.append(payload[pos:pos + n].decode("utf-8"))
+            pos += n
+    except (zlib.error, struct.error, UnicodeDecodeError):
+        return None
+    if pos != len(payload) or len(texts) != 2 + len(SESSION_INFO_FIELDS) + len(SESSION_NARRATIVE_FIELDS):
+        return None   # cut short inside a text or a field list
+    page, assessment_id = texts[:2]
+    info = dict(zip(SESSION_INFO_FIELDS, texts[2:]))
+    narratives = dict(zip(SESSION_NARRATIVE_FIELDS, texts[2 + len(SESSION_INFO_FIELDS):]))
+    narratives["attestation"] = bool(flags & 2)
+    return {"info": info, "ratings": ratings, "narratives": narratives,
+            "assessment_id": assessment_id or None, "page": page, "submitted": bool(flags & 1)}
+
+def _setup_session_db(conn):
+    conn.executescript(
+        "CREATE TABLE IF NOT EXISTS sessions ("
+        "  key TEXT PRIMARY KEY, updated_at TEXT NOT NULL, snapshot BLOB NOT NULL);"
+        "CREATE INDEX IF NOT EXISTS ix_sessions_updated ON sessions(updated_at);"
+    )
+
+class SqliteSessionStore:
+    """Session snapshots in one SQLite table."""
+
+    def __init__(self, path):
+        self.pool = ConnectionPool(path, setup=_setup_session_db)
+
+    def get(self, key):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT snapshot FROM sessions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, blob):
+        with self.pool.connection() as conn, conn:
+            conn.execute(
+                "INSERT INTO sessions (key, updated_at, snapshot) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET updated_at = excluded.updated_at, snapshot = excluded.snapshot",
+                (key, datetime.now().isoformat(timespec="seconds"), blob),
+            )
+
+    def delete(self, key):
+        with self.pool.connection() as conn, conn:
+            conn.execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    def prune(self, max_age_days):
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat(timespec="seconds")
+        with self.pool.connection() as conn, conn:
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+class FileSessionStore:
+    """Session snapshots as one file per key, replaced atomically on write."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, "".join(c for c in key if c.isalnum() or c in "-_") + ".snap")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, blob):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(blob)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_age_days):
+        cutoff, removed = time.time() - max_age_days * 86400, 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".snap") and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        return removed
+
+@st.cache_resource(show_spinner=False)
+def get_session_store(tenant=DEFAULT_TENANT):
+    """Process-wide session snapshot store for a tenant, or None when disabled."""
+    if SESSION_STORE == "off":
+        return None
+    os.makedirs(tenant_dir(tenant), exist_ok=True)
+    if SESSION_STORE == "file":
+        store = FileSessionStore(os.path.join(tenant_dir(tenant), "sessions"))
+    else:
+        store = SqliteSessionStore(os.path.join(tenant_dir(tenant), "sessions.db"))
+    store.prune(SESSION_MAX_AGE_DAYS)
+    return store
+
+def save_session(key, state, tenant=DEFAULT_TENANT, item_ids=ITEM_IDS, previous=None):
+    """
+    Write a session snapshot unless it equals `previous` (the snapshot this
+    session wrote last); returns the unsealed snapshot to pass as `previous` next time.
+    """
+    store = get_session_store(tenant)
+    blob = encode_session(state, item_ids)
+    if store is not None and blob != previous:
+        cipher = get_field_cipher(tenant)
+        store.put(key, bytes([SESSION_SEALED]) + cipher.encrypt(blob, f"session/{key}") if cipher is not None else blob)
+    return blob
+
+def load_session(key, tenant=DEFAULT_TENANT, item_ids=ITEM_IDS):
+    """State saved by save_session for `key`, or None."""
+    store = get_session_store(tenant)
+    blob = store.get(key) if store is not None else None
+    if blob and blob[0] == SESSION_SEALED:
+        cipher = get_field_cipher(tenant)
+        if cipher is None:
+            raise RuntimeError("Stored data is encrypted; set PHARM_ASSESS_KEY or PHARM_ASSESS_KEY_FILE to read it")
+        blob = cipher.decrypt(blob[1:], f"session/{key}")
+    state = decode_session(blob, item_ids) if blob is not None else None
+    metrics().cache("session_snapshot", state is not None)
+    return state
+
+# ─── AUDIT LOG ────────────────────────────────────────────────────────────────
+# Every change to a form field (rating, info field, narrative, attestation) is
+# appended to audit_events with its old and new value, time and the assessor
+# named on the form at that moment. The stream id is the draft id; saving
+# records an "assessment_id" event, so a saved assessment's history can be
+# found from its id. Like drafts, events are queued in memory and written in
+# batches by a background thread. Every `snapshot_every` events the writer
+# also stores the replayed state of the stream, so rebuilding a point in time
+# starts from the nearest earlier snapshot instead of from the first event.
+# With field encryption on, actors, values of SENSITIVE_FIELDS and snapshots
+# are sealed as they are written; the "assessment_id" events stay plaintext
+# so audit_stream_for can look them up.
+
+def _seal_event(cipher, row):
+    """An audit_events row (stream_id, ts, actor, field, old_json, new_json) with its sensitive parts sealed."""
+    stream_id, ts, actor, field, old_json, new_json = row
+    if cipher is None:
+        return row
+    if actor is not None and not is_sealed(actor):
+        actor = cipher.seal(actor, f"audit/{stream_id}/actor")
+    if field in SENSITIVE_FIELDS and not is_sealed(new_json):
+        old_json = cipher.seal(old_json, _audit_context(stream_id, field, "old"))
+        new_json = cipher.seal(new_json, _audit_context(stream_id, field, "new"))
+    return stream_id, ts, actor, field, old_json, new_json
+
+class AuditLog:
+    """Batched background writer for audit events, with periodic snapshots."""
+
+    def __init__(self, pool, flush_interval=0.5, max_batch=2000, snapshot_every=200, cipher=None):
+        self.pool = pool
+        self.cipher = cipher
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.snapshot_every = snapshot_every
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, name="audit-log", daemon=True).start()
+
+    def append(self, stream_id, changes, actor=None):
+        """Queue (field, old, new) changes for a stream; returns immediately."""
+        ts = datetime.now().isoformat(timespec="milliseconds")
+        rows = [(stream_id, ts, actor, field, json.dumps(old, default=str), json.dumps(new, default=str))
+                for field, old, new in changes]
+        with self._lock:
+            self._pending += rows
+            if len(self._pending) >= self.max_batch:
+                self._wake.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                with self.pool.connection() as conn, conn:
+                    conn.executemany(
+                        "INSERT INTO audit_events (stream_id, ts, actor, field, old_json, new_json) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [_seal_event(self.cipher, row) for row in batch],
+                    )
+                    for stream_id in {row[0] for row in batch}:
+                        _maybe_snapshot(conn, stream_id, self.snapshot_every, self.cipher)
+            except Exception:
+                # Any failure (pool timeout, sealing) must not lose events: put the
+                # batch back ahead of newer events, keeping their order.
+                with self._lock:
+                    self._pending = batch + self._pending
+                raise
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Audit flush failed; retrying")   # batch was re-queued
+
+def _replay(conn, stream_id, at=None, cipher=None):
+    """(state, last_seq) for a stream at ISO time `at` (default: now)."""
+    at = at or "9999"
+    snap = conn.execute(
+        "SELECT seq, state_json FROM audit_snapshots WHERE stream_id = ? AND ts <= ? "
+        "ORDER BY seq DESC LIMIT 1",
+        (stream_id, at),
+    ).fetchone()
+    state, seq = (_open_json(cipher, snap["state_json"], f"audit/{stream_id}"), snap["seq"]) if snap else ({}, 0)
+    for row in conn.execute(
+        "SELECT seq, field, new_json FROM audit_events WHERE stream_id = ? AND seq > ? AND ts <= ? "
+        "ORDER BY seq",
+        (stream_id, seq, at),
+    ):
+        state[row["field"]] = _open_json(cipher, row["new_json"], _audit_context(stream_id, row["field"], "new"))
+        seq = row["seq"]
+    return state, seq
+
+def _maybe_snapshot(conn, stream_id, every, cipher=None):
+    last = conn.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM audit_snapshots WHERE stream_id = ?", (stream_id,)
+    ).fetchone()[0]
+    behind = conn.execute(
+        "SELECT COUNT(*) FROM audit_events WHERE stream_id = ? AND seq > ?", (stream_id, last)
+    ).fetchone()[0]
+    if behind >= every:
+        compact_audit_stream(conn, stream_id, cipher)
+
+def compact_audit_stream(conn, stream_id, cipher=None):
+    """Store the stream's current replayed state as a snapshot (events are kept)."""
+    state, seq = _replay(conn, stream_id, cipher=cipher)
+    if seq:
+        ts = conn.execute("SELECT ts FROM audit_events WHERE seq = ?", (seq,)).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO audit_snapshots (stream_id, seq, ts, state_json) VALUES (?, ?, ?, ?)",
+            (stream_id, seq, ts, _seal_json(cipher, json.dumps(state, default=str), f"audit/{stream_id}")),
+        )
+
+@st.cache_resource(show_spinner=False)
+def get_audit_log(tenant=DEFAULT_TENANT):
+    return AuditLog(get_pool(tenant), cipher=get_field_cipher(tenant))
+
+def diff_fields(old, new):
+    """(field, old, new) for every field whose value differs between two flat dicts."""
+    return [(k, old.get(k), v) for k, v in new.items() if old.get(k) != v]
+
+def record_changes(stream_id, changes, actor=None, tenant=DEFAULT_TENANT):
+    """Queue field changes for the next batched audit write."""
+    if changes:
+        get_audit_log(tenant).append(stream_id, changes, actor)
+
+def audit_state_at(stream_id, at=None, tenant=DEFAULT_TENANT):
+    """
+    Rebuild a stream's flat field state ({field: value}) as of ISO time `at`
+    (default: latest), including events still queued for writing.
+    """
+    get_audit_log(tenant).flush()
+    with get_pool(tenant).connection() as conn:
+        return _replay(conn, stream_id, at, get_field_cipher(tenant))[0]
+
+def audit_history(stream_id, tenant=DEFAULT_TENANT):
+    """All events for a stream, oldest first, as dicts."""
+    get_audit_log(tenant).flush()
+    with get_pool(tenant).connection() as conn:
+        rows = conn.execute(
+            "SELECT seq, ts, actor, field, old_json, new_json FROM audit_events "
+            "WHERE stream_id = ? ORDER BY seq",
+            (stream_id,),
+        ).fetchall()
+    cipher = get_field_cipher(tenant)
+    return [{"seq": r["seq"], "ts": r["ts"], "field": r["field"],
+             "actor": open_value(cipher, r["actor"], f"audit/{stream_id}/actor"),
+             "old": _open_json(cipher, r["old_json"], _audit_context(stream_id, r["field"], "old")),
+             "new": _open_json(cipher, r["new_json"], _audit_context(stream_id, r["field"], "new"))} for r in rows]
+
+def audit_stream_for(assessment_id, tenant=DEFAULT_TENANT):
+    """Stream id (draft id) under which a saved assessment was edited, or None."""
+    get_audit_log(tenant).flush()
+    with get_pool(tenant).connection() as conn:
+        row = conn.execute(
+            "SELECT stream_id FROM audit_events WHERE field = 'assessment_id' AND new_json = ? "
+            "ORDER BY seq DESC LIMIT 1",
+            (json.dumps(assessment_id),),
+        ).fetchone()
+    return row["stream_id"] if row else None
+
+# ─── MATRIX ANALYTICS ─────────────────────────────────────────────────────────
+# Read path for historical analytics: the rating matrix is memory-mapped and
+# scanned in fixed-size row chunks through per-domain column views, so peak
+# memory depends on the chunk size rather than on the number of assessments.
+
+SCORE_BAND_EDGES = np.array([1.75, 2.75, 3.5, 4.5])   # same cut points as score_color / perf_category
+SCORE_BANDS = [perf_category(v) for v in (1, 2, 3, 4, 5)]
+MATRIX_CHUNK_ROWS = 65536
+
+def open_rating_matrix(tenant=DEFAULT_TENANT, item_ids=ITEM_IDS):
+    """Memory-map a tenant's rating matrix read-only (rows = assessments, cols = item_ids)."""
+    path = matrix_path(tenant)
+    width = len(item_ids)
+    n_rows = os.path.getsize(path) // width if os.path.exists(path) else 0
+    if n_rows == 0:
+        return np.zeros((0, width), dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r", shape=(n_rows, width))
+
+def domain_views(matrix, domains=DOMAINS):
+    """Zero-copy column slices of the matrix, one per domain, keyed by domain id."""
+    views, start = {}, 0
+    for dom in domains:
+        stop = start + len(dom["items"])
+        views[dom["id"]] = matrix[:, start:stop]
+        start = stop
+    return views
+
+def _accumulate_block(block, acc):
+    rated = block > 0
+    n = rated.sum(axis=1)
+    s = block.sum(axis=1, dtype=np.uint32)
+    has = n > 0
+    avg = np.round(s[has] / n[has], 2)
+    acc["rated"] += int(n.sum())
+    acc["cells"] += block.size
+    acc["avg_sum"] += float(avg.sum())
+    acc["n_scored"] += int(has.sum())
+    acc["insufficient"] += int((~has).sum())
+    acc["bands"] += np.bincount(np.searchsorted(SCORE_BAND_EDGES, avg, side="right"), minlength=5)
+
+def matrix_domain_stats(matrix, domains=DOMAINS, chunk_rows=MATRIX_CHUNK_ROWS):
+    """
+    Domain and overall statistics over a rating matrix: mean of per-assessment
+    averages, N/A rate, and counts per score band. Works chunk-by-chunk on views.
+    """
+    groups = [(dom["id"], dom["short"], v) for dom, v in zip(domains, domain_views(matrix, domains).values())]
+    groups.append(("overall", "Overall", matrix))
+
+    results = []
+    for gid, label, view in groups:
+        acc = {"rated": 0, "cells": 0, "avg_sum": 0.0, "n_scored": 0, "insufficient": 0,
+               "bands": np.zeros(5, dtype=np.int64)}
+        for start in range(0, view.shape[0], chunk_rows):
+            _accumulate_block(view[start:start + chunk_rows], acc)
+        bands = {name: int(c) for name, c in zip(SCORE_BANDS, acc["bands"])}
+        bands[perf_category(None)] = acc["insufficient"]
+        results.append({
+            "id": gid,
+            "domain": label,
+            "assessments": int(view.shape[0]),
+            "avg": round(acc["avg_sum"] / acc["n_scored"], 2) if acc["n_scored"] else None,
+            "na_rate": round(1 - acc["rated"] / acc["cells"], 4) if acc["cells"] else None,
+            "bands": bands,
+        })
+    return results
+
+# ─── ANALYTICS SNAPSHOT ───────────────────────────────────────────────────────
+# Dashboards read from a separate per-tenant database (analytics.db) instead
+# of the assessments database that page_assessment writes to:
+#
+#   scores   one row per (assessment, domain | "overall"): average, rated and
+#            total item counts, band, plus the unit/type/date it rolls up under
+#   rollups  running sums of those rows per (unit, type, quarter, domain)
+#
+# A refresh reads only assessments changed since its watermark (one short WAL
+# read on the primary), turns them into score rows in one vectorized pass,
+# and applies new-minus-old contributions to the rollups, so its cost follows
+# what changed, not the size of the tenant. save_assessments stamps
+# updated_at under the write lock, so rows appear in updated_at order and the
+# watermark (re-read inclusively; rows whose scores are unchanged are
+# skipped) never misses one. Readers only ever touch analytics.db and see the last refresh.
+
+ANALYTICS_MAX_AGE = float(os.environ.get("PHARM_ASSESS_ANALYTICS_MAX_AGE", "60"))   # seconds
+ANALYTICS_CHUNK = 5000    # changed assessments applied per analytics transaction
+
+_ANALYTICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS scores (
+    id              TEXT NOT NULL,
+    group_id        TEXT NOT NULL,
+    unit            TEXT NOT NULL,
+    assessment_type TEXT NOT NULL,
+    assessment_date TEXT NOT NULL,
+    quarter         TEXT NOT NULL,
+    avg             REAL,
+    rated           INTEGER NOT NULL,
+    cells           INTEGER NOT NULL,
+    band            INTEGER NOT NULL,
+    PRIMARY KEY (id, group_id)
+);
+CREATE INDEX IF NOT EXISTS ix_scores_cohort ON scores(group_id, unit, assessment_type, assessment_date);
+CREATE TABLE IF NOT EXISTS rollups (
+    unit            TEXT NOT NULL,
+    assessment_type TEXT NOT NULL,
+    quarter         TEXT NOT NULL,
+    group_id        TEXT NOT NULL,
+    n INTEGER NOT NULL, n_scored INTEGER NOT NULL, avg_sum REAL NOT NULL,
+    rated INTEGER NOT NULL, cells INTEGER NOT NULL,
+    b0 INTEGER NOT NULL, b1 INTEGER NOT NULL, b2 INTEGER NOT NULL, b3 INTEGER NOT NULL, b4 INTEGER NOT NULL,
+    PRIMARY KEY (unit, assessment_type, quarter, group_id)
+);
+"""
+_ROLLUP_SUMS = ["n", "n_scored", "avg_sum", "rated", "cells", "b0", "b1", "b2", "b3", "b4"]
+_ROLLUP_KEYS = ["unit", "assessment_type", "quarter", "group_id"]
+_SCORE_COLUMNS = ["id", "group_id", "unit", "assessment_type", "assessment_date", "quarter",
+                  "avg", "rated", "cells", "band"]
+
+def analytics_path(tenant=DEFAULT_TENANT):
+    return os.path.join(tenant_dir(tenant), "analytics.db")
+
+def _setup_analytics_db(conn):
+    conn.executescript(_ANALYTICS_SCHEMA)
+
+@st.cache_resource(show_spinner=False)
+def get_analytics_pool(tenant=DEFAULT_TENANT):
+    """Process-wide connection pool for a tenant's analytics snapshot."""
+    os.makedirs(tenant_dir(tenant), exist_ok=True)
+    return ConnectionPool(analytics_path(tenant), setup=_setup_analytics_db)
+
+@st.cache_resource(show_spinner=False)
+def _analytics_state(tenant):
+    return {"lock": threading.Lock(), "checked": 0.0}
+
+def _quarter(dates):
+    # Dates are stored as ISO strings; naming the format keeps an empty first
+    # date from sending every row through dateutil. Missing dates come out as
+    # "NaT" (pandas 2) or as missing values (pandas 3).
+    return (pd.to_datetime(pd.Series(dates), format="ISO8601", errors="coerce")
+            .dt.to_period("Q").astype(str).replace("NaT", "").fillna(""))
+
+def score_rows(rows, domains=DOMAINS):
+    """Long-format score rows (a DataFrame of _SCORE_COLUMNS) for primary assessment rows."""
+    idx = framework_index(domains)
+    block = np.frombuffer(b"".join(ratings_to_row(json.loads(r["ratings_json"]), idx["item_ids"]) for r in rows),
+                          dtype=np.uint8).reshape(len(rows), idx["total_items"])
+    groups = list(domain_views(block, domains).items()) + [("overall", block)]
+    meta = {
+        "id": [r["id"] for r in rows],
+        "unit": [r["unit"] or "" for r in rows],
+        "assessment_type": [r["assessment_type"] or "" for r in rows],
+        "assessment_date": [r["assessment_date"] or "" for r in rows],
+    }
+    meta["quarter"] = _quarter(meta["assessment_date"]).to_numpy()
+    frames = []
+    for gid, view in groups:
+        avg = _matrix_averages(view)
+        band = np.where(np.isnan(avg), -1, np.searchsorted(SCORE_BAND_EDGES, avg, side="right"))
+        frames.append(pd.DataFrame({**meta, "group_id": gid, "avg": avg, "rated": (view > 0).sum(axis=1),
+                                    "cells": view.shape[1], "band": band}))
+    return pd.concat(frames, ignore_index=True)[_SCORE_COLUMNS]
+
+def _contributions(scores, sign):
+    out = scores[_ROLLUP_KEYS].copy()
+    out["n"] = sign
+    out["n_scored"] = sign * scores["avg"].notna()
+    out["avg_sum"] = sign * scores["avg"].fillna(0.0)
+    out["rated"] = sign * scores["rated"]
+    out["cells"] = sign * scores["cells"]
+    for b in range(5):
+        out[f"b{b}"] = sign * (scores["band"] == b)
+    return out
+
+def _score_records(scores):
+    """Score rows as plain tuples (NaN as None), in _SCORE_COLUMNS order."""
+    return [tuple(None if isinstance(v, float) and math.isnan(v) else v for v in r)
+            for r in scores.astype(object).itertuples(index=False)]
+
+def _by_id(records):
+    grouped = {}
+    for r in records:
+        grouped.setdefault(r[0], set()).add(r)
+    return grouped
+
+def _apply_scores(conn, new):
+    """
+    Replace score rows for new["id"] and fold the difference into the rollups.
+    Assessments whose score rows are unchanged (re-read at the watermark, or
+    re-saved as they were) are skipped; returns the number applied.
+    """
+    ids = list(dict.fromkeys(new["id"]))
+    old = pd.concat([
+        pd.read_sql_query(f"SELECT {', '.join(_SCORE_COLUMNS)} FROM scores WHERE id IN "
+                          f"({', '.join('?' * len(part))})", conn, params=part)
+        for part in (ids[i:i + 900] for i in range(0, len(ids), 900))
+    ] or [pd.DataFrame(columns=_SCORE_COLUMNS)], ignore_index=True)
+    old_rows, new_rows = _by_id(_score_records(old)), _by_id(_score_records(new))
+    ids = [i for i in ids if new_rows[i] != old_rows.get(i)]
+    if not ids:
+        return 0
+    new, old = new[new["id"].isin(ids)], old[old["id"].isin(ids)]
+    delta = pd.concat([_contributions(new, 1), _contributions(old, -1)], ignore_index=True)
+    delta = delta.groupby(_ROLLUP_KEYS, as_index=False)[_ROLLUP_SUMS].sum()
+    conn.executemany(
+        f"INSERT INTO rollups ({', '.join(_ROLLUP_KEYS + _ROLLUP_SUMS)}) "
+        f"VALUES ({', '.join('?' * (len(_ROLLUP_KEYS) + len(_ROLLUP_SUMS)))}) "
+        f"ON CONFLICT ({', '.join(_ROLLUP_KEYS)}) DO UPDATE SET "
+        + ", ".join(f"{c} = {c} + excluded.{c}" for c in _ROLLUP_SUMS),
+        [tuple(r) for r in delta.astype(object).itertuples(index=False)],
+    )
+    conn.execute("DELETE FROM rollups WHERE n = 0")
+    conn.executemany("DELETE FROM scores WHERE id = ?", [(i,) for i in ids])
+    conn.executemany(
+        f"INSERT INTO scores ({', '.join(_SCORE_COLUMNS)}) VALUES ({', '.join('?' * len(_SCORE_COLUMNS))})",
+        _score_records(new),
+    )
+    return len(ids)
+
+def refresh_analytics(tenant=DEFAULT_TENANT, max_age=ANALYTICS_MAX_AGE):
+    """
+    Bring the tenant's analytics snapshot up to date if it is older than
+    max_age seconds; returns the number of assessments whose scores changed. A refresh
+    already running in another session is not waited for unless max_age is 0.
+    """
+    state = _analytics_state(tenant)
+    if max_age and time.monotonic() - state["checked"] < max_age:
+        return 0
+    if not state["lock"].acquire(blocking=not max_age):
+        return 0
+    try:
+        applied = _refresh_analytics(tenant)
+        state["checked"] = time.monotonic()
+        return applied
+    finally:
+        state["lock"].release()
+
+def _refresh_analytics(tenant):
+    fw = get_framework(tenant)
+    shape = json.dumps([FRAMEWORK_VERSION, fw["item_ids"]])
+    applied = 0
+    with get_analytics_pool(tenant).connection() as snap:
+        meta = dict(snap.execute("SELECT key, value FROM snapshot_meta").fetchall())
+        watermark = meta.get("watermark", "")
+        if meta.get("framework") != shape:
+            with snap:
+                snap.execute("DELETE FROM scores")
+                snap.execute("DELETE FROM rollups")
+                snap.execute("INSERT OR REPLACE INTO snapshot_meta VALUES ('framework', ?)", (shape,))
+            watermark = ""
+        # Keyset pages over (updated_at, id): a row re-saved mid-refresh moves
+        # to the end instead of shifting unread rows into pages already read.
+        sql, args = "WHERE updated_at >= ?", (watermark,)
+        latest = watermark
+        while True:
+            with get_pool(tenant).connection() as conn:
+                rows = conn.execute(
+                    "SELECT id, updated_at, unit, assessment_type, assessment_date, ratings_json "
+                    f"FROM assessments {sql} ORDER BY updated_at, id LIMIT ?", (*args, ANALYTICS_CHUNK),
+                ).fetchall()
+            if not rows:
+                break
+            with snap:
+                snap.execute("BEGIN IMMEDIATE")
+                applied += _apply_scores(snap, score_rows(rows, fw["domains"]))
+            latest = rows[-1]["updated_at"]
+            sql, args = "WHERE (updated_at, id) > (?, ?)", (latest, rows[-1]["id"])
+        with snap:
+            snap.executemany("INSERT OR REPLACE INTO snapshot_meta VALUES (?, ?)",
+                             [("watermark", latest), ("refreshed_at", datetime.now().isoformat(timespec="seconds"))])
+    return applied
+
+def snapshot_refreshed_at(tenant=DEFAULT_TENANT):
+    with get_analytics_pool(tenant).connection() as conn:
+        row = conn.execute("SELECT value FROM snapshot_meta WHERE key = 'refreshed_at'").fetchone()
+    return row[0] if row else None
+
+def _rollup_sums(tenant, by, unit=None):
+    sql = f"SELECT {by}, {', '.join(f'SUM({c})' for c in _ROLLUP_SUMS)} FROM rollups"
+    args = ()
+    if unit:
+        sql, args = sql + " WHERE unit = ?", (unit,)
+    with get_analytics_pool(tenant).connection() as conn:
+        rows = conn.execute(f"{sql} GROUP BY {by}", args).fetchall()
+    return pd.DataFrame([tuple(r) for r in rows], columns=by.split(", ") + _ROLLUP_SUMS)
+
+def snapshot_domain_stats(tenant=DEFAULT_TENANT, domains=DOMAINS, unit=None):
+    """matrix_domain_stats() figures served from the analytics snapshot, optionally for one unit."""
+    sums = _rollup_sums(tenant, "group_id", unit).set_index("group_id")
+    results = []
+    for gid, label in [(d["id"], d["short"]) for d in domains] + [("overall", "Overall")]:
+        t = sums.loc[gid] if gid in sums.index else pd.Series(0, index=_ROLLUP_SUMS)
+        bands = {name: int(t[f"b{i}"]) for i, name in enumerate(SCORE_BANDS)}
+        bands[perf_category(None)] = int(t["n"] - t["n_scored"])
+        results.append({
+            "id": gid,
+            "domain": label,
+            "assessments": int(t["n"]),
+            "avg": round(t["avg_sum"] / t["n_scored"], 2) if t["n_scored"] else None,
+            "na_rate": round(1 - t["rated"] / t["cells"], 4) if t["cells"] else None,
+            "bands": bands,
+        })
+    return results
+
+def snapshot_trends(tenant=DEFAULT_TENANT, domains=DOMAINS, unit=None):
+    """Quarterly mean of per-assessment averages: rows = quarters, columns = domains + Overall."""
+    sums = _rollup_sums(tenant, "quarter, group_id", unit)
+    sums = sums[(sums["quarter"] != "") & (sums["n_scored"] > 0)]
+    if sums.empty:
+        return pd.DataFrame()
+    sums["avg"] = (sums["avg_sum"] / sums["n_scored"]).round(2)
+    trends = sums.pivot(index="quarter", columns="group_id", values="avg")
+    labels = {d["id"]: d["short"] for d in domains} | {"overall": "Overall"}
+    return trends.reindex(columns=[g for g in labels if g in trends.columns]).rename(columns=labels)
+
+def snapshot_members(tenant, key):
+    """{assessment_id: {domain_id | "overall": avg or None}} for a cohort key, from the snapshot."""
+    unit, assessment_type, start, end = key
+    sql, args = "SELECT id, group_id, avg FROM scores WHERE 1 = 1", []
+    for clause, value in (("unit = ?", unit), ("assessment_type = ?", assessment_type),
+                          ("assessment_date >= ?", start), ("assessment_date <= ?", end)):
+        if value is not None:
+            sql += f" AND {clause}"
+            args.append(value)
+    members = {}
+    with get_analytics_pool(tenant).connection() as conn:
+        for assessment_id, gid, avg in conn.execute(sql, args):
+            members.setdefault(assessment_id, {})[gid] = avg
+    return members
+
+# ─── COHORT BENCHMARKS ────────────────────────────────────────────────────────
+# Percentile rank of a pharmacist's domain and overall averages against a peer
+# cohort (unit, assessment type, date window). Each cohort keeps one sorted
+# list of averages per domain plus overall, built once from the analytics
+# snapshot's per-assessment scores and then kept current by save_assessments() (bisect remove + insort), so a
+# lookup is two binary searches. Cohorts are cached per process; a save made
+# by another process (report pipeline, offline sync) is noticed through
+# MAX(updated_at) and rebuilds the cache on the next lookup.
+
+COHORT_MIN_SIZE = 5   # fewer peers than this gives no percentile
+
+class Cohort:
+    """Sorted per-domain averages for the assessments matching one filter."""
+
+    def __init__(self, key, domains, members):
+        self.key = key
+        self.domains = domains
+        self.members = members   # {assessment_id: {domain_id | "overall": avg or None}}
+        self.values = {k: sorted(m[k] for m in members.values() if m[k] is not None)
+                       for k in [d["id"] for d in domains] + ["overall"]}
+
+    def matches(self, info):
+        unit, assessment_type, start, end = self.key
+        when = str(info.get("assessment_date", ""))
+        return ((unit is None or info.get("unit") == unit)
+                and (assessment_type is None or info.get("assessment_type") == assessment_type)
+                and (start is None or when >= start) and (end is None or when <= end))
+
+    def update(self, assessment_id, info, ratings):
+        """Apply a saved assessment: drop its previous averages, insert the new ones if it matches."""
+        old = self.members.pop(assessment_id, None)
+        if old:
+            for k, v in old.items():
+                if v is not None:
+                    vals = self.values[k]
+                    del vals[bisect.bisect_left(vals, v)]
+        if self.matches(info):
+            new = _score_vector(ratings, self.domains)
+            self.members[assessment_id] = new
+            for k, v in new.items():
+                if v is not None:
+                    bisect.insort(self.values[k], v)
+
+    def percentile(self, key, score, exclude_id=None):
+        """Mid-rank percentile (0-100) of `score` among peers, or None if too few peers."""
+        vals = self.values[key]
+        below = bisect.bisect_left(vals, score)
+        equal = bisect.bisect_right(vals, score) - below
+        n = len(vals)
+        own = self.members.get(exclude_id, {}).get(key)
+        if own is not None:
+            n -= 1
+            if own < score:
+                below -= 1
+            elif own == score:
+                equal -= 1
+        if n < COHORT_MIN_SIZE:
+            return None
+        return round(100 * (below + equal / 2) / n)
+
+def _score_vector(ratings, domains):
+    idx = framework_index(domains)
+    vec = {d["id"]: calc_domain_avg(domain_ratings(ratings, d["id"], idx)) for d in domains}
+    vec["overall"] = calc_overall_avg({iid: ratings.get(iid) for iid in idx["item_ids"]})
+    return vec
+
+def _matrix_averages(block):
+    """Per-row rounded averages of a uint8 rating block, NaN where nothing is rated."""
+    n = (block > 0).sum(axis=1)
+    s = block.sum(axis=1, dtype=np.uint32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.round(s / n, 2)
+
+def build_cohort(key, tenant=DEFAULT_TENANT):
+    """Cohort for key = (unit, type, start, end) from a freshly caught-up analytics snapshot."""
+    refresh_analytics(tenant, max_age=0)
+    return Cohort(key, get_framework(tenant)["domains"], snapshot_members(tenant, key))
+
+COHORT_CACHE_SIZE = 64   # cohorts kept per tenant; least recently used are dropped
+
+class CohortCache:
+    """Process-wide cohorts for one tenant, kept current on save (LRU-bounded)."""
+
+    def __init__(self, tenant, max_entries=COHORT_CACHE_SIZE):
+        self.tenant = tenant
+        self.max_entries = max_entries
+        self.cohorts = OrderedDict()
+        self.seen = ""
+        self.lock = threading.Lock()
+
+    def _latest_save(self):
+        with get_pool(self.tenant).connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(updated_at), '') FROM assessments").fetchone()[0]
+
+    def get(self, key):
+        latest = self._latest_save()
+        with self.lock:
+            if latest > self.seen:
+                self.cohorts.clear()
+                self.seen = latest
+            metrics().cache("cohort", key in self.cohorts)
+            if key in self.cohorts:
+                self.cohorts.move_to_end(key)
+            else:
+                self.cohorts[key] = build_cohort(key, self.tenant)
+                if len(self.cohorts) > self.max_entries:
+                    self.cohorts.popitem(last=False)
+            return self.cohorts[key]
+
+    def apply(self, saved, when):
+        """Fold saved (assessment_id, info, ratings) records into every cached cohort."""
+        with self.lock:
+            for cohort in self.cohorts.values():
+                for assessment_id, info, ratings in saved:
+                    cohort.update(assessment_id, info, ratings)
+            self.seen = max(self.seen, when)
+
+@st.cache_resource(show_spinner=False)
+def get_cohort_cache(tenant=DEFAULT_TENANT):
+    return CohortCache(tenant)
+
+def cohort_key(unit=None, assessment_type=None, start=None, end=None):
+    return (unit, assessment_type, str(start) if start else None, str(end) if end else None)
+
+def cohort_label(key):
+    unit, assessment_type, start, end = key
+    parts = [unit or "All units"]
+    if assessment_type:
+        parts.append(assessment_type)
+    if start or end:
+        parts.append(f"{start or '…'} to {end or '…'}")
+    return " · ".join(parts)
+
+def peer_benchmark(ratings, key, tenant=DEFAULT_TENANT, exclude_id=None):
+    """
+    Percentiles of an assessment's domain and overall averages within a cohort:
+    {"label", "n", "rows": [{"id", "domain", "score", "percentile"}]}.
+    Pass the assessment's own id as exclude_id once it has been saved.
+    """
+    cohort = get_cohort_cache(tenant).get(key)
+    scores = _score_vector(ratings, cohort.domains)
+    rows = [
+        {"id": gid, "domain": label, "score": scores[gid],
+         "percentile": cohort.percentile(gid, scores[gid], exclude_id) if scores[gid] is not None else None}
+        for gid, label in [(d["id"], d["short"]) for d in cohort.domains] + [("overall", "Overall")]
+    ]
+    n = len(cohort.members) - (exclude_id in cohort.members)
+    return {"label": cohort_label(key), "n": n, "rows": rows}
+
+def ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+# ─── RATER CALIBRATION ────────────────────────────────────────────────────────
+# Many-facet additive model on the 1–5 scale for every stored item rating:
+#
+#     rating = mu + pharmacist + assessor + item + quarter + noise
+#
+# fit by alternating shrunken-mean updates (ridge ALS): each sweep updates one
+# facet at a time from the current residuals with np.bincount over flat
+# arrays, so a sweep is a few vectorized passes over the ratings (about a
+# second for a million ratings). Shrinkage adds RATER_SHRINKAGE pseudo-ratings
+# at zero to every level, so assessors, items and quarters with few ratings
+# stay near zero. An assessor's leniency is only separable from the ability of
+# the pharmacists they rated when those pharmacists were also rated by someone
+# else; "Linked" counts them. Results are cached per dataset snapshot.
+
+RATER_SHRINKAGE = 20.0
+RATER_MAX_ITER = 100
+RATER_TOL = 1e-4          # stop when no effect moves by more than this
+LENIENCY_FLAG = 0.5       # rating points above/below the norm flagged for review
+RATER_FACETS = ("pharmacist", "assessor", "item", "quarter")
+
+def dataset_snapshot(tenant=DEFAULT_TENANT):
+    """Token that changes whenever a tenant's saved assessments or ratings change."""
+    with get_pool(tenant).connection() as conn:
+        count, latest = conn.execute("SELECT COUNT(*), COALESCE(MAX(updated_at), '') FROM assessments").fetchone()
+    path = matrix_path(tenant)
+    return (count, latest, os.stat(path).st_mtime_ns if os.path.exists(path) else 0)
+
+def rating_facets(tenant=DEFAULT_TENANT, chunk_rows=MATRIX_CHUNK_ROWS):
+    """
+    Every rated cell of a tenant's matrix as flat arrays: {"y": ratings,
+    "codes": {facet: level codes}, "labels": {facet: level labels}, "rows": matrix rows}.
+    """
+    fw = get_framework(tenant)
+    matrix = open_rating_matrix(tenant, fw["item_ids"])
+    with get_pool(tenant).connection() as conn:
+        rows = conn.execute(
+            "SELECT matrix_row, id, pharmacist_name, assessor_name, assessment_date FROM assessments").fetchall()
+    cipher = get_field_cipher(tenant)
+    meta = pd.DataFrame(
+        [(m, i, open_value(cipher, p, f"{i}/pharmacist_name"), open_value(cipher, a, f"{i}/assessor_name"), d)
+         for m, i, p, a, d in rows],
+        columns=["matrix_row", "id", "pharmacist", "assessor", "date"],
+    )
+    meta["quarter"] = pd.to_datetime(meta["date"], errors="coerce").dt.to_period("Q").astype(str)
+    meta = meta[meta["matrix_row"] < matrix.shape[0]]
+
+    row_codes, labels = {}, {}
+    for facet in ("pharmacist", "assessor", "quarter"):
+        codes, uniques = pd.factorize(meta[facet].fillna("—"))
+        row_codes[facet] = np.full(matrix.shape[0], -1, dtype=np.int64)
+        row_codes[facet][meta["matrix_row"].to_numpy()] = codes
+        labels[facet] = np.asarray(uniques, dtype=object)
+    labels["item"] = np.array(fw["item_ids"], dtype=object)
+
+    ys, rows, items = [], [], []
+    for start in range(0, matrix.shape[0], chunk_rows):
+        block = np.asarray(matrix[start:start + chunk_rows])
+        r, c = np.nonzero(block)
+        keep = row_codes["pharmacist"][start + r] >= 0
+        ys.append(block[r[keep], c[keep]])
+        rows.append(start + r[keep])
+        items.append(c[keep])
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    codes = {facet: row_codes[facet][rows] for facet in ("pharmacist", "assessor", "quarter")}
+    codes["item"] = np.concatenate(items) if items else np.zeros(0, dtype=np.int64)
+    return {
+        "y": np.concatenate(ys).astype(np.float64) if ys else np.zeros(0),
+        "codes": codes, "labels": labels, "rows": rows,
+        "ids": dict(zip(meta["matrix_row"], meta["id"])),
+    }
+
+def fit_facet_model(y, codes, sizes, shrinkage=RATER_SHRINKAGE, max_iter=RATER_MAX_ITER, tol=RATER_TOL):
+    """
+    Ridge ALS fit of y = mu + sum of facet effects. codes/sizes are keyed by
+    facet; returns (mu, {facet: effects}, sweeps, rmse). Every facet except
+    the first is centred (weighted by ratings) each sweep, so it reads as a
+    deviation from the norm.
+    """
+    mu = float(y.mean())
+    effects = {f: np.zeros(sizes[f]) for f in codes}
+    counts = {f: np.bincount(codes[f], minlength=sizes[f]) for f in codes}
+    first = next(iter(codes))
+    pred = np.full_like(y, mu)
+    for sweep in range(1, max_iter + 1):
+        moved = 0.0
+        for f, c in codes.items():
+            pred -= effects[f][c]
+            new = np.bincount(c, weights=y - pred, minlength=sizes[f]) / (counts[f] + shrinkage)
+            if f != first:
+                shift = float(new @ counts[f]) / len(y)
+                new -= shift
+                mu += shift
+                pred += shift
+            moved = max(moved, float(np.abs(new - effects[f]).max(initial=0.0)))
+            effects[f] = new
+            pred += new[c]
+        if moved < tol:
+            break
+    rmse = float(np.sqrt(np.mean((y - pred) ** 2)))
+    return mu, effects, sweep, rmse
+
+def _linked_counts(pharmacist, assessor, n_assessors):
+    """Per assessor, how many of their pharmacists were also rated by another assessor."""
+    pairs = np.unique(np.stack([pharmacist, assessor], axis=1), axis=0)
+    raters_per_pharmacist = np.bincount(pairs[:, 0])
+    shared = raters_per_pharmacist[pairs[:, 0]] > 1
+    return np.bincount(pairs[shared, 1], minlength=n_assessors)
+
+def rater_calibration(tenant=DEFAULT_TENANT):
+    """Assessor leniency, item difficulty and quarterly drift for a tenant (None without data)."""
+    return _rater_calibration(tenant, dataset_snapshot(tenant))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _rater_calibration(tenant, snapshot):
+    data = rating_facets(tenant)
+    y, codes, labels = data["y"], data["codes"], data["labels"]
+    if len(y) == 0:
+        return None
+    ordered = {f: codes[f] for f in RATER_FACETS}
+    sizes = {f: len(labels[f]) for f in RATER_FACETS}
+    t0 = time.perf_counter()
+    mu, effects, sweeps, rmse = fit_facet_model(y, ordered, sizes)
+    fit_seconds = time.perf_counter() - t0
+
+    def table(facet, label, effect_name, sign=1):
+        c = codes[facet]
+        n = np.bincount(c, minlength=sizes[facet])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(c, weights=y, minlength=sizes[facet]) / n
+        return pd.DataFrame({label: labels[facet], "Ratings": n, "Mean Given": np.round(mean, 2),
+                             effect_name: np.round(sign * effects[facet], 2) + 0.0})
+
+    assessors = table("assessor", "Assessor", "Leniency")
+    per_row = pd.DataFrame({"row": data["rows"], "assessor": codes["assessor"]}).drop_duplicates("row")
+    assessors.insert(1, "Assessments", np.bincount(per_row["assessor"], minlength=sizes["assessor"]))
+    assessors["Linked"] = _linked_counts(codes["pharmacist"], codes["assessor"], sizes["assessor"])
+    assessors["Flag"] = np.select([assessors["Leniency"] >= LENIENCY_FLAG, assessors["Leniency"] <= -LENIENCY_FLAG],
+                                  ["Lenient", "Severe"], "")
+    assessors = assessors.sort_values("Leniency", ascending=False, ignore_index=True)
+
+    text = {it["id"]: (dom["short"], it["text"]) for dom in get_framework(tenant)["domains"] for it in dom["items"]}
+    items = table("item", "Item", "Difficulty", sign=-1)
+    items.insert(0, "Domain", [text[iid][0] for iid in items["Item"]])
+    items["Item"] = [text[iid][1] for iid in items["Item"]]
+    items = items.sort_values("Difficulty", ascending=False, ignore_index=True)
+
+    periods = table("quarter", "Quarter", "Drift").sort_values("Quarter", ignore_index=True)
+
+    leniency = effects["assessor"][per_row["assessor"].to_numpy()]
+    adjustments = {data["ids"][row]: round(float(v), 3) for row, v in zip(per_row["row"], leniency)}
+    return {
+        "snapshot": snapshot, "mu": round(mu, 3), "rmse": round(rmse, 3), "sweeps": sweeps,
+        "ratings": int(len(y)), "fit_seconds": round(fit_seconds, 2),
+        "assessors": assessors, "items": items, "periods": periods, "adjustments": adjustments,
+    }
+
+def leniency_adjusted(score, assessment_id, calibration):
+    """A domain or overall average with its assessor's leniency removed (clipped to 1–5)."""
+    if score is None or not calibration:
+        return score
+    return round(min(5.0, max(1.0, score - calibration["adjustments"].get(assessment_id, 0.0))), 2)
+
+# ─── VALIDATION RULES ─────────────────────────────────────────────────────────
+# Declarative rules over the flat field namespace {**info, **ratings, **narratives}.
+# Each rule names the fields it reads; evaluate_rules() keeps the previous field
+# values and results so a rerun only re-checks rules whose inputs changed.
+# A check returns a message when the rule is violated, otherwise None.
+
+def _low_rating_needs_narrative(item, dom, catalog=None):
+    message = tr('{short}: "{text}…" is rated {rating} — describe the gap under Areas for Development.', catalog)
+    def check(rating, development):
+        if rating in (1, 2) and not (development or "").strip():
+            return message.format(short=dom["short"], text=item["text"][:60], rating=rating)
+        return None
+    return check
+
+def _observation_period_ordered(obs_start, obs_end, catalog=None):
+    if not obs_start or not obs_end:
+        return None
+    try:
+        if date.fromisoformat(str(obs_start)) > date.fromisoformat(str(obs_end)):
+            return tr("Observation period start date is after the end date.", catalog)
+    except ValueError:
+        return tr("Observation period dates are not valid dates.", catalog)
+    return None
+
+def _attested(attestation, catalog=None):
+    return None if attestation else tr("Assessor attestation is required before generating the PDF report.", catalog)
+
+def build_rule_set(domains, catalog=None):
+    """Rules for a framework, indexed by id and by the input fields they depend on."""
+    rules = [
+        {
+            "id": f"narrative_{item['id']}",
+            "inputs": (item["id"], "development"),
+            "check": _low_rating_needs_narrative(item, dom, catalog),
+            "severity": "error",
+        }
+        for dom in domains for item in dom["items"]
+    ] + [
+        {
+            "id": "observation_period",
+            "inputs": ("obs_start", "obs_end"),
+            "check": functools.partial(_observation_period_ordered, catalog=catalog),
+            "severity": "error",
+        },
+        {
+            "id": "attestation",
+            "inputs": ("attestation",),
+            "check": functools.partial(_attested, catalog=catalog),
+            "severity": "error",
+        },
+    ]
+    dependents = {}
+    for rule in rules:
+        for field in rule["inputs"]:
+            dependents.setdefault(field, []).append(rule["id"])
+    return {"rules": rules, "by_id": {r["id"]: r for r in rules}, "dependents": dependents}
+
+RULE_SET = build_rule_set(DOMAINS)
+
+def evaluate_rules(fields, state=None, rule_set=RULE_SET):
+    """
+    Return the list of violated rules as {"rule", "severity", "message"} dicts.
+    Pass the same `state` dict on every rerun to re-check only rules whose
+    input fields changed since the previous call.
+    """
+    state = {} if state is None else state
+    prev = state.get("fields")
+    results = state.setdefault("results", {})
+
+    if prev is None:
+        dirty = rule_set["by_id"].keys()
+    else:
+        changed = [k for k in fields.keys() | prev.keys() if fields.get(k) != prev.get(k)]
+        dirty = {rid for k in changed for rid in rule_set["dependents"].get(k, ())}
+
+    for rid in dirty:
+        rule = rule_set["by_id"][rid]
+        results[rid] = rule["check"](*(fields.get(k) for k in rule["inputs"]))
+    state["fields"] = dict(fields)
+
+    return [
+        {"rule": rule["id"], "severity": rule["severity"], "message": results[rule["id"]]}
+        for rule in rule_set["rules"] if results.get(rule["id"])
+    ]
+
+def validate_assessment(info, ratings, narratives, rule_set=RULE_SET):
+    """Stateless full rule check for imports and programmatic submissions."""
+    return evaluate_rules({**info, **ratings, **narratives}, rule_set=rule_set)
+
+# ─── TENANTS ──────────────────────────────────────────────────────────────────
+# One process serves every hospital in the system. Per-site overrides live in a
+# JSON file (PHARM_ASSESS_TENANTS, default tenants.json) shaped like:
+#
+#   {"stmarys": {"name": "St. Mary's Hospital", "locale": "es",
+#                "unit_options": [...], "assessor_roles": [...],
+#                "extra_items": {"dtm": [{"id": "dtm_sm1", "text": ..., "low": ..., "high": ...}]}}}
+#
+# Anything a tenant omits falls back to the built-in framework. Each tenant's
+# framework is built once per process; the tenant id is part of every cache
+# key, storage path and session, so sites never share data.
+
+TENANTS_PATH = os.environ.get("PHARM_ASSESS_TENANTS", "tenants.json")
+
+@st.cache_resource(show_spinner=False)
+def load_tenant_configs(path=TENANTS_PATH):
+    """Raw tenant overrides keyed by tenant id (read once per process)."""
+    configs = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            configs = json.load(fh)
+    configs.setdefault(DEFAULT_TENANT, {})
+    return configs
+
+@st.cache_resource(show_spinner=False)
+def _tenant_domains(tenant):
+    """A tenant's domains list, built once per process so its framework index is shared."""
+    extra = load_tenant_configs()[tenant].get("extra_items", {})
+    if not extra:
+        return DOMAINS
+    return [
+        {**dom, "items": dom["items"] + extra.get(dom["id"], [])}
+        for dom in DOMAINS
+    ]
+
+def tenant_locale(tenant=DEFAULT_TENANT):
+    """A tenant's default locale ("locale" in its config, else English)."""
+    return load_tenant_configs()[tenant].get("locale", DEFAULT_LOCALE)
+
+@st.cache_resource(show_spinner=False)
+def _tenant_rule_set(tenant, locale):
+    return build_rule_set(_localized_domains(tenant, locale), compile_catalog(locale))
+
+def get_framework(tenant=DEFAULT_TENANT, locale=None):
+    """Resolved framework for a tenant: domains (with extra items), options, rules, in `locale`
+    (default: the tenant's "locale", else English)."""
+    configs = load_tenant_configs()
+    if tenant not in configs:
+        raise KeyError(f"Unknown tenant: {tenant}")
+    cfg = configs[tenant]
+    locale = locale or tenant_locale(tenant)
+    extra = cfg.get("extra_items", {})
+    domains = _localized_domains(tenant, locale)
+    return {
+        "tenant": tenant,
+        "name": cfg.get("name", "Clinical Pharmacy"),
+        "locale": locale,
+        "catalog": compile_catalog(locale),
+        "domains": domains,
+        "item_ids": framework_index(domains)["item_ids"],
+        "unit_options": cfg.get("unit_options", UNIT_OPTIONS),
+        "assessor_roles": cfg.get("assessor_roles", ASSESSOR_ROLES),
+        "rule_set": _tenant_rule_set(tenant, locale) if extra or locale != DEFAULT_LOCALE else RULE_SET,
+    }
+
+# ─── OFFLINE BUNDLE & SYNC ────────────────────────────────────────────────────
+# For units with unreliable Wi-Fi the form can also run as a static,
+# installable web app generated from the tenant's framework. The whole form
+# lives in the browser: every tap is local, drafts autosave to localStorage
+# and completed assessments wait in an outbox. When the device is online the
+# outbox is sent as one gzip-compressed JSON batch to /sync (see
+# offline_server.py). The server re-validates with the tenant's rule set,
+# saves accepted records, scores them and renders their PDFs. Each client
+# uuid is mapped to a server-assigned assessment id on first upload, so
+# re-sending a batch after a dropped connection updates records instead of
+# duplicating them, and an upload can never name (and overwrite) a record
+# saved any other way. With encryption on, rendered PDFs are sealed like the
+# stored fields (<id>.pdf.enc; read them with load_sync_report).
+
+OFFLINE_HTML = r"""<!doctype html>
+<html lang="en"><head>
+<meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<meta name="theme-color" content="#0d2b4e">
+<link rel="manifest" href="manifest.webmanifest">
+<title>Pharmacist Assessment (Offline)</title>
+<style>
+  body { font-family: system-ui, sans-serif; margin: 0; background: #f8fafc; color: #1e293b; }
+  header { background: #0d2b4e; color: white; padding: 14px 16px; position: sticky; top: 0; z-index: 2; }
+  header h1 { margin: 0; font-size: 1.1rem; } header p { margin: 2px 0 0; font-size: 0.8rem; opacity: 0.85; }
+  main { max-width: 860px; margin: 0 auto; padding: 12px; }
+  h2 { background: #1a4a7a; color: white; font-size: 0.95rem; padding: 10px 12px; border-radius: 8px; margin: 22px 0 10px; }
+  label { display: block; font-size: 0.85rem; font-weight: 600; margin: 10px 0 4px; }
+  input[type=text], input[type=date], select, textarea { width: 100%; box-sizing: border-box; padding: 10px; font-size: 1rem;
+    border: 1px solid #cbd5e1; border-radius: 6px; background: white; }
+  .item { background: white; border-left: 4px solid #1a4a7a; border-radius: 6px; padding: 10px 12px; margin: 8px 0; }
+  .item p { margin: 0 0 8px; font-size: 0.9rem; }
+  .scale { display: flex; gap: 4px; } .scale label { flex: 1; margin: 0; }
+  .scale input { display: none; }
+  .scale span { display: block; text-align: center; padding: 10px 0; border: 1px solid #cbd5e1; border-radius: 6px; background: white; }
+  .scale input:checked + span { background: #0d2b4e; color: white; border-color: #0d2b4e; }
+  .bar { position: sticky; bottom: 0; background: white; border-top: 1px solid #e2e8f0; padding: 10px 12px; display: flex; gap: 8px; align-items: center; }
+  button { padding: 12px 14px; font-size: 0.95rem; border: 0; border-radius: 6px; background: #0d2b4e; color: white; }
+  button.alt { background: #e2e8f0; color: #0d2b4e; }
+  #score { font-weight: 700; margin-right: auto; } .err { color: #dc2626; font-size: 0.85rem; } .ok { color: #16a34a; font-size: 0.85rem; }
+</style></head>
+<body>
+<header><h1>⚕️ Clinical Pharmacist Assessment</h1><p id="status"></p></header>
+<main><form id="form"></form><div id="messages"></div></main>
+<div class="bar"><span id="score">—</span>
+  <button type="button" class="alt" id="new">New</button>
+  <button type="button" id="complete">Complete</button>
+  <button type="button" class="alt" id="sync">Sync (<span id="outbox">0</span>)</button></div>
+<script>
+const FW = __FRAMEWORK__;
+const DRAFT_KEY = "pharm_assess_draft:" + FW.tenant, OUTBOX_KEY = "pharm_assess_outbox:" + FW.tenant;
+const $ = (id) => document.getElementById(id);
+const esc = (s) => String(s).replace(/[&<>"]/g, (c) => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+const load = (k, d) => JSON.parse(localStorage.getItem(k) || "null") || d;
+const store = (k, v) => localStorage.setItem(k, JSON.stringify(v));
+const uuid = () => (crypto.randomUUID ? crypto.randomUUID() : String(Date.now()) + Math.random()).replace(/-/g, "");
+
+function text(name, label) { return `<label>${label}<input type="text" name="${name}"></label>`; }
+function dateIn(name, label) { return `<label>${label}<input type="date" name="${name}"></label>`; }
+function select(name, label, opts) {
+  return `<label>${label}<select name="${name}">${opts.map((o) => `<option>${esc(o)}</option>`).join("")}</select></label>`;
+}
+function area(name, label) { return `<label>${label}<textarea name="${name}" rows="4"></textarea></label>`; }
+
+function render() {
+  let h = "<h2>Assessment Information</h2>" + text("pharmacist_name", "Pharmacist Being Assessed (Last, First)")
+    + text("pharmacist_credentials", "Pharmacist Credentials") + select("unit", "Clinical Unit / Service", FW.unit_options)
+    + select("assessment_type", "Assessment Type", FW.assessment_types) + text("assessor_name", "Assessor Name (Last, First)")
+    + text("assessor_credentials", "Assessor Credentials") + select("assessor_role", "Assessor Role", FW.assessor_roles)
+    + dateIn("assessment_date", "Assessment Date") + dateIn("obs_start", "Observation Period — Start")
+    + dateIn("obs_end", "Observation Period — End") + area("context_notes", "Assessment Context / Additional Notes");
+  for (const dom of FW.domains) {
+    h += `<h2>${esc(dom.title)}</h2>`;
+    for (const it of dom.items) {
+      h += `<div class="item"><p>${esc(it.text)}${it.optional ? " <small>(Optional)</small>" : ""}</p><div class="scale">`
+        + FW.rating_options.map(([lbl, v]) => `<label title="${esc(lbl)}"><input type="radio" name="r:${it.id}" value="${v}"`
+          + `${v === 0 ? " checked" : ""}><span>${v || "N/A"}</span></label>`).join("") + "</div></div>";
+    }
+  }
+  h += "<h2>Narrative Assessment</h2>" + area("strengths", "Clinical Strengths") + area("development", "Areas for Development")
+    + area("goals", "Action Plan / Goals") + area("summary", "Overall Performance Summary")
+    + select("followup", "Recommended Follow-Up Timeline", FW.follow_up_options)
+    + `<label><input type="checkbox" name="attestation"> I confirm this assessment is objective, complete, and based on observed performance.</label>`;
+  $("form").innerHTML = h;
+}
+
+function read() {
+  const f = $("form"), rec = {info: {}, ratings: {}, narratives: {}};
+  for (const el of f.elements) {
+    if (!el.name || (el.type === "radio" && !el.checked)) continue;
+    if (el.name.startsWith("r:")) rec.ratings[el.name.slice(2)] = Number(el.value);
+    else if (FW.narrative_fields.includes(el.name)) rec.narratives[el.name] = el.type === "checkbox" ? el.checked : el.value;
+    else rec.info[el.name] = el.value;
+  }
+  return rec;
+}
+
+function fill(rec) {
+  const f = $("form");
+  for (const el of f.elements) {
+    if (!el.name) continue;
+    if (el.name.startsWith("r:")) el.checked = Number(el.value) === (rec.ratings[el.name.slice(2)] || 0);
+    else if (el.type === "checkbox") el.checked = !!rec.narratives[el.name];
+    else { const v = FW.narrative_fields.includes(el.name) ? rec.narratives[el.name] : rec.info[el.name]; if (v != null) el.value = v; }
+  }
+}
+
+function fresh() {
+  const today = new Date().toISOString().slice(0, 10);
+  return {client_id: uuid(), info: {assessment_date: today, obs_start: today.slice(0, 8) + "01", obs_end: today}, ratings: {}, narratives: {}};
+}
+
+let current = load(DRAFT_KEY, null) || fresh();
+
+function update() {
+  current = {...current, ...read()};
+  store(DRAFT_KEY, current);
+  const vals = Object.values(current.ratings).filter((v) => v > 0);
+  $("score").textContent = vals.length ? (vals.reduce((a, b) => a + b, 0) / vals.length).toFixed(2) + " / 5" : "—";
+  $("outbox").textContent = load(OUTBOX_KEY, []).length;
+}
+
+function say(html) { $("messages").innerHTML = html; }
+
+async function gzip(body) {
+  if (!window.CompressionStream) return [body, {}];
+  const stream = new Blob([body]).stream().pipeThrough(new CompressionStream("gzip"));
+  return [await new Response(stream).arrayBuffer(), {"Content-Encoding": "gzip"}];
+}
+
+async function sync() {
+  const outbox = load(OUTBOX_KEY, []);
+  if (!outbox.length || !navigator.onLine) return update();
+  $("status").textContent = `Syncing ${outbox.length}…`;
+  try {
+    const [body, headers] = await gzip(JSON.stringify({framework_version: FW.version, assessments: outbox}));
+    const resp = await fetch(FW.sync_url, {method: "POST", headers: {"Content-Type": "application/json", ...headers}, body});
+    if (!resp.ok) throw new Error(resp.status + " " + resp.statusText);
+    const results = (await resp.json()).results;
+    const done = new Set(results.filter((r) => r.status === "saved").map((r) => r.client_id));
+    store(OUTBOX_KEY, load(OUTBOX_KEY, []).filter((r) => !done.has(r.client_id)));
+    say(results.map((r) => r.status === "saved"
+      ? `<p class="ok">✔ ${esc(r.pharmacist_name)}: ${r.overall ?? "N/A"} — ${esc(r.category)}</p>`
+      : `<p class="err">✖ ${esc(r.pharmacist_name)}: ${r.issues.map(esc).join("<br>")}</p>`).join(""));
+    $("status").textContent = "Synced " + new Date().toLocaleTimeString();
+  } catch (e) {
+    $("status").textContent = "Offline — " + load(OUTBOX_KEY, []).length + " waiting to sync";
+  }
+  update();
+}
+
+render();
+fill(current);
+update();
+$("status").textContent = navigator.onLine ? "Online" : "Offline — changes are kept on this device";
+$("form").addEventListener("input", update);
+$("form").addEventListener("change", update);
+$("new").onclick = () => { current = fresh(); render(); fill(current); update(); say(""); window.scrollTo(0, 0); };
+$("complete").onclick = () => {
+  update();
+  if (!current.info.pharmacist_name || !current.info.assessor_name) return say('<p class="err">Enter the pharmacist and assessor names.</p>');
+  if (!current.narratives.attestation) return say('<p class="err">Confirm the assessor attestation first.</p>');
+  store(OUTBOX_KEY, load(OUTBOX_KEY, []).filter((r) => r.client_id !== current.client_id).concat([current]));
+  current = fresh(); render(); fill(current); update();
+  say('<p class="ok">Queued for sync.</p>'); window.scrollTo(0, 0); sync();
+};
+$("sync").onclick = sync;
+window.addEventListener("online", sync);
+if ("serviceWorker" in navigator) navigator.serviceWorker.register("sw.js");
+</script>
+</body></html>
+"""
+
+OFFLINE_SW = r"""const CACHE = "pharm-assess-__VERSION__";
+self.addEventListener("install", (e) => e.waitUntil(caches.open(CACHE).then((c) => c.addAll(["./", "index.html", "manifest.webmanifest"]))));
+self.addEventListener("activate", (e) => e.waitUntil(caches.keys().then((ks) => Promise.all(ks.filter((k) => k !== CACHE).map((k) => caches.delete(k))))));
+self.addEventListener("fetch", (e) => {
+  if (e.request.method !== "GET") return;
+  e.respondWith(caches.match(e.request).then((hit) => hit || fetch(e.request)));
+});
+"""
+
+SYNC_MAX_BYTES = 8 * 1024 * 1024   # decompressed batch size limit
+
+def offline_bundle(tenant=DEFAULT_TENANT, sync_url="sync"):
+    """Static offline app for a tenant's framework as {filename: text}."""
+    fw = get_framework(tenant)
+    framework = {
+        "tenant": fw["tenant"],
+        "version": FRAMEWORK_VERSION,
+        "sync_url": sync_url,
+        "domains": [{"id": d["id"], "title": d["title"],
+                     "items": [{"id": it["id"], "text": it["text"], "optional": bool(it.get("optional"))}
+                               for it in d["items"]]}
+                    for d in fw["domains"]],
+        "rating_options": list(fw["catalog"]["label_to_value"].items()),
+        "unit_options": fw["unit_options"],
+        "assessment_types": ASSESSMENT_TYPES,
+        "assessor_roles": fw["assessor_roles"],
+        "follow_up_options": FOLLOW_UP_OPTIONS,
+        "narrative_fields": [*NARRATIVE_FIELDS, "followup", "attestation"],
+    }
+    # Cache name tracks the framework, so devices pick up a new bundle when it changes.
+    version = f"{fw['tenant']}-{fw['locale']}-{FRAMEWORK_VERSION}-{len(fw['item_ids'])}"
+    manifest = {
+        "name": f"Pharmacist Assessment — {fw['name']}",
+        "short_name": "PharmAssess",
+        "start_url": "index.html",
+        "display": "standalone",
+        "background_color": "#f8fafc",
+        "theme_color": "#0d2b4e",
+    }
+    return {
+        "index.html": OFFLINE_HTML.replace("__FRAMEWORK__", json.dumps(framework).replace("</", "<\\/")),
+        "sw.js": OFFLINE_SW.replace("__VERSION__", version),
+        "manifest.webmanifest": json.dumps(manifest, indent=2),
+    }
+
+def write_offline_bundle(out_dir, tenant=DEFAULT_TENANT, sync_url="sync"):
+    """Write the offline app files into out_dir; returns the paths written."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, text in offline_bundle(tenant, sync_url).items():
+        path = os.path.join(out_dir, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        paths.append(path)
+    return paths
+
+def reports_dir(tenant=DEFAULT_TENANT):
+    return os.path.join(tenant_dir(tenant), "reports")
+
+def _clean_sync_record(rec, fw):
+    """
+    (client_id, info, ratings, narratives) from a client record, dropping
+    unknown fields and ratings that are not whole numbers 0-5. Raises
+    ValueError if the record or its parts are not objects.
+    """
+    if not isinstance(rec, dict):
+        raise ValueError("Record is not a valid assessment.")
+    parts = [rec.get(k) or {} for k in ("info", "ratings", "narratives")]
+    if not all(isinstance(p, dict) for p in parts):
+        raise ValueError("Record is not a valid assessment.")
+    raw_info, raw, raw_narratives = parts
+    info_keys = ("pharmacist_name", "pharmacist_credentials", "unit", "assessor_name", "assessor_credentials",
+                 "assessor_role", "assessment_type", "assessment_date", "obs_start", "obs_end", "context_notes")
+    info = {k: str(raw_info.get(k) or "") for k in info_keys}
+    # type() rather than isinstance(): JSON true/false are bools, and 3.0 == 3.
+    ratings = {iid: raw[iid] for iid in fw["item_ids"] if type(raw.get(iid)) is int and 0 <= raw[iid] <= 5}
+    narratives = {k: str(raw_narratives.get(k) or "") for k in (*NARRATIVE_FIELDS, "followup")}
+    narratives["attestation"] = raw_narratives.get("attestation") is True
+    client_id = "".join(c for c in str(rec.get("client_id", "")) if c.isalnum())[:64] or None
+    return client_id, info, ratings, narratives
+
+def _sync_assessment_ids(client_ids, tenant=DEFAULT_TENANT):
+    """Server assessment id for each offline client id (None stays None), assigning new ones."""
+    with get_pool(tenant).connection() as conn, conn:
+        conn.executemany("INSERT OR IGNORE INTO sync_clients (client_id, assessment_id) VALUES (?, ?)",
+                         [(c, uuid.uuid4().hex) for c in client_ids if c])
+        known = {r["client_id"]: r["assessment_id"] for r in conn.execute(
+            f"SELECT client_id, assessment_id FROM sync_clients WHERE client_id IN ({', '.join('?' * len(client_ids))})",
+            client_ids)}
+    return [known.get(c) for c in client_ids]
+
+def load_sync_report(assessment_id, tenant=DEFAULT_TENANT):
+    """PDF bytes of a synced assessment's report (decrypting it if sealed), or None."""
+    base = os.path.join(reports_dir(tenant), assessment_id)
+    if os.path.exists(base + ".pdf.enc"):
+        with open(base + ".pdf.enc", "rb") as fh:
+            blob = fh.read()
+        cipher = get_field_cipher(tenant)
+        if cipher is None:
+            raise RuntimeError("Stored data is encrypted; set PHARM_ASSESS_KEY or PHARM_ASSESS_KEY_FILE to read it")
+        return cipher.decrypt(blob, f"report/{assessment_id}")
+    if os.path.exists(base + ".pdf"):
+        with open(base + ".pdf", "rb") as fh:
+            return fh.read()
+    return None
+
+def ingest_sync_batch(body, tenant=DEFAULT_TENANT, content_encoding=None, render=True):
+    """
+    Validate, save, score and (optionally) render a batch uploaded by the
+    offline app. Returns one result dict per record, in upload order.
+    Raises ValueError for a malformed or oversized batch.
+    """
+    import zlib
+    if content_encoding == "gzip":
+        try:
+            d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            body = d.decompress(body, SYNC_MAX_BYTES)
+            if d.unconsumed_tail:
+                raise ValueError("Sync batch is too large.")
+        except zlib.error as exc:
+            raise ValueError(f"Sync batch is not valid gzip: {exc}") from None
+    elif len(body) > SYNC_MAX_BYTES:
+        raise ValueError("Sync batch is too large.")
+    try:
+        payload = json.loads(body)
+        records = payload["assessments"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Sync batch is not a valid assessment upload.") from None
+    if not isinstance(records, list):
+        raise ValueError("Sync batch is not a valid assessment upload.")
+
+    fw = get_framework(tenant)
+    results, accepted = [], []
+    for rec in records:
+        try:
+            client_id, info, ratings, narratives = _clean_sync_record(rec, fw)
+        except ValueError as exc:
+            # Only this record is rejected; the rest of the upload goes ahead.
+            results.append({"client_id": rec.get("client_id") if isinstance(rec, dict) else None,
+                            "pharmacist_name": "", "status": "rejected", "issues": [str(exc)],
+                            "overall": None, "category": perf_category(None)})
+            continue
+        issues = [i["message"] for i in validate_assessment(info, ratings, narratives, fw["rule_set"])]
+        if not (info["pharmacist_name"] and info["assessor_name"]):
+            issues.insert(0, "Pharmacist and assessor names are required.")
+        overall = calc_overall_avg(ratings)
+        results.append({
+            "client_id": rec.get("client_id"),
+            "pharmacist_name": info["pharmacist_name"],
+            "status": "rejected" if issues else "saved",
+            "issues": issues,
+            "overall": overall,
+            "category": perf_category(overall),
+        })
+        if not issues:
+            accepted.append((results[-1], (info, ratings, narratives, client_id)))
+
+    if accepted:
+        server_ids = _sync_assessment_ids([rec[3] for _, rec in accepted], tenant)
+        ids = save_assessments([(*rec[:3], sid) for (_, rec), sid in zip(accepted, server_ids)],
+                               tenant, fw["item_ids"])
+        for (result, _), assessment_id in zip(accepted, ids):
+            result["assessment_id"] = assessment_id
+        if render:
+            out = reports_dir(tenant)
+            os.makedirs(out, exist_ok=True)
+            cipher = get_field_cipher(tenant)
+            pdfs = generate_pdf_reports((rec[:3] for _, rec in accepted), tenant=tenant)
+            for assessment_id, pdf in zip(ids, pdfs):
+                if pdf is None:
+                    break
+                name = f"{assessment_id}.pdf"
+                if cipher is not None:
+                    pdf, name = cipher.encrypt(pdf, f"report/{assessment_id}"), name + ".enc"
+                tmp = os.path.join(out, f".{name}.tmp")
+                with open(tmp, "wb") as fh:
+                    fh.write(pdf)
+                os.replace(tmp, os.path.join(out, name))
+    return results
+
+# ─── BATCH ENTRY ──────────────────────────────────────────────────────────────
+# Grid entry for annual reviews of a whole unit: one row per pharmacist, one
+# column per item holding a rating label of the session's locale. Each edit turns the grid
+# into a uint8 rating matrix (the same layout as the stored matrix) in one
+# lookup, and every row's domain and overall scores come from column views of
+# that matrix, so scoring cost does not grow with per-row Python work.
+
+BATCH_ID_COLUMNS = [("pharmacist_name", "Pharmacist (Last, First)"), ("pharmacist_credentials", "Credentials")]
+BATCH_NOTE_COLUMNS = [("strengths", "Clinical Strengths"), ("development", "Areas for Development")]
+
+def batch_grid(names=(), domains=DOMAINS, credentials=None, catalog=None):
+    """Entry grid with one row per pharmacist name, every item rated N/A."""
+    idx = framework_index(domains)
+    na = (catalog or compile_catalog())["value_to_label"][0]
+    credentials = credentials or {}
+    columns = [k for k, _ in BATCH_ID_COLUMNS] + list(idx["item_ids"]) + [k for k, _ in BATCH_NOTE_COLUMNS]
+    rows = [{"pharmacist_name": name, "pharmacist_credentials": credentials.get(name, ""),
+             **{iid: na for iid in idx["item_ids"]}, "strengths": "", "development": ""}
+            for name in names]
+    return pd.DataFrame(rows, columns=columns)
+
+def grid_ratings(grid, domains=DOMAINS, catalog=None):
+    """(rows × items) uint8 rating matrix for a grid of rating labels; blank cells count as N/A."""
+    idx = framework_index(domains)
+    lookup = pd.Series(dict((catalog or compile_catalog())["label_to_value"]), dtype=float)
+    cells = grid[list(idx["item_ids"])].to_numpy(dtype=object).ravel()
+    values = lookup.reindex(cells).fillna(0).to_numpy(dtype=np.uint8)
+    return values.reshape(len(grid), idx["total_items"])
+
+def relabel_grid(grid, domains, catalog, new_catalog):
+    """The grid with every rating label replaced by the same rating's label in another locale."""
+    item_ids = list(framework_index(domains)["item_ids"])
+    labels = np.array([new_catalog["value_to_label"][v] for v in range(len(new_catalog["rating_labels"]))],
+                      dtype=object)
+    out = grid.copy()
+    out[item_ids] = labels[grid_ratings(grid, domains, catalog)]
+    return out
+
+def grid_scores(matrix, domains=DOMAINS):
+    """Domain and overall averages plus performance band for every matrix row."""
+    views = domain_views(matrix, domains)
+    scores = pd.DataFrame({dom["short"]: _matrix_averages(views[dom["id"]]) for dom in domains})
+    overall = _matrix_averages(matrix)
+    band = np.where(np.isnan(overall), len(SCORE_BANDS), np.searchsorted(SCORE_BAND_EDGES, overall, side="right"))
+    scores["Overall"] = overall
+    scores["Band"] = np.array(SCORE_BANDS + [perf_category(None)])[band]
+    return scores
+
+def _grid_text(grid, column):
+    return grid[column].fillna("").astype(str).str.strip()
+
+def grid_issues(grid, matrix, catalog=None):
+    """[(row number, message)] for rows that cannot be saved; blank rows are ignored."""
+    names = _grid_text(grid, "pharmacist_name")
+    rated = (matrix > 0).any(axis=1)
+    low = ((matrix == 1) | (matrix == 2)).any(axis=1)
+    no_dev = (_grid_text(grid, "development") == "").to_numpy()
+    duplicate = (names.duplicated(keep=False) & (names != "")).to_numpy()
+    unnamed = ((names == "").to_numpy() & rated)
+    issues = []
+    for pos in np.flatnonzero(unnamed | duplicate | (low & no_dev)):
+        if unnamed[pos]:
+            issues.append((int(pos) + 1, tr("has ratings but no pharmacist name.", catalog)))
+        elif duplicate[pos]:
+            issues.append((int(pos) + 1, tr("{name} appears more than once.", catalog).format(name=names.iloc[pos])))
+        else:
+            issues.append((int(pos) + 1, tr("{name} has a rating of 1–2 — add Areas for Development.", catalog)
+                           .format(name=names.iloc[pos])))
+    return issues
+
+def grid_records(grid, matrix, shared_info, shared_narratives, domains=DOMAINS):
+    """(info, ratings, narratives) for every named grid row, in grid order."""
+    item_ids = framework_index(domains)["item_ids"]
+    records = []
+    for row, values in zip(grid.to_dict("records"), matrix.tolist()):
+        name = str(row.get("pharmacist_name") or "").strip()
+        if not name:
+            continue
+        info = {**shared_info, "pharmacist_name": name,
+                "pharmacist_credentials": str(row.get("pharmacist_credentials") or "").strip()}
+        narratives = {"strengths": str(row.get("strengths") or ""), "development": str(row.get("development") or ""),
+                      "goals": "", "summary": "", **shared_narratives}
+        records.append((info, dict(zip(item_ids, values)), narratives))
+    return records
+
+BATCH_ROW_FIELDS = frozenset({*(k for k, _ in BATCH_ID_COLUMNS), *(k for k, _ in BATCH_NOTE_COLUMNS)})
+
+def grid_rule_issues(grid, records, rule_set=RULE_SET):
+    """
+    [(row number or None, message)] from the full rule set for the records of
+    grid_records. Rules reading only shared fields are reported once, with no
+    row. The attestation rule is skipped: it gates the PDFs, not saving.
+    """
+    positions = [pos for pos, name in enumerate(grid.get("pharmacist_name", []), 1) if str(name or "").strip()]
+    issues, shared = [], set()
+    for pos, (info, ratings, narratives) in zip(positions, records):
+        per_row = BATCH_ROW_FIELDS | ratings.keys()
+        for violation in validate_assessment(info, ratings, narratives, rule_set):
+            rule = rule_set["by_id"][violation["rule"]]
+            if rule["id"] == "attestation" or violation["severity"] != "error":
+                continue
+            if per_row.isdisjoint(rule["inputs"]):
+                if rule["id"] not in shared:
+                    shared.add(rule["id"])
+                    issues.append((None, violation["message"]))
+            else:
+                issues.append((pos, violation["message"]))
+    return issues
+
+def unit_roster(unit, tenant=DEFAULT_TENANT):
+    """{pharmacist_name: latest credentials} for everyone with a saved assessment on a unit."""
+    roster = {}
+    cipher = get_field_cipher(tenant)
+    with get_pool(tenant).connection() as conn:
+        for row in conn.execute(
+            "SELECT id, pharmacist_name, info_json FROM assessments WHERE unit = ? "
+            "AND COALESCE(pharmacist_name, '') != '' ORDER BY updated_at", (unit,)
+        ):
+            name = open_value(cipher, row["pharmacist_name"], f"{row['id']}/pharmacist_name")
+            if name:
+                credentials = json.loads(row["info_json"]).get("pharmacist_credentials", "")
+                roster[name] = open_value(cipher, credentials, f"{row['id']}/pharmacist_credentials")
+    return dict(sorted(roster.items()))
 
 # ─── SESSION STATE INITIALIZATION ─────────────────────────────────────────────
 
 def init_state():
+    if "tenant" not in st.session_state:
+        st.session_state.tenant = st.query_params.get("tenant", DEFAULT_TENANT)
     if "ratings" not in st.session_state:
         st.session_state.ratings = {}
     if "page" not in st.session_state:
         st.session_state.page = "assessment"
     if "submitted" not in st.session_state:
         st.session_state.submitted = False
+    if "assessment_id" not in st.session_state:
+        st.session_state.assessment_id = None
+    if "rule_state" not in st.session_state:
+        st.session_state.rule_state = {}
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "locale" not in st.session_state:
+        cfg = load_tenant_configs().get(st.session_state.tenant, {})
+        locale = st.query_params.get("lang", cfg.get("locale", DEFAULT_LOCALE))
+        st.session_state.locale = locale if locale in available_locales() else DEFAULT_LOCALE
+
+def _locale_changed():
+    # Rule results hold messages in the previous language; re-check everything.
+    st.session_state.rule_state = {}
+    st.query_params["lang"] = st.session_state.locale
+
+DRAFT_DATE_FIELDS = ("assessment_date", "obs_start", "obs_end")
+
+def init_draft():
+    """Attach the session to a draft: resume the one in ?draft= or start a new one."""
+    if "draft_id" in st.session_state:
+        return
+    fw = get_framework(st.session_state.tenant)
+    draft_id = st.query_params.get("draft")
+    draft = None
+    if draft_id:
+        # The snapshot is written synchronously and carries the whole session,
+        # so prefer it; the batched JSON draft is the fallback.
+        draft = load_session(draft_id, fw["tenant"], fw["item_ids"]) or load_draft(draft_id, fw["tenant"])
+    if draft:
+        for k, v in {**draft["info"], **draft["narratives"]}.items():
+            if k in DRAFT_DATE_FIELDS:
+                v = date.fromisoformat(v)
+            if k == "unit" and v not in fw["unit_options"]:
+                continue
+            if k == "assessor_role" and v not in fw["assessor_roles"]:
+                continue
+            st.session_state[f"f_{k}"] = v
+        st.session_state.ratings = draft["ratings"]
+        st.session_state.assessment_id = draft.get("assessment_id")
+        if "page" in draft:
+            st.session_state.page = draft["page"] or st.session_state.page
+            st.session_state.submitted = draft["submitted"]
+    else:
+        draft_id = uuid.uuid4().hex
+        st.query_params["draft"] = draft_id
+    st.session_state.draft_id = draft_id
+
+    today = date.today()
+    for key, default in (("f_assessment_date", today),
+                         ("f_obs_start", today.replace(day=1)),
+                         ("f_obs_end", today)):
+        if key not in st.session_state:
+            st.session_state[key] = default
 
 # ─── UI COMPONENTS ────────────────────────────────────────────────────────────
 
-def render_epa_legend():
-    st.markdown("""
-    <div class='epa-box'>
-    <b>EPA Rating Scale (ASHP/ACCP Entrustment Framework)</b><br/>
-    <div class='epa-row'><span class='epa-dot' style='background:#dc2626'></span><b>1</b> — Needs Significant Development: significant supervision required</div>
-    <div class='epa-row'><span class='epa-dot' style='background:#ea580c'></span><b>2</b> — Developing (Below Expectations): direct supervision required</div>
-    <div class='epa-row'><span class='epa-dot' style='background:#ca8a04'></span><b>3</b> — Progressing (Approaching Expectations): indirect supervision</div>
-    <div class='epa-row'><span class='epa-dot' style='background:#16a34a'></span><b>4</b> — Meets Expectations (Practice-Ready): independent practice</div>
-    <div class='epa-row'><span class='epa-dot' style='background:#2563eb'></span><b>5</b> — Exemplary (Exceeds Expectations): role model / peer resource</div>
-    <div class='epa-row'><span class='epa-dot' style='background:#94a3b8'></span><b>N/A</b> — Not observed or not applicable to this pharmacist's current role</div>
-    </div>
-    """, unsafe_allow_html=True)
+def render_epa_legend(catalog=None):
+    catalog = catalog or compile_catalog()
+    rows = "".join(
+        f"<div class='epa-row'><span class='epa-dot' style='background:{e['color']}'></span>"
+        f"<b>{v}</b> — {e['label'].split(' — ', 1)[-1]}: {e['hint']}</div>"
+        for v, e in catalog["epa"].items()
+    )
+    title = tr("EPA Rating Scale (ASHP/ACCP Entrustment Framework)", catalog)
+    na = tr("Not observed or not applicable to this pharmacist's current role", catalog)
+    st.markdown(
+        f"<div class='epa-box'><b>{title}</b><br/>{rows}"
+        f"<div class='epa-row'><span class='epa-dot' style='background:#94a3b8'></span><b>N/A</b> — {na}</div></div>",
+        unsafe_allow_html=True,
+    )
 
-def render_domain_ratings(domain, ratings_state):
+def render_domain_ratings(domain, ratings_state, index=None, catalog=None):
     """Render all rating items for a domain."""
+    index = index or framework_index()
+    catalog = catalog or compile_catalog()
     st.markdown(f"<div class='domain-header'>{domain['title']}</div>", unsafe_allow_html=True)
     st.markdown(f"<div class='domain-desc'>📚 <em>{domain['description']}</em></div>", unsafe_allow_html=True)
 
@@ -942,25 +4481,30 @@ def render_domain_ratings(domain, ratings_state):
         )
         current = ratings_state.get(item["id"], 0)
         # Map value back to display option
-        reverse_map = {v: k for k, v in RATING_OPTIONS.items()}
-        current_label = reverse_map.get(current, "N/A — Not observed / Not applicable to role")
+        current_label = catalog["value_to_label"].get(current, catalog["value_to_label"][0])
         chosen = st.radio(
             label=" ",
-            options=list(RATING_OPTIONS.keys()),
-            index=list(RATING_OPTIONS.keys()).index(current_label),
+            options=catalog["rating_labels"],
+            index=catalog["label_position"][current_label],
             key=f"radio_{item['id']}",
             horizontal=False,
             label_visibility="collapsed",
         )
-        ratings_state[item["id"]] = RATING_OPTIONS[chosen]
+        ratings_state[item["id"]] = catalog["label_to_value"][chosen]
         st.divider()
 
-def render_score_summary(ratings):
-    """Show domain and overall scores in a visual summary."""
-    st.markdown("<div class='section-title'>📊 Assessment Results Preview</div>", unsafe_allow_html=True)
+def render_score_summary(ratings, domains=DOMAINS, benchmark=None, catalog=None):
+    """Show domain and overall scores in a visual summary, with peer percentiles if given."""
+    st.markdown(f"<div class='section-title'>📊 {tr('Assessment Results Preview', catalog)}</div>",
+                unsafe_allow_html=True)
 
     all_vals = [v for v in ratings.values() if v and v > 0]
     overall = round(sum(all_vals) / len(all_vals), 2) if all_vals else None
+    pct = {r["id"]: r["percentile"] for r in benchmark["rows"]} if benchmark else {}
+    percentile = tr("{ordinal} percentile", catalog)
+
+    def pct_note(key):
+        return f" &nbsp;•&nbsp; {percentile.format(ordinal=ordinal(pct[key]))}" if pct.get(key) is not None else ""
 
     if overall:
         col1, col2 = st.columns([1, 2])
@@ -968,17 +4512,22 @@ def render_score_summary(ratings):
             st.markdown(
                 f"<div class='overall-box'>"
                 f"<div class='big-score'>{overall}</div>"
-                f"<div style='font-size:0.75rem;opacity:0.7;'>out of 5.0</div>"
-                f"<div class='cat'>{perf_category(overall)}</div>"
-                f"<div class='sub'>{len(all_vals)} items rated</div>"
+                f"<div style='font-size:0.75rem;opacity:0.7;'>{tr('out of 5.0', catalog)}</div>"
+                f"<div class='cat'>{tr(perf_category(overall), catalog)}</div>"
+                f"<div class='sub'>{tr('{n} items rated', catalog).format(n=len(all_vals))}{pct_note('overall')}</div>"
                 f"</div>",
                 unsafe_allow_html=True
             )
+            if benchmark:
+                st.caption(tr("Peers: {label} (n = {n})", catalog).format(label=benchmark["label"], n=benchmark["n"])
+                           + ("" if benchmark["n"] >= COHORT_MIN_SIZE else
+                              tr(" — percentiles need at least {n} peers", catalog).format(n=COHORT_MIN_SIZE)))
         with col2:
-            for dom in DOMAINS:
-                item_ids = [it["id"] for it in dom["items"]]
-                avg = calc_domain_avg({k: ratings.get(k) for k in item_ids})
-                n = len([v for v in [ratings.get(iid) for iid in item_ids] if v and v > 0])
+            idx = framework_index(domains)
+            for dom in domains:
+                dom_ratings = domain_ratings(ratings, dom["id"], idx)
+                avg = calc_domain_avg(dom_ratings)
+                n = len([v for v in dom_ratings.values() if v and v > 0])
                 clr = score_color(avg)
                 bg  = score_bg(avg)
                 st.markdown(
@@ -986,69 +4535,71 @@ def render_score_summary(ratings):
                     f"<div class='score-card-title'>{dom['short']}</div>"
                     f"<div class='score-card-value' style='color:{clr}'>"
                     f"{avg if avg else '—'}</div>"
-                    f"<div class='score-card-label'>{perf_category(avg)} &nbsp;•&nbsp; {n}/{len(dom['items'])} rated</div>"
+                    f"<div class='score-card-label'>{tr(perf_category(avg), catalog)} &nbsp;•&nbsp; "
+                    f"{tr('{n}/{total} rated', catalog).format(n=n, total=len(dom['items']))}"
+                    f"{pct_note(dom['id'])}</div>"
                     f"</div>",
                     unsafe_allow_html=True
                 )
     else:
-        st.info("Complete ratings above to see your results preview.")
+        st.info(tr("Complete ratings above to see your results preview.", catalog))
 
 # ─── PAGES ────────────────────────────────────────────────────────────────────
 
+@timed("page_assessment")
 def page_assessment():
     """Main assessment entry page."""
+    fw = get_framework(st.session_state.tenant, st.session_state.locale)
+    tenant, cat = fw["tenant"], fw["catalog"]
+    # Option values are stored in English; only their display is translated.
+    as_text = functools.partial(tr, catalog=cat)
 
-    st.markdown("""
+    st.markdown(f"""
     <div class='app-header'>
-      <h1>⚕️ Clinical Pharmacist Performance Assessment</h1>
-      <p>Acute Care Hospital | Manager & Peer Review Tool | ASHP · ACCP · JCPP Standards</p>
+      <h1>⚕️ {tr("Clinical Pharmacist Performance Assessment", cat)}</h1>
+      <p>{tr("Acute Care Hospital | Manager & Peer Review Tool | ASHP · ACCP · JCPP Standards", cat)}</p>
     </div>
     """, unsafe_allow_html=True)
 
-    st.markdown("""
+    st.markdown(f"""
     <div class='callout-blue'>
-    <b>For Assessors:</b> This tool is designed to support <b>objective, standardized</b> performance assessment
-    of clinical pharmacists practicing on an acute care patient care unit. All domains and rating criteria are
-    grounded in nationally recognized standards. Complete all applicable items based on <b>direct observation
-    and/or documented clinical work</b> during the specified observation period. Rate items <b>N/A</b> only if
-    the activity was not observed or is not within the pharmacist's current scope of practice.
+    {tr("<b>For Assessors:</b> This tool is designed to support <b>objective, standardized</b> performance assessment "
+        "of clinical pharmacists practicing on an acute care patient care unit. All domains and rating criteria are "
+        "grounded in nationally recognized standards. Complete all applicable items based on <b>direct observation "
+        "and/or documented clinical work</b> during the specified observation period. Rate items <b>N/A</b> only if "
+        "the activity was not observed or is not within the pharmacist's current scope of practice.", cat)}
     </div>
     """, unsafe_allow_html=True)
 
     # ── SECTION 1: Assessment Info ─────────────────────────────────────────
-    st.markdown("<div class='section-title'>📋 Section 1 — Assessment Information</div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='section-title'>📋 {tr('Section 1 — Assessment Information', cat)}</div>",
+                unsafe_allow_html=True)
 
     c1, c2 = st.columns(2)
     with c1:
-        p_name = st.text_input("Pharmacist Being Assessed (Last, First)", placeholder="Smith, Jane")
-        p_cred = st.text_input("Pharmacist Credentials", placeholder="PharmD, BCPS")
-        unit   = st.selectbox("Clinical Unit / Service", UNIT_OPTIONS)
-        assess_type = st.selectbox("Assessment Type", ASSESSMENT_TYPES)
+        p_name = st.text_input(tr("Pharmacist Being Assessed (Last, First)", cat), placeholder="Smith, Jane", key="f_pharmacist_name")
+        p_cred = st.text_input(tr("Pharmacist Credentials", cat), placeholder="PharmD, BCPS", key="f_pharmacist_credentials")
+        unit   = st.selectbox(tr("Clinical Unit / Service", cat), fw["unit_options"], format_func=as_text, key="f_unit")
+        assess_type = st.selectbox(tr("Assessment Type", cat), ASSESSMENT_TYPES, format_func=as_text,
+                                   key="f_assessment_type")
     with c2:
-        a_name = st.text_input("Assessor Name (Last, First)", placeholder="Jones, Robert")
-        a_cred = st.text_input("Assessor Credentials", placeholder="PharmD, BCPS, BCCCP")
-        a_role = st.selectbox("Assessor Role", [
-            "Clinical Pharmacy Manager",
-            "Peer Clinical Pharmacist",
-            "Clinical Pharmacy Coordinator",
-            "Pharmacy Director / Associate Director",
-            "Residency Program Director (RPD)",
-            "Preceptor (Resident/Student Assessment)",
-            "Other",
-        ])
-        assess_date = st.date_input("Assessment Date", value=date.today())
+        a_name = st.text_input(tr("Assessor Name (Last, First)", cat), placeholder="Jones, Robert", key="f_assessor_name")
+        a_cred = st.text_input(tr("Assessor Credentials", cat), placeholder="PharmD, BCPS, BCCCP", key="f_assessor_credentials")
+        a_role = st.selectbox(tr("Assessor Role", cat), fw["assessor_roles"], format_func=as_text, key="f_assessor_role")
+        assess_date = st.date_input(tr("Assessment Date", cat), key="f_assessment_date")
 
     c3, c4 = st.columns(2)
     with c3:
-        obs_start = st.date_input("Observation Period — Start", value=date.today().replace(day=1))
+        obs_start = st.date_input(tr("Observation Period — Start", cat), key="f_obs_start")
     with c4:
-        obs_end = st.date_input("Observation Period — End", value=date.today())
+        obs_end = st.date_input(tr("Observation Period — End", cat), key="f_obs_end")
 
     context_notes = st.text_area(
-        "Assessment Context / Additional Notes (optional)",
-        placeholder="e.g., Observed during 2 months of MICU rotation; reviewed 15 clinical intervention notes; "
-                    "attended rounds 3× per week. Note any extenuating circumstances.",
+        tr("Assessment Context / Additional Notes (optional)", cat),
+        placeholder=tr("e.g., Observed during 2 months of MICU rotation; reviewed 15 clinical intervention notes; "
+                       "attended rounds 3× per week. Note any extenuating circumstances.", cat),
         height=80,
+        key="f_context_notes",
     )
 
     info = {
@@ -1066,73 +4617,95 @@ def page_assessment():
     }
 
     # ── SECTION 2: EPA Legend ──────────────────────────────────────────────
-    st.markdown("<div class='section-title'>📐 Section 2 — Rating Scale Reference</div>", unsafe_allow_html=True)
-    render_epa_legend()
+    st.markdown(f"<div class='section-title'>📐 {tr('Section 2 — Rating Scale Reference', cat)}</div>",
+                unsafe_allow_html=True)
+    render_epa_legend(cat)
 
-    st.markdown("""
+    st.markdown(f"""
     <div class='callout'>
-    <b>Objectivity Reminder:</b> Rate based solely on observed performance and documented clinical work.
-    Do not allow personal relationships, demographics, or other non-performance factors to influence ratings.
-    The purpose of this tool is professional development and quality improvement.
+    {tr("<b>Objectivity Reminder:</b> Rate based solely on observed performance and documented clinical work. "
+        "Do not allow personal relationships, demographics, or other non-performance factors to influence ratings. "
+        "The purpose of this tool is professional development and quality improvement.", cat)}
     </div>
     """, unsafe_allow_html=True)
 
     # ── SECTION 3–7: Domain Ratings ────────────────────────────────────────
-    st.markdown("<div class='section-title'>🩺 Section 3 — Performance Ratings by Domain</div>", unsafe_allow_html=True)
-    st.markdown("*Rate each item based on your observations. Use anchor descriptions as calibration guides.*")
+    st.markdown(f"<div class='section-title'>🩺 {tr('Section 3 — Performance Ratings by Domain', cat)}</div>",
+                unsafe_allow_html=True)
+    st.markdown(f"*{tr('Rate each item based on your observations. Use anchor descriptions as calibration guides.', cat)}*")
 
     ratings = st.session_state.ratings
-    for domain in DOMAINS:
-        render_domain_ratings(domain, ratings)
+    index = framework_index(fw["domains"])
+    for domain in fw["domains"]:
+        render_domain_ratings(domain, ratings, index, cat)
 
     # ── SECTION 8: Score Summary ───────────────────────────────────────────
-    render_score_summary(ratings)
+    scope = st.selectbox(
+        tr("Peer benchmark (last 12 months)", cat),
+        ["Same unit", "Same unit & assessment type", "All units", "None"],
+        format_func=as_text,
+        key="benchmark_scope",
+    )
+    benchmark = None
+    if scope != "None":
+        key = cohort_key(
+            unit if scope != "All units" else None,
+            assess_type if scope == "Same unit & assessment type" else None,
+            assess_date - timedelta(days=365), assess_date,
+        )
+        benchmark = peer_benchmark(ratings, key, tenant, st.session_state.assessment_id)
+    render_score_summary(ratings, fw["domains"], benchmark, cat)
 
     # ── SECTION 9: Narrative Comments ─────────────────────────────────────
-    st.markdown("<div class='section-title'>✍️ Section 4 — Narrative Assessment</div>", unsafe_allow_html=True)
-    st.markdown(
-        "*Narrative comments are required for all ratings of 1–2 and strongly encouraged for all ratings. "
-        "Be specific, objective, and behavior-based.*"
-    )
+    st.markdown(f"<div class='section-title'>✍️ {tr('Section 4 — Narrative Assessment', cat)}</div>",
+                unsafe_allow_html=True)
+    st.markdown("*" + tr("Narrative comments are required for all ratings of 1–2 and strongly encouraged for all ratings. "
+                         "Be specific, objective, and behavior-based.", cat) + "*")
 
     strengths = st.text_area(
-        "Clinical Strengths",
-        placeholder="Describe specific, observed strengths with clinical examples. "
-                    "e.g., 'Consistently identifies drug-drug interactions on rounds before team notices; "
-                    "independently manages complex vancomycin dosing in CRRT patients.'",
+        tr("Clinical Strengths", cat),
+        placeholder=tr("Describe specific, observed strengths with clinical examples. "
+                       "e.g., 'Consistently identifies drug-drug interactions on rounds before team notices; "
+                       "independently manages complex vancomycin dosing in CRRT patients.'", cat),
         height=130,
+        key="f_strengths",
     )
     development = st.text_area(
-        "Areas for Development",
-        placeholder="Describe specific performance gaps with behavioral examples. "
-                    "e.g., 'Documentation of clinical interventions is often delayed beyond 24 hours; "
-                    "antimicrobial de-escalation opportunities are identified but not always communicated to team.'",
+        tr("Areas for Development", cat),
+        placeholder=tr("Describe specific performance gaps with behavioral examples. "
+                       "e.g., 'Documentation of clinical interventions is often delayed beyond 24 hours; "
+                       "antimicrobial de-escalation opportunities are identified but not always communicated to team.'",
+                       cat),
         height=130,
+        key="f_development",
     )
     goals = st.text_area(
-        "Action Plan / Goals",
-        placeholder="List specific, measurable goals with timelines. "
-                    "e.g., '1. Complete all intervention documentation within same shift by [date]. "
-                    "2. Propose one antimicrobial stewardship intervention per week at rounds. "
-                    "3. Complete BCPS certification revier by Q3.'",
+        tr("Action Plan / Goals", cat),
+        placeholder=tr("List specific, measurable goals with timelines. "
+                       "e.g., '1. Complete all intervention documentation within same shift by [date]. "
+                       "2. Propose one antimicrobial stewardship intervention per week at rounds. "
+                       "3. Complete BCPS certification revier by Q3.'", cat),
         height=130,
+        key="f_goals",
     )
     summary = st.text_area(
-        "Overall Performance Summary",
-        placeholder="Provide an overall narrative summary of this pharmacist's performance, "
-                    "professional trajectory, and readiness for expanded responsibilities.",
+        tr("Overall Performance Summary", cat),
+        placeholder=tr("Provide an overall narrative summary of this pharmacist's performance, "
+                       "professional trajectory, and readiness for expanded responsibilities.", cat),
         height=110,
+        key="f_summary",
     )
-    followup = st.selectbox("Recommended Follow-Up Timeline", FOLLOW_UP_OPTIONS)
+    followup = st.selectbox(tr("Recommended Follow-Up Timeline", cat), FOLLOW_UP_OPTIONS, format_func=as_text,
+                            key="f_followup")
 
     # ── SECTION 10: Attestation ────────────────────────────────────────────
-    st.markdown("<div class='section-title'>✅ Section 5 — Assessor Attestation</div>", unsafe_allow_html=True)
-    st.markdown("""
-    *By confirming below, I attest that this assessment reflects my objective professional judgment
-    based on direct observation and/or documented clinical work during the specified observation period.
-    I confirm no conflict of interest that would compromise objectivity.*
-    """)
-    attested = st.checkbox("I confirm this assessment is objective, complete, and based on observed performance.")
+    st.markdown(f"<div class='section-title'>✅ {tr('Section 5 — Assessor Attestation', cat)}</div>",
+                unsafe_allow_html=True)
+    st.markdown("*" + tr("By confirming below, I attest that this assessment reflects my objective professional judgment "
+                         "based on direct observation and/or documented clinical work during the specified observation "
+                         "period. I confirm no conflict of interest that would compromise objectivity.", cat) + "*")
+    attested = st.checkbox(tr("I confirm this assessment is objective, complete, and based on observed performance.", cat),
+                           key="f_attestation")
 
     narratives = {
         "strengths": strengths,
@@ -1143,35 +4716,92 @@ def page_assessment():
         "attestation": attested,
     }
 
+    draft = {"info": info, "ratings": ratings, "narratives": narratives,
+             "assessment_id": st.session_state.assessment_id}
+    save_draft(st.session_state.draft_id, draft, tenant)
+    session = {**draft, "page": st.session_state.page, "submitted": st.session_state.submitted}
+    st.session_state.session_snapshot = save_session(
+        st.session_state.draft_id, session, tenant, fw["item_ids"], st.session_state.get("session_snapshot"))
+
+    fields = {**info, **ratings, **narratives}
+    if "audit_fields" not in st.session_state:
+        st.session_state.audit_fields = audit_state_at(st.session_state.draft_id, tenant=tenant)
+    record_changes(st.session_state.draft_id, diff_fields(st.session_state.audit_fields, fields), a_name, tenant)
+    st.session_state.audit_fields = fields
+
+    issues = evaluate_rules(fields, st.session_state.rule_state, fw["rule_set"])
+    for issue in issues:
+        if issue["rule"] != "attestation":
+            st.error(f"⚠️ {issue['message']}")
+
     # ── SECTION 11: Export ─────────────────────────────────────────────────
-    st.markdown("<div class='section-title'>📤 Section 6 — Export Assessment</div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='section-title'>📤 {tr('Section 6 — Export Assessment', cat)}</div>",
+                unsafe_allow_html=True)
 
     if not p_name or not a_name:
-        st.warning("⚠️ Please complete the pharmacist name and assessor name fields before exporting.")
+        st.warning("⚠️ " + tr("Please complete the pharmacist name and assessor name fields before exporting.", cat))
+    if any(i["rule"] == "attestation" for i in issues):
+        st.info(tr("Confirm the assessor attestation above to enable the PDF report.", cat))
+
+    if st.button("💾 " + tr("Save Assessment", cat), disabled=not (p_name and a_name)):
+        previous_id = st.session_state.assessment_id
+        st.session_state.assessment_id = save_assessment(
+            info, ratings, narratives, previous_id, tenant, fw["item_ids"]
+        )
+        record_changes(st.session_state.draft_id,
+                       diff_fields({"assessment_id": previous_id}, {"assessment_id": st.session_state.assessment_id}),
+                       a_name, tenant)
+        session["assessment_id"] = st.session_state.assessment_id
+        st.session_state.session_snapshot = save_session(
+            st.session_state.draft_id, session, tenant, fw["item_ids"], st.session_state.session_snapshot)
+        st.success(tr("Assessment saved.", cat))
+
+    if st.checkbox("🕓 " + tr("Show change history", cat), key="show_history"):
+        history = audit_history(st.session_state.draft_id, tenant)
+        if history:
+            st.dataframe(pd.DataFrame(history)[["ts", "actor", "field", "old", "new"]].fillna("—").astype(str),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.caption(tr("No changes recorded yet.", cat))
 
     col_csv, col_pdf = st.columns(2)
 
     with col_csv:
-        st.markdown("**Export CSV** — Import directly into Smartsheet, Excel, or any spreadsheet app")
-        if st.button("📊 Download CSV", disabled=not (p_name and a_name)):
-            csv_buf = export_csv(info, ratings, narratives)
+        st.markdown(tr("**Export CSV** — Import directly into Smartsheet, Excel, or any spreadsheet app", cat))
+        if st.button("📊 " + tr("Download CSV", cat), disabled=not (p_name and a_name)):
+            csv_buf = export_csv(info, ratings, narratives, fw["domains"], cat)
             fname = f"PharmAssessment_{p_name.replace(', ', '_').replace(' ', '_')}_{assess_date}.csv"
             st.download_button(
-                label="⬇ Click to Download CSV",
+                label="⬇ " + tr("Click to Download CSV", cat),
                 data=csv_buf,
                 file_name=fname,
                 mime="text/csv",
             )
+        if st.button("📗 " + tr("Download Excel Workbook", cat), disabled=not (p_name and a_name)):
+            xlsx_buf = export_xlsx([(info, ratings, narratives)], fw["domains"])
+            if xlsx_buf:
+                fname = f"PharmAssessment_{p_name.replace(', ', '_').replace(' ', '_')}_{assess_date}.xlsx"
+                st.download_button(
+                    label="⬇ " + tr("Click to Download Excel", cat),
+                    data=xlsx_buf,
+                    file_name=fname,
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                )
+            else:
+                st.error("Excel export requires xlsxwriter. Run: pip install xlsxwriter")
 
     with col_pdf:
-        st.markdown("**Export PDF** — Professional report for HR files, accreditation, or peer review records")
-        if st.button("📄 Generate PDF Report", disabled=not (p_name and a_name and attested)):
-            with st.spinner("Generating PDF report..."):
-                pdf_buf = generate_pdf_report(info, ratings, narratives)
+        st.markdown(tr("**Export PDF** — Professional report for HR files, accreditation, or peer review records", cat))
+        with_benchmark = st.checkbox(tr("Include peer benchmark section", cat), key="pdf_benchmark",
+                                     disabled=benchmark is None)
+        if st.button("📄 " + tr("Generate PDF Report", cat), disabled=not (p_name and a_name) or bool(issues)):
+            with st.spinner(tr("Generating PDF report...", cat)):
+                pdf_buf = generate_pdf_report(info, ratings, narratives, fw["domains"], catalog=cat,
+                                              benchmark=benchmark if with_benchmark else None)
             if pdf_buf:
                 fname = f"PharmAssessment_{p_name.replace(', ', '_').replace(' ', '_')}_{assess_date}.pdf"
                 st.download_button(
-                    label="⬇ Click to Download PDF",
+                    label="⬇ " + tr("Click to Download PDF", cat),
                     data=pdf_buf,
                     file_name=fname,
                     mime="application/pdf",
@@ -1192,6 +4822,149 @@ def page_assessment():
     """, unsafe_allow_html=True)
 
 
+@timed("page_batch_entry")
+def page_batch_entry():
+    """Grid entry page for rating many pharmacists at once."""
+    fw = get_framework(st.session_state.tenant, st.session_state.locale)
+    tenant, domains, cat = fw["tenant"], fw["domains"], fw["catalog"]
+    as_text = functools.partial(tr, catalog=cat)
+
+    st.markdown(f"""
+    <div class='app-header'>
+      <h1>🗂 {tr("Batch Assessment Entry", cat)}</h1>
+      <p>{tr("Rate a whole unit in one grid — one row per pharmacist, one column per item", cat)}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.markdown(f"<div class='section-title'>📋 {tr('Shared Assessment Information', cat)}</div>",
+                unsafe_allow_html=True)
+    c1, c2 = st.columns(2)
+    with c1:
+        unit = st.selectbox(tr("Clinical Unit / Service", cat), fw["unit_options"], format_func=as_text, key="b_unit")
+        assess_type = st.selectbox(tr("Assessment Type", cat), ASSESSMENT_TYPES, index=1, format_func=as_text,
+                                   key="b_assessment_type")
+        assess_date = st.date_input(tr("Assessment Date", cat), key="b_assessment_date")
+        obs_start = st.date_input(tr("Observation Period — Start", cat), key="b_obs_start")
+    with c2:
+        a_name = st.text_input(tr("Assessor Name (Last, First)", cat), placeholder="Jones, Robert", key="b_assessor_name")
+        a_cred = st.text_input(tr("Assessor Credentials", cat), placeholder="PharmD, BCPS, BCCCP",
+                               key="b_assessor_credentials")
+        a_role = st.selectbox(tr("Assessor Role", cat), fw["assessor_roles"], format_func=as_text, key="b_assessor_role")
+        obs_end = st.date_input(tr("Observation Period — End", cat), key="b_obs_end")
+    followup = st.selectbox(tr("Recommended Follow-Up Timeline", cat), FOLLOW_UP_OPTIONS, index=3,
+                            format_func=as_text, key="b_followup")
+
+    shared_info = {
+        "unit": unit,
+        "assessor_name": a_name,
+        "assessor_credentials": a_cred,
+        "assessor_role": a_role,
+        "assessment_type": assess_type,
+        "assessment_date": str(assess_date),
+        "obs_start": str(obs_start),
+        "obs_end": str(obs_end),
+        "context_notes": "",
+    }
+
+    st.markdown(f"<div class='section-title'>🩺 {tr('Ratings Grid', cat)}</div>", unsafe_allow_html=True)
+    if "batch_grid" not in st.session_state:
+        st.session_state.batch_grid = batch_grid(domains=domains, catalog=cat)
+        st.session_state.batch_saved = {}
+    elif st.session_state.batch_locale != fw["locale"]:
+        # The grid holds rating labels; carry the edited grid over to the new language.
+        st.session_state.batch_grid = relabel_grid(st.session_state.batch_view, domains,
+                                                   compile_catalog(st.session_state.batch_locale), cat)
+        st.session_state.pop("batch_editor", None)
+    st.session_state.batch_locale = fw["locale"]
+    if st.button("👥 " + tr("Load pharmacists previously assessed on {unit}", cat).format(unit=tr(unit, cat))):
+        roster = unit_roster(unit, tenant)
+        if roster:
+            st.session_state.batch_grid = batch_grid(roster, domains, roster, cat)
+            st.session_state.pop("batch_editor", None)
+        else:
+            st.info(tr("No saved assessments for {unit} yet — add rows to the grid below.", cat).format(unit=tr(unit, cat)))
+    st.caption(tr("Add a row per pharmacist. Hover a column header for the item it rates; "
+                  "ratings of 1–2 need a note under Areas for Development.", cat))
+
+    column_config = {key: st.column_config.TextColumn(tr(label, cat), width="medium") for key, label in BATCH_ID_COLUMNS}
+    for d_num, dom in enumerate(domains, 1):
+        for i_num, item in enumerate(dom["items"], 1):
+            column_config[item["id"]] = st.column_config.SelectboxColumn(
+                f"D{d_num}.{i_num}", help=f"{dom['short']}: {item['text']}",
+                options=cat["rating_labels"], default=cat["value_to_label"][0], required=True, width="small",
+            )
+    column_config.update({key: st.column_config.TextColumn(tr(label, cat), width="large")
+                          for key, label in BATCH_NOTE_COLUMNS})
+    grid = st.data_editor(st.session_state.batch_grid, key="batch_editor", num_rows="dynamic",
+                          column_config=column_config, hide_index=True, use_container_width=True)
+    st.session_state.batch_view = grid
+
+    matrix = grid_ratings(grid, domains, cat)
+    scores = grid_scores(matrix, domains)
+    scores["Band"] = scores["Band"].map(as_text)
+    scores.insert(0, "Pharmacist", _grid_text(grid, "pharmacist_name").to_numpy())
+    if len(scores):
+        st.dataframe(scores.rename(columns=as_text), hide_index=True, use_container_width=True,
+                     column_config={tr(c, cat): st.column_config.NumberColumn(format="%.2f")
+                                    for c in scores.columns if c not in ("Pharmacist", "Band")})
+
+    # The vectorized pre-check catches the common problems on every edit; once
+    # it passes, each record goes through the tenant's full rule set.
+    records = grid_records(grid, matrix, shared_info, {"followup": followup}, domains)
+    row = tr("Row {pos}: {message}", cat)
+    issues = grid_issues(grid, matrix, cat) or grid_rule_issues(grid, records, fw["rule_set"])
+    issues = [msg if pos is None else row.format(pos=pos, message=msg) for pos, msg in issues]
+    for issue in issues:
+        st.error(f"⚠️ {issue}")
+
+    st.markdown(f"<div class='section-title'>📤 {tr('Save & Export', cat)}</div>", unsafe_allow_html=True)
+    attested = st.checkbox(tr("I confirm these assessments are objective, complete, and based on observed performance.",
+                              cat), key="b_attestation")
+    for _, _, narratives in records:
+        narratives["attestation"] = attested
+    if not a_name:
+        st.warning("⚠️ " + tr("Please enter the assessor name before saving.", cat))
+    ready = bool(records) and bool(a_name) and not issues
+
+    c1, c2 = st.columns(2)
+    with c1:
+        if st.button("💾 " + tr("Save All ({n})", cat).format(n=len(records)), disabled=not ready):
+            saved = st.session_state.batch_saved
+            ids = save_assessments(
+                [(info, ratings, narratives, saved.get(info["pharmacist_name"], {}).get("id"))
+                 for info, ratings, narratives in records],
+                tenant, fw["item_ids"],
+            )
+            for (info, ratings, narratives), assessment_id in zip(records, ids):
+                entry = saved.setdefault(info["pharmacist_name"], {"stream": uuid.uuid4().hex, "fields": {}})
+                fields = {**info, **ratings, **narratives, "assessment_id": assessment_id}
+                record_changes(entry["stream"], diff_fields(entry["fields"], fields), a_name, tenant)
+                entry.update(id=assessment_id, fields=fields)
+            st.success(tr("Saved {n} assessments.", cat).format(n=len(ids)))
+    with c2:
+        if st.button("📄 " + tr("Generate All PDFs ({n}, ZIP)", cat).format(n=len(records)),
+                     disabled=not (ready and attested)):
+            import zipfile
+            with st.spinner(tr("Rendering PDF reports...", cat)):
+                zbuf = BytesIO()
+                with zipfile.ZipFile(zbuf, "w", zipfile.ZIP_DEFLATED) as zf:
+                    for (info, _, _), pdf in zip(records, generate_pdf_reports(records, tenant=tenant,
+                                                                               locale=fw["locale"])):
+                        if pdf is None:
+                            break
+                        name = info["pharmacist_name"].replace(", ", "_").replace(" ", "_")
+                        zf.writestr(f"PharmAssessment_{name}_{assess_date}.pdf", pdf)
+            if pdf is None:
+                st.error("PDF generation requires reportlab. Run: pip install reportlab")
+            else:
+                st.download_button(
+                    label="⬇ " + tr("Click to Download ZIP", cat),
+                    data=zbuf.getvalue(),
+                    file_name=f"PharmAssessments_{assess_date}.zip",
+                    mime="application/zip",
+                )
+
+
 def page_about():
     """About page with references and methodology."""
     st.markdown("""
@@ -1299,33 +5072,186 @@ def page_about():
     """)
 
 
+def page_analytics():
+    """Aggregate results across all saved assessments."""
+    st.markdown("""
+    <div class='app-header'>
+      <h1>📈 Assessment Analytics</h1>
+      <p>Domain averages, N/A rates and performance bands across saved assessments</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    fw = get_framework(st.session_state.tenant, st.session_state.locale)
+    refresh_analytics(fw["tenant"])
+    stats = snapshot_domain_stats(fw["tenant"], fw["domains"])
+    if not stats or stats[-1]["assessments"] == 0:
+        st.info("No saved assessments yet.")
+        return
+
+    st.markdown(f"<div class='section-title'>📊 {stats[-1]['assessments']} Saved Assessments</div>",
+                unsafe_allow_html=True)
+    st.caption(f"As of {snapshot_refreshed_at(fw['tenant'])} — figures refresh every {ANALYTICS_MAX_AGE:.0f} seconds.")
+    for row in stats:
+        clr = score_color(row["avg"])
+        bg  = score_bg(row["avg"])
+        st.markdown(
+            f"<div class='score-card' style='background:{bg};border-color:{clr}40'>"
+            f"<div class='score-card-title'>{row['domain']}</div>"
+            f"<div class='score-card-value' style='color:{clr}'>{row['avg'] if row['avg'] else '—'}</div>"
+            f"<div class='score-card-label'>{perf_category(row['avg'])} &nbsp;•&nbsp; "
+            f"N/A rate {row['na_rate']:.0%}</div>"
+            f"</div>",
+            unsafe_allow_html=True
+        )
+
+    st.markdown("<div class='section-title'>🎯 Performance Bands</div>", unsafe_allow_html=True)
+    bands = pd.DataFrame({row["domain"]: row["bands"] for row in stats}).T
+    st.dataframe(bands, use_container_width=True)
+
+    trends = snapshot_trends(fw["tenant"], fw["domains"])
+    if len(trends) > 1:
+        st.markdown("<div class='section-title'>📈 Trends by Quarter</div>", unsafe_allow_html=True)
+        st.line_chart(trends)
+
+    st.markdown("<div class='section-title'>⚖️ Rater Calibration</div>", unsafe_allow_html=True)
+    if st.checkbox("Estimate assessor leniency, item difficulty and rating drift", key="show_calibration"):
+        with st.spinner("Fitting rater model..."):
+            calib = rater_calibration(fw["tenant"])
+        if not calib:
+            st.info("No saved ratings yet.")
+        else:
+            st.caption(f"{calib['ratings']:,} ratings · norm {calib['mu']} · residual SD {calib['rmse']} · "
+                       f"Leniency is in rating points versus an average assessor rating the same pharmacists; "
+                       f"|leniency| ≥ {LENIENCY_FLAG} is flagged. Linked = pharmacists also rated by someone else "
+                       f"(estimates with few links are weak).")
+            st.dataframe(calib["assessors"], use_container_width=True, hide_index=True)
+            with st.expander("Item difficulty (rating points below the norm)"):
+                st.dataframe(calib["items"], use_container_width=True, hide_index=True)
+            with st.expander("Rating drift by quarter"):
+                st.line_chart(calib["periods"].set_index("Quarter")["Drift"])
+                st.dataframe(calib["periods"], use_container_width=True, hide_index=True)
+
+    if st.button("📗 Export All Assessments to Excel"):
+        with st.spinner("Building workbook..."):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = export_xlsx((rec[1:] for rec in iter_assessments(fw["tenant"])), fw["domains"],
+                                   os.path.join(tmp, "assessments.xlsx"))
+                data = open(path, "rb").read() if path else None
+        if data:
+            st.download_button(
+                label="⬇ Click to Download Excel",
+                data=data,
+                file_name=f"PharmAssessments_{date.today()}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+        else:
+            st.error("Excel export requires xlsxwriter. Run: pip install xlsxwriter")
+
+    st.markdown("<div class='section-title'>↔️ Compare Assessments</div>", unsafe_allow_html=True)
+    unit = st.selectbox("Department", ["All Units"] + fw["unit_options"], key="cmp_unit")
+    groups = department_comparison_groups(None if unit == "All Units" else unit, fw["tenant"])
+    if not groups:
+        st.info("Comparison reports need at least two saved assessments for the same pharmacist.")
+    else:
+        who = st.selectbox("Pharmacist", list(groups), key="cmp_pharmacist")
+        c1, c2 = st.columns(2)
+        with c1:
+            if st.button("📄 Comparison PDF"):
+                records = [load_assessment(i, fw["tenant"]) for i in groups[who]]
+                buf = generate_comparison_report(records, domains=fw["domains"], catalog=fw["catalog"])
+                if buf:
+                    st.download_button(
+                        label="⬇ Click to Download PDF",
+                        data=buf,
+                        file_name=f"PharmComparison_{who.replace(' ', '_')}_{date.today()}.pdf",
+                        mime="application/pdf",
+                    )
+                else:
+                    st.error("PDF generation requires reportlab. Run: pip install reportlab")
+        with c2:
+            if st.button(f"🗂 All {len(groups)} Comparisons (ZIP)"):
+                import zipfile
+                with st.spinner("Rendering comparison reports..."):
+                    zbuf = BytesIO()
+                    with zipfile.ZipFile(zbuf, "w", zipfile.ZIP_DEFLATED) as zf:
+                        records = ([load_assessment(i, fw["tenant"]) for i in ids] for ids in groups.values())
+                        pdfs = generate_comparison_reports(records, tenant=fw["tenant"], locale=fw["locale"])
+                        for name, pdf in zip(groups, pdfs):
+                            if pdf is None:
+                                break
+                            zf.writestr(f"PharmComparison_{name.replace(' ', '_')}.pdf", pdf)
+                if pdf is None:
+                    st.error("PDF generation requires reportlab. Run: pip install reportlab")
+                else:
+                    st.download_button(
+                        label="⬇ Click to Download ZIP",
+                        data=zbuf.getvalue(),
+                        file_name=f"PharmComparisons_{date.today()}.zip",
+                        mime="application/zip",
+                    )
+
+    st.markdown("<div class='section-title'>🔎 Search Narrative Comments</div>", unsafe_allow_html=True)
+    query = st.text_input("Search strengths, development areas, goals, summaries and context notes",
+                          placeholder="e.g., vancomycin de-escalation")
+    if query:
+        hits = search_narratives(query, fw["tenant"])
+        if not hits:
+            st.info("No matching assessments.")
+        for hit in hits:
+            snippet = html.escape(hit["snippet"]).replace("\x02", "<mark>").replace("\x03", "</mark>")
+            st.markdown(
+                f"<div class='item-card'><b>{html.escape(hit['pharmacist_name'] or '—')}</b> · "
+                f"{html.escape(hit['unit'] or '')} · {hit['assessment_date']} · "
+                f"assessed by {html.escape(hit['assessor_name'] or '—')}<br/>"
+                f"<span style='font-size:0.85rem'>{snippet}</span></div>",
+                unsafe_allow_html=True
+            )
+
+
 # ─── MAIN ─────────────────────────────────────────────────────────────────────
 
+@timed("rerun")
 def main():
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
     init_state()
+    if st.session_state.tenant not in load_tenant_configs():
+        st.error(f"Unknown site \"{st.session_state.tenant}\". Check the link you were given.")
+        st.stop()
+    init_draft()
+    metrics().session(st.session_state.session_id)
 
     with st.sidebar:
         st.markdown("### ⚕️ Clinical Pharmacist Assessment")
+        if st.session_state.tenant != DEFAULT_TENANT:
+            st.caption(get_framework(st.session_state.tenant)["name"])
+        locales = available_locales()
+        if len(locales) > 1:
+            st.selectbox("🌐 Language", list(locales), format_func=locales.get, key="locale",
+                         on_change=_locale_changed)
+        catalog = compile_catalog(st.session_state.locale)
         st.markdown("---")
+        icons = {"New Assessment": "📋", "Batch Entry": "🗂", "Analytics": "📈", "About & Standards": "📚"}
         page = st.radio(
             "Navigation",
-            ["📋 New Assessment", "📚 About & Standards"],
+            list(icons),
+            format_func=lambda p: f"{icons[p]} {tr(p, catalog)}",
             label_visibility="collapsed",
         )
         st.markdown("---")
-        st.markdown("""
-        **Quick Tips:**
-        - Rate all observed items
-        - Use N/A only for unobserved activities
-        - Narrative comments required for ratings of 1–2
-        - Attest before generating PDF
-        - CSV exports to Smartsheet-ready format
-        """)
+        tips = ["Rate all observed items", "Use N/A only for unobserved activities",
+                "Narrative comments required for ratings of 1–2", "Attest before generating PDF",
+                "CSV exports to Smartsheet-ready format"]
+        st.markdown(f"**{tr('Quick Tips:', catalog)}**\n" + "".join(f"- {tr(t, catalog)}\n" for t in tips))
         st.markdown("---")
-        st.caption("v1.0 | ASHP · ACCP · JCPP\nConfidential — Peer Review Protected")
+        st.caption("v1.0 | ASHP · ACCP · JCPP\n" + tr("Confidential — Peer Review Protected", catalog))
 
-    if "Assessment" in page:
+    if "Batch" in page:
+        page_batch_entry()
+    elif "Assessment" in page:
         page_assessment()
+    elif "Analytics" in page:
+        page_analytics()
     else:
         page_about()
 
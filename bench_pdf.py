@@ -0,0 +1,159 @@
+"""
+PDF report benchmark and regression gate.
+
+Renders a fixed set of synthetic assessments through generate_pdf_report in
+every output mode (app.PDF_MODES) and records story-build time, render time,
+output size and page count for each, plus size and time relative to the
+standard mode. Archival output embeds its fonts, so it is expected to be
+larger than standard (and, as Vera sets wider than Helvetica, sometimes a
+page longer); like every case, it is only gated against its own baseline.
+Results are compared with bench_baseline.json; the run fails (exit 1) when
+a case grows beyond the tolerances below.
+
+    python bench_pdf.py                     # compare against the baseline
+    python bench_pdf.py --update-baseline   # accept current numbers
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+from reportlab import rl_config
+
+import app
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+SIZE_TOLERANCE = 0.05    # output may grow by 5 %
+TIME_TOLERANCE = 0.50    # render time may grow by 50 % (timings are noisy across machines)
+
+INFO = {
+    "pharmacist_name": "Benchmark, Pat",
+    "pharmacist_credentials": "PharmD, BCPS",
+    "unit": app.UNIT_OPTIONS[0],
+    "assessor_name": "Reviewer, Sam",
+    "assessor_credentials": "PharmD, BCCCP",
+    "assessor_role": app.ASSESSOR_ROLES[0],
+    "assessment_type": app.ASSESSMENT_TYPES[1],
+    "assessment_date": "2026-01-15",
+    "obs_start": "2025-07-01",
+    "obs_end": "2025-12-31",
+    "context_notes": "Observed on rounds three times per week; reviewed 20 intervention notes.",
+}
+
+LONG_TEXT = "\n".join(
+    f"{i}. Independently adjusted vancomycin AUC dosing for CRRT patient; "
+    f"communicated de-escalation plan to the team and documented follow-up."
+    for i in range(1, 41)
+)
+
+
+def _cases():
+    item_ids = app.ITEM_IDS
+    return {
+        "all_na": (INFO, {iid: 0 for iid in item_ids}, {"followup": app.FOLLOW_UP_OPTIONS[0]}),
+        "all_fives": (INFO, {iid: 5 for iid in item_ids}, {
+            "strengths": "Role model for the unit.",
+            "summary": "Exemplary across all domains.",
+            "followup": app.FOLLOW_UP_OPTIONS[3],
+            "attestation": True,
+        }),
+        "long_narratives": (INFO, {iid: (i % 5) + 1 for i, iid in enumerate(item_ids)}, {
+            "strengths": LONG_TEXT,
+            "development": LONG_TEXT,
+            "goals": LONG_TEXT,
+            "summary": LONG_TEXT,
+            "followup": app.FOLLOW_UP_OPTIONS[2],
+            "attestation": True,
+        }),
+    }
+
+
+def _page_count(pdf_bytes):
+    return len(re.findall(rb"/Type /Page[^s]", pdf_bytes))
+
+
+def run_case(record, repeat, mode="standard"):
+    build_times, render_times = [], []
+    pdf = b""
+    template = app._build_pdf_template(app.DOMAINS, app.pdf_fonts(mode))
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        story = app.build_pdf_story(*record, template=template)
+        t1 = time.perf_counter()
+        pdf = app.render_pdf_story(story, mode).getvalue()
+        t2 = time.perf_counter()
+        build_times.append(t1 - t0)
+        render_times.append(t2 - t1)
+    return {
+        "build_ms": round(statistics.median(build_times) * 1000, 2),
+        "render_ms": round(statistics.median(render_times) * 1000, 2),
+        "bytes": len(pdf),
+        "pages": _page_count(pdf),
+    }
+
+
+def compare(results, baseline, time_tolerance):
+    failures = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if cur["pages"] != base["pages"]:
+            failures.append(f"{name}: pages {base['pages']} -> {cur['pages']}")
+        if cur["bytes"] > base["bytes"] * (1 + SIZE_TOLERANCE):
+            failures.append(f"{name}: bytes {base['bytes']} -> {cur['bytes']}")
+        total, base_total = cur["build_ms"] + cur["render_ms"], base["build_ms"] + base["render_ms"]
+        if total > base_total * (1 + time_tolerance):
+            failures.append(f"{name}: time {base_total:.1f} ms -> {total:.1f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="renders per case (median is reported)")
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    # Fixed timestamps and document ids so sizes are reproducible run to run.
+    rl_config.invariant = 1
+
+    results = {}
+    for name, record in _cases().items():
+        for mode in app.PDF_MODES:
+            key = name if mode == "standard" else f"{name}:{mode}"
+            results[key] = run_case(record, args.repeat, mode)
+    for key, r in results.items():
+        std = results[key.split(":")[0]]
+        dt = (r["build_ms"] + r["render_ms"]) - (std["build_ms"] + std["render_ms"])
+        print(f"{key:<28} build {r['build_ms']:>8.2f} ms  render {r['render_ms']:>8.2f} ms  "
+              f"{r['bytes']:>8} bytes  {r['pages']:>2} pages  "
+              f"size {r['bytes'] / std['bytes']:>7.1%} of standard  time {dt:>+8.2f} ms vs standard")
+    if "archival" in app.PDF_MODES:
+        print("archival embeds font subsets, so it is larger than standard and may run a page longer.")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline yet; run with --update-baseline.")
+        return 0
+    with open(BASELINE_PATH, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    failures = compare(results, baseline, args.time_tolerance)
+    for f in failures:
+        print(f"REGRESSION  {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Session snapshot benchmark.
+
+Encodes a fixed set of assessment form sessions with app.encode_session and
+reports, for each, the JSON draft size next to the binary payload and the
+compressed snapshot, encode and decode time, and the time to write and to
+restore (fetch + decode) a snapshot through each session store backend.
+
+    python bench_session.py [--repeat 200]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+
+import app
+
+INFO = {
+    "pharmacist_name": "Benchmark, Pat",
+    "pharmacist_credentials": "PharmD, BCPS",
+    "unit": app.UNIT_OPTIONS[0],
+    "assessor_name": "Reviewer, Sam",
+    "assessor_credentials": "PharmD, BCCCP",
+    "assessor_role": app.ASSESSOR_ROLES[0],
+    "assessment_type": app.ASSESSMENT_TYPES[1],
+    "assessment_date": "2026-01-15",
+    "obs_start": "2025-07-01",
+    "obs_end": "2025-12-31",
+    "context_notes": "Observed on rounds three times per week; reviewed 20 intervention notes.",
+}
+
+LONG_TEXT = "\n".join(
+    f"{i}. Independently adjusted vancomycin AUC dosing for CRRT patient; "
+    f"communicated de-escalation plan to the team and documented follow-up."
+    for i in range(1, 41)
+)
+
+
+def _session(info, ratings, narratives):
+    return {"info": info, "ratings": ratings, "narratives": narratives,
+            "assessment_id": None, "page": "assessment", "submitted": False}
+
+
+def _cases():
+    item_ids = app.ITEM_IDS
+    blank = {k: "" for k in INFO}
+    return {
+        "new_form": _session(blank, {}, {"followup": app.FOLLOW_UP_OPTIONS[0], "attestation": False}),
+        "typical": _session(INFO, {iid: (i % 5) + 1 for i, iid in enumerate(item_ids)}, {
+            "strengths": "Role model for the unit.",
+            "development": "Document follow-up on renal dosing consistently.",
+            "goals": "Complete BCCCP by Q3.",
+            "summary": "Meets expectations across all domains.",
+            "followup": app.FOLLOW_UP_OPTIONS[3],
+            "attestation": True,
+        }),
+        "long_narratives": _session(INFO, {iid: (i % 5) + 1 for i, iid in enumerate(item_ids)}, {
+            "strengths": LONG_TEXT,
+            "development": LONG_TEXT,
+            "goals": LONG_TEXT,
+            "summary": LONG_TEXT,
+            "followup": app.FOLLOW_UP_OPTIONS[2],
+            "attestation": True,
+        }),
+    }
+
+
+def _median_us(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e6
+
+
+def run_case(state, stores, repeat):
+    blob = app.encode_session(state)
+    result = {
+        "json_bytes": len(json.dumps(state, default=str)),
+        "binary_bytes": len(zlib.decompress(blob[1:])) + 1,
+        "snapshot_bytes": len(blob),
+        "encode_us": _median_us(lambda: app.encode_session(state), repeat),
+        "decode_us": _median_us(lambda: app.decode_session(blob), repeat),
+    }
+    for name, store in stores.items():
+        result[f"{name}_put_us"] = _median_us(lambda: store.put("bench", blob), repeat)
+        result[f"{name}_restore_us"] = _median_us(lambda: app.decode_session(store.get("bench")), repeat)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="timed runs per measurement (median is reported)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {"sqlite": app.SqliteSessionStore(f"{tmp}/sessions.db"),
+                  "file": app.FileSessionStore(f"{tmp}/sessions")}
+        for name, state in _cases().items():
+            r = run_case(state, stores, args.repeat)
+            print(f"{name:<16} json {r['json_bytes']:>6} B  binary {r['binary_bytes']:>6} B  "
+                  f"snapshot {r['snapshot_bytes']:>5} B ({r['snapshot_bytes'] / r['json_bytes']:>5.1%} of json)  "
+                  f"encode {r['encode_us']:>6.1f} us  decode {r['decode_us']:>6.1f} us")
+            for store in stores:
+                print(f"{'':<16} {store:<6} put {r[f'{store}_put_us']:>7.1f} us  "
+                      f"restore {r[f'{store}_restore_us']:>7.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
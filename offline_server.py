@@ -0,0 +1,88 @@
+"""
+Serve the offline assessment app and accept its sync uploads.
+
+Generates the static bundle from the tenant's framework (app.offline_bundle),
+serves it, and handles POST /sync: the gzip-compressed batch of completed
+assessments is validated, saved, scored and rendered to PDF under
+<data dir>/reports (sealed when encryption is on) by app.ingest_sync_batch.
+Put it behind the same TLS reverse proxy as the Streamlit app (service
+workers require HTTPS); /sync has no login of its own, so the proxy must
+authenticate it the same way it does the app.
+
+    python offline_server.py --port 8502 [--tenant stmarys]
+    python offline_server.py --write-bundle out/   # static files only
+"""
+
+import argparse
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import app
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".webmanifest": "application/manifest+json",
+}
+
+
+def make_handler(tenant, bundle):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            name = self.path.split("?")[0].lstrip("/") or "index.html"
+            if name not in bundle:
+                return self._send(404, b"Not found", "text/plain")
+            ext = name[name.rfind("."):]
+            self._send(200, bundle[name].encode("utf-8"), CONTENT_TYPES[ext])
+
+        def do_POST(self):
+            if self.path.split("?")[0] != "/sync":
+                return self._send(404, b"Not found", "text/plain")
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > app.SYNC_MAX_BYTES:
+                return self._send(413, b"Sync batch is too large.", "text/plain")
+            try:
+                results = app.ingest_sync_batch(self.rfile.read(length), tenant,
+                                                self.headers.get("Content-Encoding"))
+            except ValueError as exc:
+                return self._send(400, str(exc).encode("utf-8"), "text/plain")
+            self._send(200, json.dumps({"results": results}).encode("utf-8"), "application/json")
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--tenant", default=app.DEFAULT_TENANT)
+    parser.add_argument("--write-bundle", metavar="DIR", help="write the static bundle to DIR and exit")
+    args = parser.parse_args(argv)
+
+    if args.tenant not in app.load_tenant_configs():
+        parser.error(f"unknown tenant {args.tenant!r}")
+    if args.write_bundle:
+        for path in app.write_offline_bundle(args.write_bundle, args.tenant):
+            print(path)
+        return 0
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.tenant, app.offline_bundle(args.tenant)))
+    print(f"Offline app for tenant {args.tenant!r} at http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Rater calibration job: assessor leniency/severity, item difficulty and
+quarterly rating drift across every stored assessment of a tenant.
+
+Fits the many-facet model in app.fit_facet_model (rating = norm + pharmacist
++ assessor + item + quarter) and writes one CSV per facet:
+
+    <out>/assessors.csv   leniency in rating points, flagged at ±app.LENIENCY_FLAG
+    <out>/items.csv       difficulty in rating points below the norm
+    <out>/quarters.csv    drift of the whole tenant's ratings by quarter
+    <out>/adjusted.csv    each assessment's overall score with its assessor's leniency removed
+
+    python rater_calibration.py --out /srv/hr-drop/calibration [--tenant stmarys]
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--tenant", default=app.DEFAULT_TENANT)
+    args = parser.parse_args(argv)
+
+    if args.tenant not in app.load_tenant_configs():
+        parser.error(f"unknown tenant {args.tenant!r}")
+    calib = app.rater_calibration(args.tenant)
+    if calib is None:
+        print("No saved ratings; nothing to calibrate.")
+        return 0
+    os.makedirs(args.out, exist_ok=True)
+    for name, key in (("assessors", "assessors"), ("items", "items"), ("quarters", "periods")):
+        calib[key].to_csv(os.path.join(args.out, f"{name}.csv"), index=False)
+    with open(os.path.join(args.out, "adjusted.csv"), "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["Assessment Id", "Pharmacist", "Assessor", "Assessment Date", "Overall", "Adjusted Overall"])
+        for assessment_id, info, ratings, _ in app.iter_assessments(args.tenant):
+            overall = app.calc_overall_avg(ratings)
+            writer.writerow([assessment_id, info.get("pharmacist_name", ""), info.get("assessor_name", ""),
+                             info.get("assessment_date", ""), overall,
+                             app.leniency_adjusted(overall, assessment_id, calib)])
+    flagged = calib["assessors"]["Flag"].value_counts().to_dict()
+    print(f"{calib['ratings']:,} ratings fit in {calib['fit_seconds']} s ({calib['sweeps']} sweeps, "
+          f"residual SD {calib['rmse']}); {flagged.get('Lenient', 0)} lenient and "
+          f"{flagged.get('Severe', 0)} severe assessors flagged")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
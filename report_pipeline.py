@@ -0,0 +1,214 @@
+"""
+Scheduled report drop for HR: PDFs for new or changed assessments plus a
+cumulative CSV.
+
+Each run picks up assessments saved or changed since the previous run's
+watermark, renders their PDFs and CSV rows in a process pool, and writes
+
+    <out>/<YYYY-MM-DD>/<pharmacist>_<id>.pdf   today's drop
+    <out>/assessments.csv                      every version ever delivered
+                                               (latest row per Assessment Id wins)
+
+PDFs are rendered in the tenant's locale (or --lang); the CSV always keeps
+the English column names and values so its schema never changes between runs.
+
+Every file is written to a temporary name and renamed into place; the CSV is
+rewritten once per run, after every PDF is out. Each record is identified by a
+content hash; processed.jsonl records the hashes whose PDFs were delivered, and
+the CSV's own (Assessment Id, Content Hash) pairs say which rows it has, so a
+run that died halfway can simply be started again and only the missing work is
+redone. The watermark (state.json) only moves after a run
+completes, and each run re-reads one second before it, so records saved while
+a run is in progress are never missed; the hash check skips the overlap.
+
+    python report_pipeline.py --out /srv/hr-drop [--tenant stmarys] [--lang es] [--workers 4]
+
+Schedule it with cron or a systemd timer, e.g.
+    15 2 * * *  cd /opt/pharm-assess && python report_pipeline.py --out /srv/hr-drop
+"""
+
+import argparse
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+import app
+
+CHUNK = 200   # records per commit (PDFs written, hashes recorded)
+ID_COLUMNS = ["Assessment Id", "Content Hash"]
+
+
+def content_hash(info, ratings, narratives, locale=app.DEFAULT_LOCALE):
+    """Stable hash of an assessment's content and the framework version and locale it renders with."""
+    version = app.FRAMEWORK_VERSION if locale == app.DEFAULT_LOCALE else f"{app.FRAMEWORK_VERSION}/{locale}"
+    blob = json.dumps([version, info, ratings, narratives], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _render_job(job, tenant, domains, locale):
+    assessment_id, digest, info, ratings, narratives = job
+    pdf = app._render_record((info, ratings, narratives), tenant, "standard", locale)
+    row = {"Assessment Id": assessment_id, "Content Hash": digest,
+           **app.csv_row(info, ratings, narratives, domains)}
+    return pdf, row
+
+
+def _safe_name(text):
+    return "".join(c if c.isalnum() else "_" for c in text).strip("_")[:60] or "assessment"
+
+
+def load_processed(path):
+    """{assessment_id: content_hash} of every version already delivered."""
+    done = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue   # torn last line from a crash
+                done[entry["id"]] = entry["hash"]
+    return done
+
+
+def csv_keys(path):
+    """(assessment_id, content_hash) pairs already present in the cumulative CSV."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline="", encoding="utf-8") as fh:
+        return {(r["Assessment Id"], r["Content Hash"]) for r in csv.DictReader(fh)}
+
+
+def append_csv(path, rows):
+    """Atomically rewrite the cumulative CSV with `rows` appended (header grows if needed).
+    Costs a full copy of the file, so call it once per run."""
+    header, existing = [], None
+    if os.path.exists(path):
+        existing = open(path, newline="", encoding="utf-8")
+        header = csv.DictReader(existing).fieldnames or []
+        existing.seek(0)
+    for row in rows:
+        header += [k for k in row if k not in header]
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as out:
+            writer = csv.DictWriter(out, fieldnames=header, restval="")
+            writer.writeheader()
+            if existing:
+                writer.writerows(csv.DictReader(existing))
+            writer.writerows(rows)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    finally:
+        if existing:
+            existing.close()
+
+
+def run(out_dir, tenant=app.DEFAULT_TENANT, workers=None, locale=None):
+    """One pipeline pass; returns (pdfs_written, csv_rows_written, skipped)."""
+    os.makedirs(out_dir, exist_ok=True)
+    state_path = os.path.join(out_dir, "state.json")
+    processed_path = os.path.join(out_dir, "processed.jsonl")
+    csv_path = os.path.join(out_dir, "assessments.csv")
+    drop_dir = os.path.join(out_dir, date.today().isoformat())
+
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as fh:
+            state = json.load(fh)
+    started = datetime.now().isoformat(timespec="seconds")
+    since = None
+    if state.get("watermark"):
+        since = (datetime.fromisoformat(state["watermark"]) - timedelta(seconds=1)).isoformat(timespec="seconds")
+
+    processed = load_processed(processed_path)
+    in_csv = csv_keys(csv_path)
+    domains = app.get_framework(tenant)["domains"]   # CSV columns stay English
+    locale = locale or app.tenant_locale(tenant)      # PDFs only
+
+    jobs, skipped = [], 0
+    for assessment_id, info, ratings, narratives in app.iter_assessments(tenant, since):
+        digest = content_hash(info, ratings, narratives, locale)
+        if processed.get(assessment_id) == digest and (assessment_id, digest) in in_csv:
+            skipped += 1
+            continue
+        jobs.append((assessment_id, digest, info, ratings, narratives))
+
+    pdfs, rows = 0, []
+    results = app._ordered_pool_map(_render_job, jobs, workers, None, tenant, domains, locale)
+    for start in range(0, len(jobs), CHUNK):
+        chunk = jobs[start:start + CHUNK]
+        entries = []
+        for job, (pdf, row) in zip(chunk, results):
+            assessment_id, digest, info = job[:3]
+            if processed.get(assessment_id) != digest:
+                if pdf is None:
+                    raise RuntimeError("PDF generation requires reportlab. Run: pip install reportlab")
+                os.makedirs(drop_dir, exist_ok=True)
+                name = f"{_safe_name(info.get('pharmacist_name', ''))}_{assessment_id}.pdf"
+                _atomic_write(os.path.join(drop_dir, name), pdf)
+                entries.append({"id": assessment_id, "hash": digest, "pdf": name})
+                pdfs += 1
+            if (assessment_id, digest) not in in_csv:
+                rows.append(row)
+        with open(processed_path, "a", encoding="utf-8") as fh:
+            for entry in entries:
+                fh.write(json.dumps(entry) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    if rows:
+        append_csv(csv_path, rows)
+    _atomic_write(state_path, json.dumps({"watermark": started, "last_run": started,
+                                          "pdfs": pdfs, "csv_rows": len(rows)}).encode("utf-8"))
+    return pdfs, len(rows), skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="drop directory")
+    parser.add_argument("--tenant", default=app.DEFAULT_TENANT)
+    parser.add_argument("--lang", default=None, help="report language (default: the tenant's locale)")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.tenant not in app.load_tenant_configs():
+        parser.error(f"unknown tenant {args.tenant!r}")
+    if args.lang and args.lang not in app.available_locales():
+        parser.error(f"unknown language {args.lang!r}")
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, ".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print("Another run is in progress; exiting.")
+            return 0
+        pdfs, rows, skipped = run(args.out, args.tenant, args.workers, args.lang)
+    print(f"{pdfs} PDFs, {rows} CSV rows written; {skipped} unchanged records skipped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
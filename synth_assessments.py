@@ -0,0 +1,249 @@
+"""
+Seeded synthetic assessment generator for scale testing.
+
+Produces assessments over the real framework (app.DOMAINS items,
+UNIT_OPTIONS, ASSESSMENT_TYPES, ASSESSOR_ROLES, FOLLOW_UP_OPTIONS) with
+production-like structure:
+
+  - a fixed pool of pharmacists, each with a home unit and a latent ability
+  - a pool of assessors, each with a leniency/severity bias
+  - per-item difficulty; ratings = ability + bias - difficulty + noise,
+    rounded into the 1-5 EPA scale
+  - N/A for unobserved items (much more often on `optional` items)
+  - narratives of log-normally varying length, with development comments
+    whenever an item is rated 1-2 (so records pass the low-rating rules)
+  - follow-up timelines that track the overall score
+  - about 3% of records left unattested, like assessments saved before the
+    assessor signs off; those fail only the attestation rule
+
+Rows are generated in vectorized chunks; narratives are drawn from a bank of
+pre-composed texts so no per-row Python work is needed except in the `store`
+sink. Output for a given --seed and --chunk is identical run to run.
+
+    python synth_assessments.py --rows 1000000 --format csv --out synth.csv
+    python synth_assessments.py --rows 2000000 --format parquet --out synth.parquet
+    python synth_assessments.py --rows 50000 --format store [--tenant stmarys]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import app
+
+INFO_COLUMNS = ["pharmacist_name", "pharmacist_credentials", "unit", "assessor_name", "assessor_credentials",
+                "assessor_role", "assessment_type", "assessment_date", "obs_start", "obs_end", "context_notes"]
+NARRATIVE_COLUMNS = ["strengths", "development", "goals", "summary", "followup", "attestation"]
+
+LAST_NAMES = ["Nguyen", "Smith", "Patel", "Garcia", "Johnson", "Kim", "Williams", "Brown", "Lopez", "Chen",
+              "Davis", "Martinez", "Okafor", "Wilson", "Anderson", "Thomas", "Singh", "Moore", "Jackson", "Lee"]
+FIRST_NAMES = ["Alex", "Jordan", "Sam", "Priya", "Maria", "Wei", "Chris", "Taylor", "Fatima", "Luis",
+               "Morgan", "Aisha", "Daniel", "Grace", "Omar", "Emily", "Noah", "Hana", "Ravi", "Julia"]
+CREDENTIALS = ["PharmD", "PharmD, BCPS", "PharmD, BCCCP", "PharmD, BCIDP", "PharmD, BCOP", "PharmD, BCPS, BCCCP"]
+
+PHRASES = {
+    "strengths": [
+        "Consistently identifies drug-drug interactions on rounds before the team does.",
+        "Independently manages vancomycin AUC dosing, including patients on CRRT.",
+        "Communicates recommendations clearly and with supporting evidence.",
+        "Proactively reconciles home medications at transitions of care.",
+        "Serves as a go-to resource for anticoagulation questions on the unit.",
+        "Precepts students effectively and gives timely, specific feedback.",
+        "Documents interventions promptly and completely.",
+        "Leads antimicrobial de-escalation discussions with the ID team.",
+    ],
+    "development": [
+        "Intervention documentation is often delayed beyond the end of shift.",
+        "De-escalation opportunities are identified but not always communicated.",
+        "Needs to follow up on monitoring plans after recommendations are accepted.",
+        "Could engage more actively during interdisciplinary rounds.",
+        "Renal dose adjustments are occasionally missed on admission review.",
+        "Should prioritize high-risk patients earlier in the shift.",
+    ],
+    "goals": [
+        "Complete all intervention documentation within the same shift.",
+        "Propose one stewardship intervention per week at rounds.",
+        "Complete board certification review by the end of Q3.",
+        "Present one journal club to the pharmacy team this quarter.",
+        "Shadow the ID pharmacist for two rounding sessions.",
+    ],
+    "summary": [
+        "Performance is solid and trending upward over the observation period.",
+        "A dependable member of the unit team with clear growth areas.",
+        "Ready for expanded responsibilities in the next review cycle.",
+        "Meets expectations across most domains; targeted plan in place.",
+        "An exemplary clinician and role model for peers.",
+    ],
+}
+BANK_SIZE = 4096
+
+
+def _narrative_bank(rng, phrases, median_sentences):
+    """BANK_SIZE texts of log-normally distributed length (in sentences)."""
+    lengths = np.clip(np.round(rng.lognormal(np.log(median_sentences), 0.6, BANK_SIZE)), 1, 40).astype(int)
+    picks = rng.integers(0, len(phrases), lengths.sum())
+    bank, pos = [], 0
+    for n in lengths:
+        bank.append(" ".join(phrases[i] for i in picks[pos:pos + n]))
+        pos += n
+    return np.array(bank, dtype=object)
+
+
+class Generator:
+    """Deterministic synthetic assessment source over a framework."""
+
+    def __init__(self, seed=0, n_pharmacists=5000, domains=app.DOMAINS):
+        self.seed = seed
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+        items = [it for d in domains for it in d["items"]]
+        self.domains = domains
+        self.item_ids = [it["id"] for it in items]
+        self.n_items = len(items)
+        self.difficulty = rng.normal(0, 0.25, self.n_items)
+        self.na_rate = np.array([0.45 if it.get("optional") else 0.06 for it in items])
+
+        n_units = len(app.UNIT_OPTIONS)
+        unit_weights = rng.dirichlet(np.full(n_units, 2.0))
+        self.ph_name = np.array([f"{LAST_NAMES[i % 20]}, {FIRST_NAMES[(i // 20) % 20]} {i:05d}"
+                                 for i in range(n_pharmacists)], dtype=object)
+        self.ph_cred = rng.choice(np.array(CREDENTIALS, dtype=object), n_pharmacists)
+        self.ph_unit = rng.choice(np.array(app.UNIT_OPTIONS, dtype=object), n_pharmacists, p=unit_weights)
+        self.ph_ability = rng.normal(3.6, 0.5, n_pharmacists)
+
+        n_assessors = max(10, n_pharmacists // 8)
+        self.as_name = np.array([f"{LAST_NAMES[(i * 7) % 20]}, {FIRST_NAMES[(i * 3) % 20]} A{i:04d}"
+                                 for i in range(n_assessors)], dtype=object)
+        self.as_cred = rng.choice(np.array(CREDENTIALS, dtype=object), n_assessors)
+        self.as_role = rng.choice(np.array(app.ASSESSOR_ROLES, dtype=object), n_assessors)
+        self.as_bias = rng.normal(0, 0.3, n_assessors)
+
+        self.type_p = np.array([0.35, 0.35, 0.08, 0.08, 0.05, 0.04, 0.03, 0.02])[:len(app.ASSESSMENT_TYPES)]
+        self.type_p /= self.type_p.sum()
+        self.banks = {k: _narrative_bank(rng, v, m)
+                      for (k, v), m in zip(PHRASES.items(), (3, 2, 3, 2))}
+        self.context = _narrative_bank(rng, ["Observed on rounds three times per week.",
+                                             "Reviewed 15 clinical intervention notes.",
+                                             "Covered nights for part of the period."], 1)
+
+    def chunk(self, index, n):
+        """Chunk number `index` of n rows as a dict of column arrays (ratings as uint8)."""
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(1, index)))
+        ph = rng.integers(0, len(self.ph_name), n)
+        asr = rng.integers(0, len(self.as_name), n)
+
+        latent = (self.ph_ability[ph, None] + self.as_bias[asr, None] - self.difficulty[None, :]
+                  + rng.normal(0, 0.6, (n, self.n_items)))
+        ratings = np.clip(np.rint(latent), 1, 5).astype(np.uint8)
+        ratings[rng.random((n, self.n_items)) < self.na_rate] = 0
+
+        rated = ratings > 0
+        overall = np.where(rated.any(1), ratings.sum(1) / np.maximum(rated.sum(1), 1), 0)
+        has_low = ((ratings > 0) & (ratings <= 2)).any(1)
+
+        days = rng.integers(0, 3 * 365, n)
+        assess = np.datetime64("2023-01-01") + days
+        obs_start = assess - rng.integers(30, 365, n)
+
+        def pick(bank, p_empty):
+            out = bank[rng.integers(0, BANK_SIZE, n)]
+            out[rng.random(n) < p_empty] = ""
+            return out
+
+        development = pick(self.banks["development"], 0.3)
+        missing = has_low & (development == "")
+        development[missing] = self.banks["development"][rng.integers(0, BANK_SIZE, missing.sum())]
+
+        fu = np.select(
+            [overall < 2.5, overall < 3.25, overall < 4.0],
+            [rng.choice([4, 5], n, p=[0.7, 0.3]), rng.choice([1, 2], n), rng.choice([3, 1], n, p=[0.8, 0.2])],
+            default=rng.choice([0, 3], n, p=[0.6, 0.4]),
+        )
+        return {
+            "pharmacist_name": self.ph_name[ph],
+            "pharmacist_credentials": self.ph_cred[ph],
+            "unit": self.ph_unit[ph],
+            "assessor_name": self.as_name[asr],
+            "assessor_credentials": self.as_cred[asr],
+            "assessor_role": self.as_role[asr],
+            "assessment_type": np.array(app.ASSESSMENT_TYPES, dtype=object)[rng.choice(len(self.type_p), n, p=self.type_p)],
+            "assessment_date": assess.astype(str).astype(object),
+            "obs_start": obs_start.astype(str).astype(object),
+            "obs_end": assess.astype(str).astype(object),
+            "context_notes": pick(self.context, 0.5),
+            "ratings": ratings,
+            "strengths": pick(self.banks["strengths"], 0.1),
+            "development": development,
+            "goals": pick(self.banks["goals"], 0.2),
+            "summary": pick(self.banks["summary"], 0.15),
+            "followup": np.array(app.FOLLOW_UP_OPTIONS, dtype=object)[fu],
+            "attestation": rng.random(n) < 0.97,
+        }
+
+    def frame(self, cols):
+        """Flat DataFrame for a chunk: info columns, one uint8 column per item, narratives."""
+        data = {k: cols[k] for k in INFO_COLUMNS}
+        data.update({iid: cols["ratings"][:, j] for j, iid in enumerate(self.item_ids)})
+        data.update({k: cols[k] for k in NARRATIVE_COLUMNS})
+        return pd.DataFrame(data)
+
+    def records(self, cols):
+        """(info, ratings, narratives, None) tuples for app.save_assessments."""
+        for i in range(len(cols["ratings"])):
+            info = {k: cols[k][i] for k in INFO_COLUMNS}
+            ratings = dict(zip(self.item_ids, cols["ratings"][i].tolist()))
+            narratives = {k: cols[k][i] for k in NARRATIVE_COLUMNS}
+            narratives["attestation"] = bool(narratives["attestation"])
+            yield info, ratings, narratives, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=50_000, help="rows generated per vectorized chunk")
+    parser.add_argument("--pharmacists", type=int, default=5000)
+    parser.add_argument("--format", choices=["csv", "parquet", "store"], default="csv")
+    parser.add_argument("--out", help="output file for csv/parquet")
+    parser.add_argument("--tenant", default=app.DEFAULT_TENANT, help="tenant partition for --format store")
+    args = parser.parse_args(argv)
+    if args.format != "store" and not args.out:
+        parser.error("--out is required for csv and parquet output")
+
+    fw = app.get_framework(args.tenant)
+    gen = Generator(args.seed, args.pharmacists, fw["domains"])
+    writer = None
+    if args.format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("Parquet output requires pyarrow. Run: pip install pyarrow")
+            return 1
+
+    t0 = time.perf_counter()
+    done = 0
+    for index, start in enumerate(range(0, args.rows, args.chunk)):
+        cols = gen.chunk(index, min(args.chunk, args.rows - start))
+        if args.format == "csv":
+            gen.frame(cols).to_csv(args.out, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        elif args.format == "parquet":
+            table = pa.Table.from_pandas(gen.frame(cols), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(args.out, table.schema, compression="zstd")
+            writer.write_table(table)
+        else:
+            app.save_assessments(list(gen.records(cols)), args.tenant, fw["item_ids"])
+        done += len(cols["ratings"])
+        rate = done / (time.perf_counter() - t0)
+        print(f"\r{done:>10,} rows  {rate:>10,.0f} rows/s", end="", flush=True)
+    if writer is not None:
+        writer.close()
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+Shared fixtures. Streamlit re-executes app.py into fresh globals on every
+rerun, so concurrent sessions share st.cache_resource objects but nothing
+else; the tests load the app the same way.
+"""
+
+import os
+
+import pytest
+import streamlit as st
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def script_instances(n):
+    with open(APP, encoding="utf-8") as fh:
+        code = compile(fh.read(), APP, "exec")
+    instances = []
+    for _ in range(n):
+        ns = {"__name__": "app_rerun", "__file__": APP}
+        exec(code, ns)
+        instances.append(ns)
+    return instances
+
+
+@pytest.fixture
+def load_app(tmp_path, monkeypatch):
+    """load_app(n=1, key=None) -> n fresh script instances over one empty data dir."""
+    monkeypatch.setenv("PHARM_ASSESS_DATA_DIR", str(tmp_path))
+    monkeypatch.delenv("PHARM_ASSESS_KEY_FILE", raising=False)
+
+    def load(n=1, key=None):
+        if key is None:
+            monkeypatch.delenv("PHARM_ASSESS_KEY", raising=False)
+        else:
+            monkeypatch.setenv("PHARM_ASSESS_KEY", key)
+        st.cache_resource.clear()
+        return script_instances(n)
+
+    yield load
+    st.cache_resource.clear()
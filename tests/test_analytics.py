@@ -0,0 +1,70 @@
+"""The analytics snapshot must match a full scan of the rating matrix and refresh only what changed."""
+
+import json
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+TENANT = "t1"
+EXTRA_ITEM = {"id": "dtm_t1", "text": "Manages anticoagulation per protocol", "low": "", "high": ""}
+
+
+def _load(load_app, tmp_path, monkeypatch, config):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({TENANT: config}), encoding="utf-8")
+    monkeypatch.setenv("PHARM_ASSESS_TENANTS", str(path))
+    app = load_app()[0]
+    return app, app["get_framework"](TENANT)
+
+
+def _save(app, fw, rng, assessment_id=None, unit=None, date=None):
+    ratings = {iid: rng.choice([0, 0, 1, 2, 3, 4, 4, 5]) for iid in fw["item_ids"]}
+    info = {"pharmacist_name": "P", "assessor_name": "A", "unit": unit or rng.choice(["MICU", "Oncology"]),
+            "assessment_type": "Annual Review", "assessment_date": date or ""}
+    return app["save_assessment"](info, ratings, {"followup": "", "attestation": True},
+                                  assessment_id, TENANT, fw["item_ids"])
+
+
+def _rescanned_matrix(app, item_ids):
+    """The tenant's matrix rebuilt from ratings_json for the current framework."""
+    conn = sqlite3.connect(app["db_path"](TENANT))
+    rows = conn.execute("SELECT ratings_json FROM assessments ORDER BY matrix_row").fetchall()
+    conn.close()
+    data = b"".join(app["ratings_to_row"](json.loads(r), item_ids) for r, in rows)
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(rows), len(item_ids))
+
+
+def _assert_snapshot_matches(app, fw, matrix):
+    assert app["snapshot_domain_stats"](TENANT, fw["domains"]) == app["matrix_domain_stats"](matrix, fw["domains"])
+
+
+def test_snapshot_tracks_saves_and_framework_changes(load_app, tmp_path, monkeypatch):
+    rng = random.Random(7)
+    app, fw = _load(load_app, tmp_path, monkeypatch, {})
+    refresh = app["refresh_analytics"]
+    ids = [_save(app, fw, rng, date=f"202{5 + i % 2}-{1 + i % 12:02d}-15") for i in range(30)]
+    ids.append(_save(app, fw, rng))   # undated
+    assert refresh(TENANT, max_age=0) == len(ids)
+    _assert_snapshot_matches(app, fw, app["open_rating_matrix"](TENANT, fw["item_ids"]))
+    assert refresh(TENANT, max_age=0) == 0
+
+    for aid in ids[:3]:
+        _save(app, fw, rng, aid, unit="Oncology", date="2026-03-01")
+    assert refresh(TENANT, max_age=0) == 3
+    _assert_snapshot_matches(app, fw, app["open_rating_matrix"](TENANT, fw["item_ids"]))
+    assert refresh(TENANT, max_age=0) == 0
+
+    app, fw = _load(load_app, tmp_path, monkeypatch, {"extra_items": {"dtm": [EXTRA_ITEM]}})
+    refresh = app["refresh_analytics"]
+    assert EXTRA_ITEM["id"] in fw["item_ids"]
+    assert refresh(TENANT, max_age=0) == len(ids)
+    _assert_snapshot_matches(app, fw, _rescanned_matrix(app, fw["item_ids"]))
+    assert refresh(TENANT, max_age=0) == 0
+
+
+@pytest.mark.filterwarnings("error")
+def test_quarters_parse_without_format_inference(load_app):
+    app = load_app()[0]
+    assert list(app["_quarter"](["not a date", "", "2026-01-15", None])) == ["", "", "2026Q1", ""]
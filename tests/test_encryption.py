@@ -0,0 +1,99 @@
+"""Field encryption at rest: sealing, the plaintext migration, search and name lookups."""
+
+import base64
+import os
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+KEY = base64.b64encode(os.urandom(32)).decode("ascii")
+
+
+def _info(name, date, unit="MICU"):
+    return {"pharmacist_name": name, "pharmacist_credentials": "PharmD, BCPS", "assessor_name": "Dr. Assessor",
+            "unit": unit, "assessment_date": date}
+
+
+def _save(app, name, date, narrative=""):
+    ratings = {iid: 4 for iid in app["ITEM_IDS"]}
+    return app["save_assessment"](_info(name, date), ratings,
+                                  {"strengths": narrative, "followup": "", "attestation": True})
+
+
+def _raw(app, sql):
+    conn = sqlite3.connect(app["db_path"]())
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_seal_open_round_trip(load_app):
+    app = load_app(key=KEY)[0]
+    cipher = app["get_field_cipher"]()
+    token = cipher.seal("Jane Doe", "a1/pharmacist_name")
+    assert app["is_sealed"](token) and "Jane" not in token
+    assert cipher.open(token, "a1/pharmacist_name") == "Jane Doe"
+    with pytest.raises(RuntimeError):
+        cipher.open(token, "a2/pharmacist_name")    # copied onto another record
+    with pytest.raises(RuntimeError):
+        cipher.open(token, "a1/assessor_name")      # moved to another field
+    with pytest.raises(RuntimeError):
+        app["get_field_cipher"]("other").open(token, "a1/pharmacist_name")   # another tenant's key
+
+    values = {"pharmacist_name": "Jane Doe", "unit": "MICU"}
+    sealed = app["seal_fields"](cipher, values, "a1")
+    assert app["is_sealed"](sealed["pharmacist_name"]) and sealed["unit"] == "MICU"
+    assert app["open_fields"](cipher, sealed, "a1") == values
+
+
+def test_plaintext_database_is_sealed_once(load_app):
+    plain = load_app()[0]
+    aid = _save(plain, "Jane Doe", "2026-01-15", "Excellent anticoagulation stewardship")
+    plain["save_draft"]("d1", {"pharmacist_name": "Jane Doe"})
+    while not _raw(plain, "SELECT id FROM drafts"):   # written by the draft-writer thread
+        time.sleep(0.01)
+    plain["record_changes"]("d1", [("pharmacist_name", None, "Jane Doe")], actor="Dr. Assessor")
+    plain["get_audit_log"](plain["DEFAULT_TENANT"]).flush()   # the instance record_changes used
+
+    app = load_app(key=KEY)[0]
+    app["get_pool"]()   # opening the database runs the migration
+    assert all(v.startswith("enc1:") for v in _raw(app, "SELECT pharmacist_name FROM assessments")[0])
+    assert _raw(app, "SELECT state_json FROM drafts")[0][0].startswith("enc1:")
+    actor, new_json = _raw(app, "SELECT actor, new_json FROM audit_events")[0]
+    assert actor.startswith("enc1:") and new_json.startswith("enc1:")
+
+    assert app["load_assessment"](aid)[0]["pharmacist_name"] == "Jane Doe"
+    assert app["load_draft"]("d1") == {"pharmacist_name": "Jane Doe"}
+    assert app["audit_history"]("d1")[0]["new"] == "Jane Doe"
+    assert [h["id"] for h in app["search_narratives"]("anticoagulation")] == [aid]
+    with app["get_pool"]().connection() as conn:
+        assert app["seal_stored_fields"](conn, app["get_field_cipher"]()) == 0
+
+
+def test_search_narratives_with_key(load_app):
+    app = load_app(key=KEY)[0]
+    hit_id = _save(app, "Jane Doe", "2026-01-15", "Led the anticoagulation protocol rollout")
+    _save(app, "John Roe", "2026-01-16", "Strong renal dosing interventions")
+    assert not any("anticoagulation" in str(r) for r in _raw(app, "SELECT * FROM narratives_fts"))
+
+    hits = app["search_narratives"]("Anticoagulation protocol")
+    assert [h["id"] for h in hits] == [hit_id]
+    assert hits[0]["pharmacist_name"] == "Jane Doe"
+    assert "\x02anticoagulation\x03" in hits[0]["snippet"]
+    assert app["search_narratives"]("anticoag") == []   # whole words only
+
+
+def test_name_lookups_return_plaintext(load_app):
+    app = load_app(key=KEY)[0]
+    ids = {name: [_save(app, name, date) for date in ("2025-01-15", "2026-01-15")]
+           for name in ("Jane Doe", "John Roe")}
+
+    facets = app["rating_facets"]()
+    assert set(facets["labels"]["pharmacist"]) == {"Jane Doe", "John Roe"}
+    assert set(facets["labels"]["assessor"]) == {"Dr. Assessor"}
+    assert app["unit_roster"]("MICU") == {"Jane Doe": "PharmD, BCPS", "John Roe": "PharmD, BCPS"}
+    assert app["department_comparison_groups"]("MICU") == ids
@@ -0,0 +1,39 @@
+"""Metrics server start-up and cache instrumentation."""
+
+import logging
+import socket
+
+import pytest
+
+
+@pytest.fixture
+def app(load_app):
+    return load_app()[0]
+
+
+def test_busy_metrics_port_is_logged_and_retried(app, caplog):
+    busy = socket.socket()
+    busy.bind(("127.0.0.1", 0))
+    busy.listen()
+    port = busy.getsockname()[1]
+    with caplog.at_level(logging.WARNING, logger="pharm_assess"):
+        assert app["start_metrics_server"](port, "127.0.0.1") is None
+    assert "Metrics server not started" in caplog.text
+    busy.close()
+
+    assert app["start_metrics_server"](port, "127.0.0.1") is None   # not retried yet
+    app["_metrics_server_state"]()["retry_at"] = 0.0   # as if METRICS_RETRY_SECONDS had passed
+    server = app["start_metrics_server"](port, "127.0.0.1")
+    try:
+        assert server is not None and app["start_metrics_server"](port, "127.0.0.1") is server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pdf_template_lookups_count_once(app):
+    pytest.importorskip("reportlab")
+    tpl = app["get_pdf_template"]()
+    assert app["get_pdf_template"]() is tpl
+    caches = app["metrics"]().snapshot()["caches"]
+    assert caches["pdf_template"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
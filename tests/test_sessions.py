@@ -0,0 +1,63 @@
+"""Binary session snapshots: round trip, framework changes and damaged blobs."""
+
+import struct
+import zlib
+
+import pytest
+
+
+@pytest.fixture
+def app(load_app):
+    return load_app()[0]
+
+
+def _state(app):
+    ids = app["ITEM_IDS"]
+    return {
+        "info": {"pharmacist_name": "Zoë Ñúñez", "unit": "MICU", "assessment_date": "2026-01-15",
+                 "context_notes": "Night shift\ncoverage"},
+        "ratings": {iid: i % 6 for i, iid in enumerate(ids)},
+        "narratives": {"strengths": "Clear, concise handoffs ✓", "followup": "", "attestation": True},
+        "assessment_id": "a1",
+        "page": "review",
+        "submitted": True,
+    }
+
+
+def test_round_trip(app):
+    state = _state(app)
+    decoded = app["decode_session"](app["encode_session"](state))
+    assert decoded["ratings"] == state["ratings"]
+    assert {k: decoded["info"][k] for k in state["info"]} == state["info"]
+    assert {k: decoded["narratives"][k] for k in state["narratives"]} == state["narratives"]
+    assert (decoded["assessment_id"], decoded["page"], decoded["submitted"]) == ("a1", "review", True)
+
+
+def test_other_framework_shape_is_ignored(app):
+    ids = app["ITEM_IDS"]
+    blob = app["encode_session"](_state(app), ids)
+    assert app["decode_session"](blob, ids[::-1]) is None     # same count, different CRC
+    assert app["decode_session"](blob, (*ids, "extra")) is None
+
+
+def test_damaged_snapshots_decode_to_none(app):
+    blob = app["encode_session"](_state(app))
+    decode = app["decode_session"]
+    for cut in range(1, len(blob)):
+        assert decode(blob[:cut]) is None                       # truncated compressed stream
+    payload = zlib.decompress(blob[1:])
+    for cut in range(len(payload)):
+        assert decode(blob[:1] + zlib.compress(payload[:cut])) is None   # truncated payload
+    assert payload.endswith(struct.pack("<I", 0))              # the empty follow-up text
+    bad_text = payload[:-4] + struct.pack("<I", 2) + b"\xff\xfe"
+    assert decode(blob[:1] + zlib.compress(bad_text)) is None
+
+
+def test_damaged_snapshot_falls_back_to_draft(app):
+    key, state = "d1", _state(app)
+    app["save_session"](key, state)
+    store = app["get_session_store"](app["DEFAULT_TENANT"])
+    store.put(key, store.get(key)[:-4])
+    app["save_draft"](key, state)
+    assert app["load_session"](key) is None
+    assert app["load_draft"](key)["info"] == state["info"]
@@ -0,0 +1,106 @@
+"""Storage regression tests. Run with `python -m pytest tests`."""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def apps(load_app):
+    return load_app(6)
+
+
+def test_concurrent_saves_keep_matrix_consistent(apps):
+    per_thread = 50
+    errors = []
+
+    def worker(app, seed):
+        rng = random.Random(seed)
+        try:
+            for i in range(per_thread):
+                ratings = {iid: rng.randint(0, 5) for iid in app["ITEM_IDS"]}
+                info = {"pharmacist_name": f"P{seed}-{i}", "assessor_name": "A", "unit": "MICU",
+                        "assessment_date": "2026-01-15"}
+                app["save_assessment"](info, ratings, {"followup": "", "attestation": True})
+        except Exception as exc:   # surfaced by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(app, seed)) for seed, app in enumerate(apps)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+    app = apps[0]
+    item_ids, width = app["ITEM_IDS"], len(app["ITEM_IDS"])
+    with open(app["matrix_path"](), "rb") as fh:
+        matrix = fh.read()
+    conn = sqlite3.connect(app["db_path"]())
+    rows = conn.execute("SELECT matrix_row, ratings_json FROM assessments").fetchall()
+    conn.close()
+    assert len(rows) == len(apps) * per_thread
+    assert len({r for r, _ in rows}) == len(rows)
+    for matrix_row, ratings_json in rows:
+        stored = matrix[matrix_row * width:(matrix_row + 1) * width]
+        assert stored == app["ratings_to_row"](json.loads(ratings_json), item_ids)
+
+
+class _FlakyPool:
+    """Wraps a pool; the next `failures` borrows raise like an exhausted pool."""
+
+    def __init__(self, pool, failures=1):
+        self.pool = pool
+        self.failures = failures
+        self.attempts = 0
+
+    def connection(self):
+        self.attempts += 1
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("No free database connection")
+        return self.pool.connection()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_draft_writer_survives_pool_failure(apps):
+    app = apps[0]
+    pool = _FlakyPool(app["get_pool"]())
+    writer = app["DraftWriter"](pool, flush_interval=0.01)
+    writer.put("d1", {"pharmacist_name": "first"})
+    assert _wait_for(lambda: pool.attempts >= 2)
+    writer.put("d2", {"pharmacist_name": "second"})
+
+    def stored():
+        with app["get_pool"]().connection() as conn:
+            return {r["id"] for r in conn.execute("SELECT id FROM drafts")}
+
+    assert _wait_for(lambda: stored() == {"d1", "d2"})
+    assert writer.get("d2") is None
+
+
+def test_audit_log_requeues_on_pool_failure(apps):
+    app = apps[0]
+    pool = _FlakyPool(app["get_pool"]())
+    audit = app["AuditLog"](pool, flush_interval=0.01)
+    audit.append("s1", [("pharmacist_name", None, "A")])
+    assert _wait_for(lambda: pool.attempts >= 2)
+    audit.append("s1", [("unit", None, "MICU")])
+
+    def stored():
+        with app["get_pool"]().connection() as conn:
+            return [r["field"] for r in conn.execute("SELECT field FROM audit_events ORDER BY seq")]
+
+    assert _wait_for(lambda: stored() == ["pharmacist_name", "unit"])
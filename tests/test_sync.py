@@ -0,0 +1,45 @@
+"""Offline sync uploads: per-record validation."""
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def app(load_app):
+    return load_app()[0]
+
+
+def _record(app, client_id, ratings):
+    return {
+        "client_id": client_id,
+        "info": {"pharmacist_name": "Jane Doe", "assessor_name": "Dr. Assessor", "unit": "MICU",
+                 "assessment_type": "Annual Review", "assessment_date": "2026-01-15",
+                 "obs_start": "2026-01-01", "obs_end": "2026-01-15"},
+        "ratings": ratings,
+        "narratives": {"attestation": True},
+    }
+
+
+def _ingest(app, records):
+    return app["ingest_sync_batch"](json.dumps({"assessments": records}).encode("utf-8"), render=False)
+
+
+def test_ratings_must_be_whole_numbers(app):
+    ids = app["ITEM_IDS"]
+    ratings = {iid: 4 for iid in ids}
+    ratings.update({ids[0]: True, ids[1]: False, ids[2]: 3.0, ids[3]: "5", ids[4]: 6})
+    result, = _ingest(app, [_record(app, "c1", ratings)])
+    assert result["status"] == "saved", result["issues"]
+    stored = app["load_assessment"](result["assessment_id"])[1]
+    assert all(iid not in stored for iid in ids[:5])
+    assert all(stored[iid] == 4 for iid in ids[5:])
+
+
+def test_malformed_record_is_rejected_alone(app):
+    good = _record(app, "c1", {iid: 4 for iid in app["ITEM_IDS"]})
+    results = _ingest(app, ["not a record", good, {**good, "client_id": "c2", "ratings": [4, 4]}])
+    assert [r["status"] for r in results] == ["rejected", "saved", "rejected"]
+    assert [r["client_id"] for r in results] == [None, "c1", "c2"]
+    assert results[0]["issues"] == ["Record is not a valid assessment."]
+    assert app["load_assessment"](results[1]["assessment_id"]) is not None